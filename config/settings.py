@@ -5,6 +5,7 @@
 import os
 import platform
 import shutil
+import tempfile
 from datetime import datetime
 
 # 检测操作系统
@@ -76,17 +77,36 @@ MAX_RECORDS_THRESHOLD = 300001  # 表记录数阈值
 MAX_DIFF_RECORDS_THRESHOLD = 200000  # 差异记录数阈值
 MAX_REPAIR_RECORDS_THRESHOLD = 3000  # 可修复记录数阈值
 CHUNK_SIZE_FOR_DATA_SYNC = 10000  # 数据同步分块大小
-RECORDS_PER_THREAD = 50000  # 每线程处理记录数
+FETCH_BATCH_SIZE = 10000  # 游标fetchmany每批读取行数
+PG_COPY_EXTRACT = True  # PostgreSQL大表分块加载使用COPY (SELECT ...) TO STDOUT批量导出
+ORACLE_ROWID_PARALLEL = 1  # Oracle大表按ROWID区间并行读取的会话数（默认1不启用；需要DBA_EXTENTS或USER_EXTENTS查询权限，每端额外占用该数量的会话）
+ORACLE_ROWID_MIN_ROWS = 1000000  # 启用ROWID并行读取的最小记录数（按统计信息估算，无统计信息时不启用）
+ORACLE_ROWID_CHUNKS_PER_SESSION = 4  # 每个会话平均分到的ROWID区间数
+RECORDS_PER_THREAD = 50000  # 每线程处理记录数（大表按单列整数主键切分为每段约该记录数的区间并行读取）
+PARALLEL_EXTRACT_SESSIONS = 4  # 按主键区间并行读取时每端的会话数（1为不并行）
+PARALLEL_EXTRACT_PER_HOST = 8  # 同一数据库服务器上同时并行读取的会话数上限（所有比对任务共享）
 MAX_THREAD_COUNT = 3  # 最大线程数
 
 # 比对策略配置
-ENGINE_STRATEGY = "auto"  # pandas/spark_local/spark_cluster/auto
+ENGINE_STRATEGY = "auto"  # pandas/pandas_hash/checksum/streaming/duckdb/spark_local/spark_cluster/auto
+TABLE_STATS_CACHE_TTL = 3600  # 自动选择引擎时表统计信息的缓存时间（秒）
+PROFILE_PRECHECK = True  # 比对前先比较两端聚合概要（记录数、非空数、数值合计/极值、行哈希），一致时跳过逐行比对
+PROFILE_PRECHECK_CROSS_DB = False  # 两端数据库类型不同时概要不含行哈希（行之间交换取值等变化无法发现），是否仍按概要一致跳过逐行比对（结果记为profile_match）
+SAMPLE_BUCKETS = 0  # 主键哈希抽样的分桶数N（任务可用sample_buckets覆盖），大于1时每次只比对一个桶，按天轮转N天覆盖全表
+SAMPLE_CONFIDENCE = 0.95  # 抽样比对估算不一致率的置信水平
+PROCESS_MEMORY_BUDGET_BYTES = int(os.getenv('PROCESS_MEMORY_BUDGET_BYTES', 8 * 1024 ** 3))  # 进程用于比对数据的内存预算，按并发任务数平分
+PANDAS_MEMORY_FACTOR = 3  # Pandas比对峰值内存约为两端原始数据的倍数（合并、类型统一产生的副本）
 # ENABLE_REPAIR = False
 # IS_INCREMENTAL = False
 
 ENABLE_REPAIR = True
 IS_INCREMENTAL = True
 INCREMENTAL_DAYS = 1
+INCREMENTAL_WATERMARK = True  # 增量比对是否从上次成功比对的水位线开始（首次按INCREMENTAL_DAYS），比对窗口首尾相接
+INCREMENTAL_SAFETY_LAG_SECONDS = 300  # 增量窗口结束时间比当前时间提前的秒数，等待未提交事务和同步延迟
+WATERMARK_STATE_FILE = os.getenv('WATERMARK_STATE_FILE', os.path.join(LOG_DIR, 'incremental_watermarks.json'))  # 水位线状态文件
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', os.path.join(LOG_DIR, 'checkpoints'))  # 比对断点目录（校验和/流式引擎按主键区间记录进度，--resume时从断点继续）
+CHECKPOINT_INTERVAL_SECONDS = 60  # 流式比对保存断点的最小间隔（秒）
 TIME_TOLERANCE = 0  # 时间容差（秒）
 ENABLE_TIME_FILTER = False  # 是否启用时间字段过滤（比对源端和目标端时间字段）False/True
 RETRY_TIMES = 3  # 重试次数
@@ -148,13 +168,38 @@ SPARK_CONFIG = {
     "spark_local": {
         "driver_memory": "8g",
         "executor_memory": "4g",
-        "cores": "4"
+        "cores": "4",
+        "jdbc_max_partitions": 8  # JDBC并行读取的最大分区数（即每端最大数据库连接数）
     },
     "spark_cluster": {
         "master": "yarn",
-        "deploy_mode": "cluster"
+        "deploy_mode": "cluster",
+        "jdbc_max_partitions": 64
     }
 }
+SPARK_JDBC_ROWS_PER_PARTITION = 500000  # JDBC分区读取时每个分区的目标记录数
+SPARK_JDBC_FETCHSIZE = 10000  # JDBC每次网络往返拉取的记录数
+SPARK_ROW_HASH_COMPARE = False  # 两端先投影为(主键, 行哈希)窄表再连接，宽表时显著减少shuffle数据量
+# Spark差异数据Parquet输出根目录（每次比对写入其下的日期子目录，修复完成后删除）
+SPARK_DIFF_RECORDS_DIR = os.getenv('SPARK_DIFF_RECORDS_DIR', os.path.join(tempfile.gettempdir(), 'data-consistency-spark-diff'))
+# 集群模式差异数据输出根目录：executor和driver都能访问的共享文件系统（如hdfs://nameservice/tmp/dcp-diff），
+# 未配置时集群模式拒绝运行（executor写到各自本地磁盘的数据driver无法读取）
+SPARK_CLUSTER_DIFF_RECORDS_DIR = os.getenv('SPARK_CLUSTER_DIFF_RECORDS_DIR', '')
+
+# 差异数据以列式结构保存mismatch_full（差异量大时显著降低内存，修复引擎遍历方式不变）
+DIFF_RECORDS_COLUMNAR = False
+
+# 校验和比对配置（checksum引擎）
+CHECKSUM_SEGMENT_COUNT = 16  # 不一致区间每次拆分的分段数
+CHECKSUM_LEAF_SIZE = 5000  # 区间记录数不超过该值时直接逐行比对
+
+# 流式归并比对配置（streaming引擎，分块大小使用CHUNK_SIZE_FOR_DATA_SYNC）
+STREAM_PREFETCH_CHUNKS = 2  # 每端后台预读的最大分块数（决定峰值内存）
+
+# DuckDB比对配置（duckdb引擎，自动选择时用于Pandas和Spark集群之间的数据量）
+DUCKDB_TEMP_DIR = os.getenv('DUCKDB_TEMP_DIR', os.path.join(tempfile.gettempdir(), 'data-consistency-duckdb'))  # 临时数据库和落盘目录
+DUCKDB_MEMORY_LIMIT = '4GB'  # DuckDB内存上限，超出部分落盘
+DUCKDB_THREADS = 4  # DuckDB执行线程数
 
 # 修复引擎配置
 REPAIR_WRITE_MODE = 'update'  # Options: 'insert', 'update', 'replace'
@@ -2,16 +2,29 @@
 # -*- coding: utf-8 -*-
 # @Time    : 2026/1/9 12:43
 # @Author  : hejun
+import importlib.util
+import logging
+import math
+import numbers
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 import pandas as pd
 from datetime import datetime, timedelta
+from decimal import Decimal
 from core.db_adapter.base_adapter import BaseDBAdapter
 
 
 class BaseCompareEngine(ABC):
     """比对引擎基类"""
 
+    # 是否按主键区间记录断点（中断后可用--resume从断点继续）
+    supports_checkpoint = False
+
+    # 并行有序读取时每个任务最多缓存的块数（生产者超出时阻塞，保证内存有界）
+    _ORDERED_QUEUE_CHUNKS = 2
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.src_adapter: BaseDBAdapter = None
@@ -36,36 +49,35 @@ class BaseCompareEngine(ABC):
         self._tgt_pk_cache: List[str] = None
         self._compare_columns_cache: Dict[str, List[str]] = None
 
+        # 增量比对窗口（每次比对只计算一次）和比对成功后要保存的水位线
+        self._incremental_window_cache: Optional[Tuple[datetime, datetime]] = None
+        self._pending_watermark: Optional[datetime] = None
+
+        # 比对断点（仅supports_checkpoint的引擎在run中打开）
+        self._checkpoint = None
+
     def init_adapters(self):
         """初始化源端和目标端数据库适配器（使用连接池）"""
         # 使用新的简化连接池
         from utils.db_connection_pool import get_pooled_connection
 
-        # 源端适配器
-        src_config = {
-            'db_type': self.config['src_db_type'],
-            'host': self.config['src_host'],
-            'port': self.config['src_port'],
-            'user': self.config['src_username'],
-            'password': self.config['src_password'],
-            'database': self.config['src_db_name']
-        }
-        self.src_adapter = get_pooled_connection(src_config)
-
-        # 目标端适配器
-        tgt_config = {
-            'db_type': self.config['tgt_db_type'],
-            'host': self.config['tgt_host'],
-            'port': self.config['tgt_port'],
-            'user': self.config['tgt_username'],
-            'password': self.config['tgt_password'],
-            'database': self.config['tgt_db_name']
-        }
-        self.tgt_adapter = get_pooled_connection(tgt_config)
+        self.src_adapter = get_pooled_connection(self._side_db_config('src'))
+        self.tgt_adapter = get_pooled_connection(self._side_db_config('tgt'))
 
         # 缓存元数据和主键信息（避免重复查询）
         self._cache_metadata()
 
+    def _side_db_config(self, db_side: str) -> Dict[str, Any]:
+        """一端的连接池配置"""
+        return {
+            'db_type': self.config[f'{db_side}_db_type'],
+            'host': self.config[f'{db_side}_host'],
+            'port': self.config[f'{db_side}_port'],
+            'user': self.config[f'{db_side}_username'],
+            'password': self.config[f'{db_side}_password'],
+            'database': self.config[f'{db_side}_db_name']
+        }
+
     def _cache_metadata(self):
         """缓存表元数据和主键信息（性能优化：避免重复查询数据库）"""
         import logging
@@ -110,36 +122,163 @@ class BaseCompareEngine(ABC):
             logger.error(f"缓存元数据失败: {str(e)}")
             raise
 
-    def get_where_clause(self) -> str:
-        """构建WHERE子句（增量/全量）"""
+    def get_where_clause(self, db_side: str = 'src') -> str:
+        """构建一端的WHERE子句（增量/全量，启用抽样时附加主键分桶条件）"""
+        where_clause = self._incremental_where_clause(db_side)
+        sample_condition = self._sample_condition(db_side)
+        if not sample_condition:
+            return where_clause
+        return f"({where_clause}) AND {sample_condition}" if where_clause else sample_condition
+
+    def _sample_condition(self, db_side: str) -> str:
+        """主键哈希抽样条件（按该端数据库语法生成），未启用抽样时返回空字符串"""
+        from core.compare_engine.sampling import get_sample_settings, build_sample_condition
+        from utils.data_type_utils import metadata_kind
+
+        sample_settings = get_sample_settings(self.config)
+        if not sample_settings or not self._src_pk_cache:
+            return ""
+        buckets, bucket = sample_settings
+        self.compare_result['sample_buckets'] = buckets
+        self.compare_result['sample_bucket'] = bucket
+
+        # 两端主键都是整数时直接取模，否则按主键文本哈希
+        key_columns = list(self._src_pk_cache)
+        numeric_key = len(key_columns) == 1
+        for metadata in (self._src_metadata_cache, self._tgt_metadata_cache):
+            if metadata is None:
+                # 未获取元数据的一端（如选择引擎时）不参与判断
+                continue
+            col_info = next((c for c in metadata if c['name'] == key_columns[0]), None)
+            if col_info is None or metadata_kind(col_info) != 'int':
+                numeric_key = False
+        return build_sample_condition(self.config[f'{db_side}_db_type'].lower(), key_columns, numeric_key,
+                                      buckets, bucket)
+
+    def _record_sample_estimate(self):
+        """抽样比对时根据样本结果估算全表不一致率，写入compare_result"""
+        from config.settings import SAMPLE_CONFIDENCE
+        from core.compare_engine.sampling import get_sample_settings, estimate_mismatch_rate
+
+        sample_settings = get_sample_settings(self.config)
+        if not sample_settings:
+            return
+        buckets, bucket = sample_settings
+        estimate = estimate_mismatch_rate(
+            self.compare_result.get('diff_cnt', 0),
+            max(self.compare_result.get('src_cnt', 0), self.compare_result.get('tgt_cnt', 0)),
+            buckets,
+            self.config.get('sample_confidence', SAMPLE_CONFIDENCE)
+        )
+        estimate.update({'buckets': buckets, 'bucket': bucket})
+        self.compare_result['sample_estimate'] = estimate
+        self.compare_result['compare_report'] = (
+            f"{self.compare_result.get('compare_report', '')}\n"
+            f"抽样比对：第{bucket}桶/共{buckets}桶，样本{estimate['sample_rows']}条，差异{estimate['sample_diff_cnt']}条，"
+            f"估算不一致率{estimate['mismatch_rate']:.4%}"
+            f"（{estimate['confidence']:.0%}置信区间 {estimate['ci_low']:.4%} ~ {estimate['ci_high']:.4%}）"
+        )
+
+    def _incremental_where_clause(self, db_side: str = 'src') -> str:
+        """增量比对的更新时间过滤条件（按该端数据库语法生成），全量比对时返回空字符串"""
         is_incremental = self.config.get('incremental', False)
         if not is_incremental or not self.config.get('update_time_str'):
             return ""
 
-        # 增量比对：根据更新时间字段
-        incremental_days = self.config.get('incremental_days', 1)
-        end_time = datetime.now()
-        start_time = end_time - timedelta(days=incremental_days)
-
-        # 记录检查范围
-        self.compare_result[
-            'check_range'] = f"[{start_time.strftime('%Y-%m-%d %H:%M:%S')},{end_time.strftime('%Y-%m-%d %H:%M:%S')})"
+        start_time, end_time = self._incremental_window()
+        start_str = start_time.strftime('%Y-%m-%d %H:%M:%S')
+        end_str = end_time.strftime('%Y-%m-%d %H:%M:%S')
 
         update_col = self.config['update_time_str']
-        db_type = self.config['src_db_type'].lower()
+        db_type = self.config[f'{db_side}_db_type'].lower()
 
         # 不同数据库的时间格式处理
         if db_type == 'mysql':
-            return f"{update_col} >= '{start_time.strftime('%Y-%m-%d %H:%M:%S')}' AND {update_col} < '{end_time.strftime('%Y-%m-%d %H:%M:%S')}'"
+            return f"{update_col} >= '{start_str}' AND {update_col} < '{end_str}'"
         elif db_type == 'oracle':
-            return f"{update_col} >= TO_DATE('{start_time.strftime('%Y-%m-%d %H:%M:%S')}', 'YYYY-MM-DD HH24:MI:SS') AND {update_col} < TO_DATE('{end_time.strftime('%Y-%m-%d %H:%M:%S')}', 'YYYY-MM-DD HH24:MI:SS')"
+            return f"{update_col} >= TO_DATE('{start_str}', 'YYYY-MM-DD HH24:MI:SS') AND {update_col} < TO_DATE('{end_str}', 'YYYY-MM-DD HH24:MI:SS')"
         elif db_type == 'sqlserver':
-            return f"{update_col} >= '{start_time.strftime('%Y-%m-%d %H:%M:%S')}' AND {update_col} < '{end_time.strftime('%Y-%m-%d %H:%M:%S')}'"
+            return f"{update_col} >= '{start_str}' AND {update_col} < '{end_str}'"
         elif db_type == 'postgresql':
-            return f"{update_col} >= '{start_time.strftime('%Y-%m-%d %H:%M:%S')}' AND {update_col} < '{end_time.strftime('%Y-%m-%d %H:%M:%S')}'"
+            return f"{update_col} >= '{start_str}' AND {update_col} < '{end_str}'"
 
         return ""
 
+    def _incremental_window(self) -> Tuple[datetime, datetime]:
+        """本次增量比对的时间窗口[start, end)，每次比对只计算一次，各端及各阶段使用同一窗口"""
+        if self._incremental_window_cache is None:
+            self._incremental_window_cache = self._compute_incremental_window()
+
+        # 记录检查范围
+        start_time, end_time = self._incremental_window_cache
+        self.compare_result[
+            'check_range'] = f"[{start_time.strftime('%Y-%m-%d %H:%M:%S')},{end_time.strftime('%Y-%m-%d %H:%M:%S')})"
+        return self._incremental_window_cache
+
+    def _compute_incremental_window(self) -> Tuple[datetime, datetime]:
+        """计算增量窗口
+
+        启用水位线时从上次成功比对的窗口结束时间开始（无记录时按incremental_days），
+        结束时间为当前时间减去安全延迟。抽样比对各次比对的桶不同，不使用水位线。
+        """
+        from config.settings import INCREMENTAL_WATERMARK, INCREMENTAL_SAFETY_LAG_SECONDS
+        from core.compare_engine.sampling import get_sample_settings
+
+        use_watermark = self.config.get('incremental_watermark', INCREMENTAL_WATERMARK) \
+            and not get_sample_settings(self.config)
+        safety_lag = self.config.get('incremental_safety_lag_seconds', INCREMENTAL_SAFETY_LAG_SECONDS) \
+            if use_watermark else 0
+
+        end_time = (datetime.now() - timedelta(seconds=safety_lag)).replace(microsecond=0)
+        start_time = end_time - timedelta(days=self.config.get('incremental_days', 1))
+        if use_watermark:
+            from utils.watermark_store import load_watermark
+            watermark = load_watermark(self.config)
+            if watermark is not None:
+                # 距上次比对不足安全延迟时窗口为空，水位线不回退
+                start_time = watermark
+                end_time = max(end_time, watermark)
+            self._pending_watermark = end_time
+        return start_time, end_time
+
+    def _open_checkpoint(self):
+        """打开比对断点，续比时沿用中断运行的增量窗口（已完成区间的结果才能合并）"""
+        if not self.supports_checkpoint:
+            return
+        from utils.checkpoint_store import open_checkpoint
+        from core.compare_engine.sampling import get_sample_settings
+
+        is_incremental = bool(self.config.get('incremental')) and bool(self.config.get('update_time_str'))
+        signature = {
+            'engine': type(self).__name__,
+            'columns': self.get_compare_columns(),
+            'incremental': is_incremental,
+            'sample': get_sample_settings(self.config)
+        }
+        self._checkpoint = open_checkpoint(self.config, signature)
+        state = self._checkpoint.state
+        if is_incremental:
+            if self._checkpoint.resumed and state.get('incremental_window'):
+                self._incremental_window_cache = state['incremental_window']
+                self._pending_watermark = state.get('pending_watermark')
+            state['incremental_window'] = self._incremental_window()
+            state['pending_watermark'] = self._pending_watermark
+        self.compare_result['checkpoint_run_id'] = self._checkpoint.run_id
+        self.compare_result['checkpoint_resumed'] = self._checkpoint.resumed
+
+    def _advance_watermark(self):
+        """比对成功后把水位线推进到本次窗口的结束时间"""
+        if self._pending_watermark is None:
+            return
+        from utils.watermark_store import save_watermark
+        logger = logging.getLogger(__name__)
+        try:
+            save_watermark(self.config, self._pending_watermark)
+            logger.info(f"增量水位线推进至{self._pending_watermark.strftime('%Y-%m-%d %H:%M:%S')}")
+        except Exception as e:
+            # 水位线未推进时下次从原水位线重新比对，不影响本次比对结果
+            logger.warning(f"保存增量水位线失败: {str(e)}")
+
     def get_compare_columns(self) -> Dict[str, List[str]]:
         """获取比对字段（使用缓存，避免重复查询）"""
         # 如果已有缓存，直接返回
@@ -199,6 +338,413 @@ class BaseCompareEngine(ABC):
 
         return columns
 
+    def get_column_dtypes(self, db_side: str) -> Dict[str, str]:
+        """根据一端的元数据缓存确定构造DataFrame时的列类型"""
+        from utils.data_type_utils import build_dtype_map
+        return build_dtype_map(self._src_metadata_cache if db_side == 'src' else self._tgt_metadata_cache)
+
+    def _use_pg_copy(self, db_side: str) -> bool:
+        """该端是否使用PostgreSQL COPY批量导出（大表加载时）"""
+        from config.settings import PG_COPY_EXTRACT
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        return self.config[f'{db_side}_db_type'].lower() == 'postgresql' \
+            and self.config.get('pg_copy_extract', PG_COPY_EXTRACT) and hasattr(adapter, 'copy_data')
+
+    def _iter_copy_frames(self, db_side: str, columns: List[str], where_clause: str,
+                          chunk_size: int) -> Iterator[pd.DataFrame]:
+        """通过COPY导出一端数据，逐块返回按元数据类型转换后的DataFrame"""
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        metadata = self._src_metadata_cache if db_side == 'src' else self._tgt_metadata_cache
+        column_types = {c['name']: c['type'] for c in metadata or []}
+        return adapter.copy_data(self.config[f'{db_side}_db_name'], self.config[f'{db_side}_table_name'],
+                                 columns, where_clause, chunk_size, column_types)
+
+    def _use_oracle_rowid(self, db_side: str) -> bool:
+        """该端是否按ROWID区间多会话并行读取Oracle大表
+
+        需显式配置oracle_rowid_parallel大于1，且统计信息估算的记录数不少于ORACLE_ROWID_MIN_ROWS
+        （远大于分块大小的表才值得占用额外会话）。
+        """
+        from config.settings import ORACLE_ROWID_PARALLEL, ORACLE_ROWID_MIN_ROWS
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        if self.config[f'{db_side}_db_type'].lower() != 'oracle' \
+                or self.config.get('oracle_rowid_parallel', ORACLE_ROWID_PARALLEL) <= 1 \
+                or not hasattr(adapter, 'get_rowid_ranges'):
+            return False
+        try:
+            stats = adapter.get_table_stats(self.config[f'{db_side}_db_name'], self.config[f'{db_side}_table_name'])
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"获取表统计信息失败，不使用ROWID并行读取: {str(e)}")
+            return False
+        return bool(stats) and stats['row_count'] >= self.config.get('oracle_rowid_min_rows', ORACLE_ROWID_MIN_ROWS)
+
+    def _iter_rowid_frames(self, db_side: str, columns: List[str], where_clause: str,
+                           chunk_size: int) -> Optional[Iterator[pd.DataFrame]]:
+        """按ROWID区间多会话并行读取Oracle一端数据（不保证行序），无法切分区间时返回None"""
+        from config.settings import ORACLE_ROWID_PARALLEL, ORACLE_ROWID_CHUNKS_PER_SESSION
+        logger = logging.getLogger(__name__)
+
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        db_name = self.config[f'{db_side}_db_name']
+        table_name = self.config[f'{db_side}_table_name']
+        parallel = self.config.get('oracle_rowid_parallel', ORACLE_ROWID_PARALLEL)
+
+        # 区间数多于会话数，各会话负载更均衡
+        ranges = adapter.get_rowid_ranges(db_name, table_name, parallel * ORACLE_ROWID_CHUNKS_PER_SESSION)
+        if not ranges:
+            return None
+        logger.info(f"{db_name}.{table_name}按ROWID切分为{len(ranges)}个区间，{min(parallel, len(ranges))}个会话并行读取")
+
+        def fetch(session, rowid_range):
+            return session.stream_rowid_range(db_name, table_name, columns, rowid_range, where_clause, chunk_size)
+
+        return self._iter_parallel_frames(db_side, ranges, fetch, parallel)
+
+    def _iter_parallel_frames(self, db_side: str, tasks: List[Any], fetch, parallel: int,
+                              ordered: bool = False) -> Iterator[pd.DataFrame]:
+        """多个连接池会话并行执行读取任务，逐块返回DataFrame
+
+        每个任务在独立会话中执行fetch(会话, 任务)得到数据批次（TupleRows、dict列表或DataFrame）。
+        同一数据库服务器上同时读取的会话数受PARALLEL_EXTRACT_PER_HOST限制（所有比对任务共享），
+        会话因队列已满等待调用方读取时让出名额，避免占着名额的会话与等待名额的会话互相等待；
+        先获取连接再获取名额，连接池已满时定时检查是否已停止，调用方提前结束时不会一直等待连接。
+        ordered为False时按完成先后返回，各会话经有界队列交给调用方，内存中最多缓存parallel * 2块；
+        ordered为True时按任务顺序返回，每个任务一个有界队列（最多缓存_ORDERED_QUEUE_CHUNKS块），
+        只提前启动parallel个任务，内存中最多缓存约parallel * _ORDERED_QUEUE_CHUNKS块；
+        各任务按顺序获取连接，保证正在被读取的任务不会等待后面已阻塞的任务归还连接。
+        任一任务失败时抛出其异常，调用方提前结束时通知各会话停止并归还连接。
+        """
+        import queue
+        from concurrent.futures import ThreadPoolExecutor
+        from utils.data_type_utils import rows_to_frame
+        from utils.db_connection_pool import get_pooled_connection, return_pooled_connection, get_host_extract_slots
+
+        side_config = self._side_db_config(db_side)
+        host_slots = get_host_extract_slots(side_config)
+        dtypes = self.get_column_dtypes(db_side)
+        stop = threading.Event()
+        task_done = object()
+        if ordered:
+            queues = [queue.Queue(maxsize=self._ORDERED_QUEUE_CHUNKS) for _ in tasks]
+            # 任务获取到连接（或结束）后置位，下一个任务才获取连接
+            connected = [threading.Event() for _ in tasks]
+        else:
+            queues = [queue.Queue(maxsize=parallel * 2)] * len(tasks)
+            connected = None
+
+        def wait_for(acquire) -> bool:
+            while not acquire(timeout=0.5):
+                if stop.is_set():
+                    return False
+            return True
+
+        def put(index: int, item) -> bool:
+            while not stop.is_set():
+                try:
+                    queues[index].put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def connect():
+            while not stop.is_set():
+                try:
+                    return get_pooled_connection(side_config, timeout=0.5)
+                except TimeoutError:
+                    continue
+            return None
+
+        def run_task(index: int):
+            holding_slot = False
+            session = None
+            try:
+                if connected is not None and index > 0 and not wait_for(connected[index - 1].wait):
+                    return
+                session = connect()
+                if session is None:
+                    return
+                if connected is not None:
+                    connected[index].set()
+                if not wait_for(host_slots.acquire):
+                    return
+                holding_slot = True
+                batches = fetch(session, tasks[index])
+                try:
+                    for batch in batches:
+                        if not len(batch):
+                            continue
+                        frame = batch if isinstance(batch, pd.DataFrame) else rows_to_frame(batch, dtypes=dtypes)
+                        if queues[index].full():
+                            # 等待调用方读取期间不占服务器读取名额，继续读取前重新获取
+                            host_slots.release()
+                            holding_slot = False
+                        if not put(index, frame):
+                            return
+                        if not holding_slot:
+                            if not wait_for(host_slots.acquire):
+                                return
+                            holding_slot = True
+                finally:
+                    if hasattr(batches, 'close'):
+                        batches.close()
+            except Exception as e:
+                put(index, e)
+            finally:
+                if connected is not None:
+                    connected[index].set()
+                if session is not None:
+                    return_pooled_connection(side_config, session)
+                if holding_slot:
+                    host_slots.release()
+                put(index, task_done)
+
+        def drain(index: int, task_count: int) -> Iterator[pd.DataFrame]:
+            finished = 0
+            while finished < task_count:
+                item = queues[index].get()
+                if item is task_done:
+                    finished += 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+
+        workers = min(parallel, len(tasks))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{db_side}-extract')
+        try:
+            if ordered:
+                for index in range(workers):
+                    executor.submit(run_task, index)
+                for index in range(len(tasks)):
+                    yield from drain(index, 1)
+                    # 读完一个任务再启动下一个，保持最多parallel个任务在读取或缓存
+                    if index + workers < len(tasks):
+                        executor.submit(run_task, index + workers)
+            else:
+                for index in range(len(tasks)):
+                    executor.submit(run_task, index)
+                yield from drain(0, len(tasks))
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _row_values(row) -> list:
+        """按查询字段顺序取出一行的值（兼容字典游标和元组游标）"""
+        return list(row.values()) if hasattr(row, 'values') else list(row)
+
+    @staticmethod
+    def _to_int_bound(value) -> Optional[int]:
+        """将主键边界转换为整数，非整数主键返回None"""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, numbers.Integral):
+            return int(value)
+        if isinstance(value, (float, Decimal)) and value == int(value):
+            return int(value)
+        return None
+
+    def _parallel_extract_sessions(self, db_side: str) -> int:
+        """按主键区间并行读取时一端的会话数
+
+        不超过该端连接池当前空闲的连接数，两端共用一个连接池时（如同一数据库的表与备份表）各占一半。
+        """
+        from config.settings import PARALLEL_EXTRACT_SESSIONS
+        from utils.db_connection_pool import get_free_connections
+
+        parallel = self.config.get('parallel_extract_sessions', PARALLEL_EXTRACT_SESSIONS)
+        free = get_free_connections(self._side_db_config(db_side))
+        if free is None:
+            return parallel
+        if self._sides_share_pool():
+            free //= 2
+        return min(parallel, free)
+
+    def _sides_share_pool(self) -> bool:
+        """源端和目标端是否使用同一个连接池"""
+        from utils.db_connection_pool import get_pool_key
+        return get_pool_key(self._side_db_config('src')) == get_pool_key(self._side_db_config('tgt'))
+
+    def _pk_split_ranges(self, db_side: str, where_clause: str) -> Optional[List[Tuple[int, int]]]:
+        """按单列整数主键把一端切分为每段约records_per_thread条的区间[lo, hi)
+
+        主键范围和记录数由同一条查询按过滤条件精确统计（不使用统计信息估算值），
+        按主键取值范围等宽切分（主键分布不均时各区间记录数会有差异）。
+        联合主键、非整数主键或记录数不超过records_per_thread时返回None。
+        """
+        from config.settings import RECORDS_PER_THREAD
+
+        records_per_thread = self.config.get('records_per_thread', RECORDS_PER_THREAD)
+        if not records_per_thread or len(self._src_pk_cache or []) != 1:
+            return None
+
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        split_column = self._src_pk_cache[0]
+        sql = (f"SELECT MIN({split_column}) AS min_pk, MAX({split_column}) AS max_pk, COUNT(*) AS row_cnt "
+               f"FROM {self.config[f'{db_side}_db_name']}.{self.config[f'{db_side}_table_name']}")
+        if where_clause:
+            sql += f" WHERE {where_clause}"
+        rows = adapter.query(sql)
+        if not rows:
+            return None
+        min_pk, max_pk, row_cnt = self._row_values(rows[0])[:3]
+        range_lo, range_hi = self._to_int_bound(min_pk), self._to_int_bound(max_pk)
+        if range_lo is None or range_hi is None or not row_cnt or int(row_cnt) <= records_per_thread:
+            return None
+
+        key_span = range_hi - range_lo + 1
+        range_count = math.ceil(int(row_cnt) / records_per_thread)
+        step = max(1, math.ceil(key_span / range_count))
+        return [(lo, min(lo + step, range_hi + 1)) for lo in range(range_lo, range_hi + 1, step)]
+
+    def _pk_range_where(self, pk_range: Tuple[int, int], where_clause: str) -> str:
+        """主键区间[lo, hi)与原过滤条件组合的WHERE条件"""
+        split_column = self._src_pk_cache[0]
+        condition = f"{split_column} >= {pk_range[0]} AND {split_column} < {pk_range[1]}"
+        return f"{condition} AND ({where_clause})" if where_clause else condition
+
+    def _iter_pk_range_frames(self, db_side: str, columns: List[str], where_clause: str,
+                              chunk_size: int) -> Optional[Iterator[pd.DataFrame]]:
+        """按主键区间多会话并行读取一端数据，按区间顺序返回（区间内不排序），不适用时返回None
+
+        PostgreSQL每个区间使用COPY导出，其他数据库使用流式游标。
+        """
+        logger = logging.getLogger(__name__)
+
+        parallel = self._parallel_extract_sessions(db_side)
+        if parallel <= 1:
+            return None
+        ranges = self._pk_split_ranges(db_side, where_clause)
+        if not ranges or len(ranges) < 2:
+            return None
+        db_name = self.config[f'{db_side}_db_name']
+        table_name = self.config[f'{db_side}_table_name']
+        logger.info(f"{db_name}.{table_name}按主键切分为{len(ranges)}个区间，{min(parallel, len(ranges))}个会话并行读取")
+
+        use_copy = self._use_pg_copy(db_side)
+        metadata = self._src_metadata_cache if db_side == 'src' else self._tgt_metadata_cache
+        column_types = {c['name']: c['type'] for c in metadata or []}
+
+        def fetch(session, pk_range):
+            range_where = self._pk_range_where(pk_range, where_clause)
+            if use_copy:
+                return session.copy_data(db_name, table_name, columns, range_where, chunk_size, column_types)
+            return session.stream_data(db_name, table_name, columns, range_where, chunk_size)
+
+        return self._iter_parallel_frames(db_side, ranges, fetch, parallel, ordered=True)
+
+    def _iter_keyset_chunks(self, db_side: str, columns: List[str], where_clause: str,
+                            chunk_size: int, start_key: Tuple = None, adapter=None) -> Iterator[List[Dict]]:
+        """按主键顺序键集分页读取一端数据（WHERE pk > last_pk ORDER BY pk），逐块返回
+
+        分页键使用完整主键，调用方需保证columns包含所有主键列。指定start_key时从该主键之后开始读取，
+        指定adapter时使用该连接读取（默认为该端的连接）。
+        """
+        adapter = adapter or (self.src_adapter if db_side == 'src' else self.tgt_adapter)
+        page_keys = list(self._src_pk_cache)
+        last_key = start_key
+        while True:
+            chunk_data = adapter.query_data_keyset(
+                self.config[f'{db_side}_db_name'],
+                self.config[f'{db_side}_table_name'],
+                columns,
+                page_keys,
+                last_key,
+                where_clause,
+                chunk_size
+            )
+            if not chunk_data:
+                return
+            yield chunk_data
+            if len(chunk_data) < chunk_size:
+                return
+            last_key = tuple(chunk_data[-1][k] for k in page_keys)
+
+    def profile_precheck(self) -> bool:
+        """比对前在两端计算聚合概要，完全一致时直接记录比对成功（不加载数据）
+
+        同类型数据库的概要包含行哈希，一致时记为match。不同类型数据库没有行哈希，
+        行之间交换取值等变化不影响概要，默认不做预检查；配置profile_precheck_cross_db开启后
+        一致时记为profile_match（未逐行校验），与逐行校验的一致结果区分。
+
+        Returns:
+            True表示概要一致、已写入比对结果；False表示需要继续完整比对
+        """
+        from config.settings import PROFILE_PRECHECK, PROFILE_PRECHECK_CROSS_DB
+        from core.compare_engine.profile_check import (
+            profile_column_kinds, build_profile_query, parse_profile, find_profile_difference
+        )
+        from utils.diff_utils import empty_diff_records
+        logger = logging.getLogger(__name__)
+
+        if not self.config.get('profile_precheck', PROFILE_PRECHECK):
+            return False
+
+        try:
+            columns = self.get_compare_columns()
+            compare_columns = list(dict.fromkeys(
+                columns['key_columns'] + columns['update_column'] + columns['extra_columns']))
+            column_kinds = profile_column_kinds(compare_columns, self._src_metadata_cache, self._tgt_metadata_cache)
+
+            # 行哈希只在同类型数据库之间可比；没有行哈希时，非数值/时间字段的内容变化无法从聚合值发现
+            src_db_type = self.config['src_db_type'].lower()
+            with_row_hash = src_db_type == self.config['tgt_db_type'].lower()
+            if not with_row_hash and not self.config.get('profile_precheck_cross_db', PROFILE_PRECHECK_CROSS_DB):
+                logger.info("两端数据库类型不同，聚合概要不含行哈希，跳过聚合概要预检查")
+                self.compare_result['profile_precheck'] = 'skip'
+                return False
+            if not with_row_hash and any(kind == 'other' for kind in column_kinds.values()):
+                logger.info("两端数据库类型不同且存在无法聚合校验的字段，跳过聚合概要预检查")
+                self.compare_result['profile_precheck'] = 'skip'
+                return False
+
+            profiles = {}
+            for db_side in ('src', 'tgt'):
+                adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+                metadata = self._src_metadata_cache if db_side == 'src' else self._tgt_metadata_cache
+                sql = build_profile_query(
+                    self.config[f'{db_side}_db_type'].lower(),
+                    f"{self.config[f'{db_side}_db_name']}.{self.config[f'{db_side}_table_name']}",
+                    column_kinds, self.get_where_clause(db_side), with_row_hash,
+                    {c['name']: c['type'] for c in metadata or []}
+                )
+                profiles[db_side] = parse_profile(adapter.query(sql))
+        except Exception as e:
+            logger.warning(f"聚合概要预检查失败，执行完整比对: {str(e)}")
+            self.compare_result['profile_precheck'] = 'skip'
+            return False
+
+        if profiles['src'] is None or profiles['tgt'] is None:
+            self.compare_result['profile_precheck'] = 'skip'
+            return False
+
+        difference = find_profile_difference(profiles['src'], profiles['tgt'], column_kinds)
+        if difference:
+            logger.info(f"聚合概要不一致（{difference}），执行完整比对")
+            self.compare_result['profile_precheck'] = 'differ'
+            return False
+
+        record_count = int(profiles['src'][0])
+        self.compare_result.update({
+            'src_cnt': record_count,
+            'tgt_cnt': record_count,
+            'diff_cnt': 0,
+            'matching_rate': 1.0,
+            'diff_records': empty_diff_records(),
+            'profile_precheck': 'match' if with_row_hash else 'profile_match',
+            'compare_report': (
+                f"聚合概要一致：记录数{record_count}，校验{len(column_kinds)}个字段"
+                f"（{'含' if with_row_hash else '不含'}行哈希），跳过逐行比对"
+            )
+        })
+        if not with_row_hash:
+            # 只有聚合值一致，不能等同于逐行校验一致
+            self.compare_result['compare_status'] = 'success'
+            self.compare_result['compare_msg'] = '聚合概要一致（不含行哈希，未逐行校验）'
+        logger.info(self.compare_result['compare_report'])
+        return True
+
     @abstractmethod
     def load_data(self):
         """加载源端和目标端数据"""
@@ -223,11 +769,26 @@ class BaseCompareEngine(ABC):
             # 初始化适配器
             self.init_adapters()
 
-            # 加载数据
-            self.load_data()
+            # 打开比对断点（--resume时从中断处继续）
+            self._open_checkpoint()
+
+            # 聚合概要一致时无需拉取数据
+            if not self.profile_precheck():
+                # 加载数据
+                self.load_data()
 
-            # 执行比对
-            self.compare()
+                # 执行比对
+                self.compare()
+
+            # 抽样比对时估算全表不一致率
+            self._record_sample_estimate()
+
+            # 比对成功才推进增量水位线，失败时下次从原水位线重新比对
+            self._advance_watermark()
+
+            # 比对完成后删除断点，失败时保留供--resume继续
+            if self._checkpoint is not None:
+                self._checkpoint.remove()
 
         except Exception as e:
             self.compare_result['compare_status'] = 'fail'
@@ -252,45 +813,41 @@ class BaseCompareEngine(ABC):
             self.generate_report()
 
             # 关闭连接（归还到连接池）
+            from utils.db_connection_pool import return_pooled_connection
             if self.src_adapter:
-                from utils.db_connection_pool import return_pooled_connection
-                src_config = {
-                    'db_type': self.config['src_db_type'],
-                    'host': self.config['src_host'],
-                    'port': self.config['src_port'],
-                    'user': self.config['src_username'],
-                    'password': self.config['src_password'],
-                    'database': self.config['src_db_name']
-                }
-                return_pooled_connection(src_config, self.src_adapter)
+                return_pooled_connection(self._side_db_config('src'), self.src_adapter)
             if self.tgt_adapter:
-                from utils.db_connection_pool import return_pooled_connection
-                tgt_config = {
-                    'db_type': self.config['tgt_db_type'],
-                    'host': self.config['tgt_host'],
-                    'port': self.config['tgt_port'],
-                    'user': self.config['tgt_username'],
-                    'password': self.config['tgt_password'],
-                    'database': self.config['tgt_db_name']
-                }
-                return_pooled_connection(tgt_config, self.tgt_adapter)
+                return_pooled_connection(self._side_db_config('tgt'), self.tgt_adapter)
         return self.compare_result
 
 
 def get_compare_engine(config: Dict[str, Any]) -> BaseCompareEngine:
     """根据数据量选择合适的比对引擎"""
     from config.settings import ENGINE_STRATEGY, MAX_RECORDS_THRESHOLD
+    from core.compare_engine.sampling import get_sample_settings
 
     # 如果指定了引擎类型，直接使用
     if ENGINE_STRATEGY != 'auto':
         if ENGINE_STRATEGY == 'pandas':
             from core.compare_engine.pandas_engine import PandasCompareEngine
             return PandasCompareEngine(config)
+        elif ENGINE_STRATEGY == 'pandas_hash':
+            from core.compare_engine.hash_engine import HashCompareEngine
+            return HashCompareEngine(config)
+        elif ENGINE_STRATEGY == 'checksum':
+            from core.compare_engine.checksum_engine import ChecksumCompareEngine
+            return ChecksumCompareEngine(config)
+        elif ENGINE_STRATEGY == 'streaming':
+            from core.compare_engine.streaming_engine import StreamingCompareEngine
+            return StreamingCompareEngine(config)
+        elif ENGINE_STRATEGY == 'duckdb':
+            from core.compare_engine.duckdb_engine import DuckDBCompareEngine
+            return DuckDBCompareEngine(config)
         elif ENGINE_STRATEGY in ['spark_local', 'spark_cluster']:
             from core.compare_engine.spark_engine import SparkCompareEngine
             return SparkCompareEngine(config, ENGINE_STRATEGY)
 
-    # 自动选择：先获取数据量（使用连接池）
+    # 自动选择：优先使用数据字典统计信息估算数据量（使用连接池）
     adapter_config = {
         'db_type': config['src_db_type'],
         'host': config['src_host'],
@@ -303,25 +860,112 @@ def get_compare_engine(config: Dict[str, Any]) -> BaseCompareEngine:
     adapter = get_pooled_connection(adapter_config)
 
     try:
+        is_incremental = bool(config.get('incremental') and config.get('update_time_str'))
+        sample_settings = get_sample_settings(config)
         where_clause = ""
-        if config.get('incremental') and config.get('update_time_str'):
-            where_clause = BaseCompareEngine(config).get_where_clause()
-
-        record_count = adapter.get_table_count(
-            config['src_db_name'],
-            config['src_table_name'],
-            where_clause
-        )
+        if is_incremental or sample_settings:
+            # BaseCompareEngine是抽象类，借用Pandas引擎生成WHERE子句
+            from core.compare_engine.pandas_engine import PandasCompareEngine
+            probe = PandasCompareEngine(config)
+            if sample_settings:
+                # 抽样条件依赖主键和主键类型
+                probe._src_pk_cache = adapter.get_primary_keys(config['src_db_name'], config['src_table_name'])
+                probe._src_metadata_cache = adapter.get_table_metadata(config['src_db_name'], config['src_table_name'])
+            where_clause = probe.get_where_clause()
+
+        stats = _get_table_stats_cached(adapter, config)
+        # 增量比对时统计信息是全表数据量，只在全表都不超过阈值时可直接使用；抽样时按桶数折算
+        if stats and (not is_incremental or stats['row_count'] < MAX_RECORDS_THRESHOLD):
+            record_count = stats['row_count']
+            if sample_settings:
+                record_count = math.ceil(record_count / sample_settings[0])
+            logging.getLogger(__name__).info(f"根据统计信息估算记录数：{record_count}")
+        else:
+            record_count = adapter.get_table_count(
+                config['src_db_name'],
+                config['src_table_name'],
+                where_clause
+            )
+        row_bytes = _estimate_loaded_row_bytes(adapter, config, stats)
     finally:
         return_pooled_connection(adapter_config, adapter)
 
+    # 记录数（可能是统计信息估算值）只用于选择引擎，不传给引擎决定加载方式
+    # 按字段类型估算Pandas峰值内存，与本任务的内存预算比较（无法估算时按记录数选择）
+    from utils.memory_planner import estimate_pandas_peak_bytes, get_task_memory_budget
+    if row_bytes:
+        peak_bytes = estimate_pandas_peak_bytes(record_count, row_bytes)
+        budget_bytes = get_task_memory_budget(config)
+        use_pandas = peak_bytes <= budget_bytes and record_count < MAX_RECORDS_THRESHOLD * 10
+        logging.getLogger(__name__).info(
+            f"Pandas比对预计占用内存{peak_bytes / 1024 ** 2:.0f}MB，本任务内存预算{budget_bytes / 1024 ** 2:.0f}MB")
+    else:
+        use_pandas = record_count < MAX_RECORDS_THRESHOLD
+
     # 根据数据量选择引擎
-    if record_count < MAX_RECORDS_THRESHOLD:  # 50万以下用Pandas
+    if use_pandas:  # 内存预算内用Pandas
         from core.compare_engine.pandas_engine import PandasCompareEngine
         return PandasCompareEngine(config)
-    elif MAX_RECORDS_THRESHOLD <= record_count < MAX_RECORDS_THRESHOLD * 10:  # 50万-500万用Spark本地模式
+    elif record_count < MAX_RECORDS_THRESHOLD * 10:  # 中等数据量优先用DuckDB，未安装时用Spark本地模式
+        if importlib.util.find_spec('duckdb') is not None:
+            from core.compare_engine.duckdb_engine import DuckDBCompareEngine
+            return DuckDBCompareEngine(config)
+        logging.getLogger(__name__).warning("未安装duckdb，使用Spark本地模式")
         from core.compare_engine.spark_engine import SparkCompareEngine
         return SparkCompareEngine(config, 'spark_local')
     else:  # 500万以上用Spark集群模式
         from core.compare_engine.spark_engine import SparkCompareEngine
         return SparkCompareEngine(config, 'spark_cluster')
+
+
+def _estimate_loaded_row_bytes(adapter, config: Dict[str, Any], stats: Optional[Dict[str, Any]]) -> Optional[float]:
+    """按Pandas引擎实际加载的字段（主键、更新时间、支持类型的额外字段）估算每行内存"""
+    from config.settings import SUPPORT_COLUMN_TYPE, EXTRA_COLUMN_FLAG
+    from utils.memory_planner import estimate_row_bytes
+
+    avg_row_bytes = stats['avg_row_bytes'] if stats else None
+    try:
+        metadata = adapter.get_table_metadata(config['src_db_name'], config['src_table_name']) or []
+        pk_columns = adapter.get_primary_keys(config['src_db_name'], config['src_table_name']) or []
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"获取表元数据失败，无法按字段估算内存: {str(e)}")
+        metadata, pk_columns = [], []
+
+    loaded = set(pk_columns)
+    if config.get('update_time_str'):
+        loaded.add(config['update_time_str'])
+    supported_types = SUPPORT_COLUMN_TYPE.get(config.get('src_db_type', '').lower(), set())
+    column_types = []
+    for col_info in metadata:
+        col_type = col_info['type'].lower()
+        if col_info['name'] in loaded or (EXTRA_COLUMN_FLAG and any(st in col_type for st in supported_types)):
+            column_types.append(col_type)
+    return estimate_row_bytes(column_types, avg_row_bytes, len(metadata))
+
+
+# 表统计信息缓存：{表标识: (缓存时间戳, 统计信息)}
+_table_stats_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+_table_stats_lock = threading.Lock()
+
+
+def _get_table_stats_cached(adapter, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """获取源端表统计信息（按表缓存TABLE_STATS_CACHE_TTL秒，查询失败视为无统计信息）"""
+    from config.settings import TABLE_STATS_CACHE_TTL
+
+    cache_key = (f"{config['src_db_type']}:{config['src_host']}:{config['src_port']}:"
+                 f"{config['src_db_name']}.{config['src_table_name']}")
+    now = time.time()
+    with _table_stats_lock:
+        cached = _table_stats_cache.get(cache_key)
+    if cached and now - cached[0] < TABLE_STATS_CACHE_TTL:
+        return cached[1]
+
+    try:
+        stats = adapter.get_table_stats(config['src_db_name'], config['src_table_name'])
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"获取表统计信息失败，使用COUNT计数: {str(e)}")
+        stats = None
+
+    with _table_stats_lock:
+        _table_stats_cache[cache_key] = (now, stats)
+    return stats
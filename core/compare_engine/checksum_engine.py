@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+import logging
+import math
+import sys
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+from core.compare_engine.base_engine import BaseCompareEngine
+from utils.diff_utils import empty_diff_records, merge_diff_records, diff_dataframes
+
+logger = logging.getLogger(__name__)
+
+# 行哈希中NULL值的占位符
+NULL_MARKER = '#NULL#'
+
+
+def _oracle_hash_text(column: str, column_type: Optional[str]) -> str:
+    """Oracle字段转为文本的表达式（显式格式，不依赖会话的NLS_DATE_FORMAT等设置）"""
+    type_name = (column_type or '').upper()
+    base_type = type_name.split('(')[0].strip()
+    if base_type == 'DATE':
+        # 默认NLS_DATE_FORMAT不含时间部分，只改时分秒的记录会得到相同的哈希
+        return f"TO_CHAR({column}, 'YYYY-MM-DD HH24:MI:SS')"
+    if base_type == 'TIMESTAMP':
+        value = f"SYS_EXTRACT_UTC({column})" if 'TIME ZONE' in type_name else column
+        return f"TO_CHAR({value}, 'YYYY-MM-DD HH24:MI:SS.FF9')"
+    if base_type in ('NUMBER', 'FLOAT', 'INTEGER', 'BINARY_FLOAT', 'BINARY_DOUBLE'):
+        return f"TO_CHAR({column}, 'TM9', 'NLS_NUMERIC_CHARACTERS=''.,''')"
+    return f"TO_CHAR({column})"
+
+
+def build_row_hash_sum_expr(db_type: str, columns: List[str], column_types: Dict[str, str] = None) -> str:
+    """生成与顺序无关的行哈希聚合表达式（各行哈希求和，仅同类型数据库之间可比）
+
+    column_types为{字段名: 数据库类型}，Oracle按类型使用显式的日期和数值格式。
+    """
+    if db_type == 'mysql':
+        parts = ', '.join(f"COALESCE(CAST({c} AS CHAR), '{NULL_MARKER}')" for c in columns)
+        return f"COALESCE(SUM(CRC32(CONCAT_WS('|', {parts}))), 0)"
+    elif db_type == 'postgresql':
+        parts = ', '.join(f"COALESCE(CAST({c} AS TEXT), '{NULL_MARKER}')" for c in columns)
+        return f"COALESCE(SUM(('x' || SUBSTR(MD5(CONCAT_WS('|', {parts})), 1, 8))::BIT(32)::BIGINT), 0)"
+    elif db_type == 'oracle':
+        # 逐字段哈希（以字段序号为种子区分字段位置）再求和，避免拼接长文本超出VARCHAR2长度（ORA-01489）
+        column_types = column_types or {}
+        parts = ' + '.join(
+            f"ORA_HASH(NVL({_oracle_hash_text(c, column_types.get(c))}, '{NULL_MARKER}'), 4294967295, {i})"
+            for i, c in enumerate(columns)
+        )
+        return f"NVL(SUM({parts}), 0)"
+    elif db_type == 'sqlserver':
+        parts = ', '.join(columns)
+        return f"ISNULL(SUM(CAST(BINARY_CHECKSUM({parts}) AS BIGINT)), 0)"
+
+    raise ValueError(f"不支持的数据库类型: {db_type}")
+
+
+class ChecksumCompareEngine(BaseCompareEngine):
+    """校验和比对引擎（适用于大表、少量差异）
+
+    将主键空间切分为若干区间，由两端数据库计算每个区间的记录数和与顺序无关的行哈希之和，
+    只对校验和不一致的区间继续拆分，直到区间足够小再逐行拉取比对。
+    每个顶层区间比对完成后记录断点，中断后可跳过已完成的区间继续比对。
+
+    联合主键或非整数主键无法按整数区间下钻，整表改用流式归并比对；拆到宽度为1仍超过叶子大小的区间
+    （如小数主键）同样按主键顺序分块比对，逐行拉取的数据量不超过叶子大小。
+    """
+
+    supports_checkpoint = True
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self._all_columns: List[str] = []
+        self._where_clauses: Dict[str, str] = {}
+        self._split_column: str = None
+        self._checksum_comparable: bool = True
+        self.range_stats: Dict[str, int] = {
+            'checksum_queries': 0,
+            'matched_ranges': 0,
+            'leaf_ranges': 0
+        }
+
+    def load_data(self):
+        """准备比对字段和过滤条件（不整表加载数据，数据在比对阶段按区间下钻获取）"""
+        columns = self.get_compare_columns()
+        all_columns = columns['key_columns'] + columns['update_column'] + columns['extra_columns']
+        self._all_columns = list(dict.fromkeys(all_columns))  # 去重并保持顺序（两端行哈希字段顺序必须一致）
+        self._where_clauses = {side: self.get_where_clause(side) for side in ('src', 'tgt')}
+        # 以主键字段作为区间拆分字段（联合主键在比对阶段改用流式归并）
+        self._split_column = columns['key_columns'][0]
+
+        # 不同数据库的哈希函数结果不可比，只能依赖记录数，校验和相等不再作为跳过依据
+        src_db_type = self.config['src_db_type'].lower()
+        tgt_db_type = self.config['tgt_db_type'].lower()
+        self._checksum_comparable = src_db_type == tgt_db_type
+        if not self._checksum_comparable:
+            logger.warning(f"源端({src_db_type})与目标端({tgt_db_type})数据库类型不同，校验和不可比，将逐区间拉取比对")
+
+    def _table_ref(self, db_side: str) -> str:
+        return f"{self.config[f'{db_side}_db_name']}.{self.config[f'{db_side}_table_name']}"
+
+    def _row_hash_expr(self, db_type: str, db_side: str = 'src') -> str:
+        """生成与顺序无关的行哈希聚合表达式（各行哈希求和，字段类型取自该端元数据）"""
+        metadata = self._src_metadata_cache if db_side == 'src' else self._tgt_metadata_cache
+        column_types = {c['name']: c['type'] for c in metadata or []}
+        return build_row_hash_sum_expr(db_type, self._all_columns, column_types)
+
+    def _range_conditions(self, db_side: str, range_lo: Optional[int], range_hi: Optional[int]) -> List[str]:
+        conditions = []
+        if range_lo is not None:
+            conditions.append(f"{self._split_column} >= {range_lo}")
+        if range_hi is not None:
+            conditions.append(f"{self._split_column} < {range_hi}")
+        if self._where_clauses.get(db_side):
+            conditions.append(f"({self._where_clauses[db_side]})")
+        return conditions
+
+    def _get_pk_bounds(self, db_side: str) -> Tuple[Any, Any]:
+        """查询拆分字段的最小值和最大值"""
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        sql = f"SELECT MIN({self._split_column}) AS min_pk, MAX({self._split_column}) AS max_pk FROM {self._table_ref(db_side)}"
+        if self._where_clauses.get(db_side):
+            sql += f" WHERE {self._where_clauses[db_side]}"
+        rows = adapter.query(sql)
+        if not rows:
+            return None, None
+        values = self._row_values(rows[0])
+        return values[0], values[1]
+
+    def _fetch_segment_stats(self, db_side: str, range_lo: int, range_hi: int, step: int) -> Dict[int, Tuple[int, int]]:
+        """一次查询获取区间[range_lo, range_hi)内按step分段的记录数和校验和
+
+        Returns:
+            {分段序号: (记录数, 校验和)}，无数据的分段不返回
+        """
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        db_type = self.config[f'{db_side}_db_type'].lower()
+        seg_expr = f"FLOOR(({self._split_column} - {range_lo}) / {step})"
+        sql = (
+            f"SELECT {seg_expr} AS seg_no, COUNT(*) AS row_cnt, {self._row_hash_expr(db_type, db_side)} AS row_checksum "
+            f"FROM {self._table_ref(db_side)} "
+            f"WHERE {' AND '.join(self._range_conditions(db_side, range_lo, range_hi))} "
+            f"GROUP BY {seg_expr}"
+        )
+        self.range_stats['checksum_queries'] += 1
+
+        stats = {}
+        for row in adapter.query(sql):
+            seg_no, row_cnt, row_checksum = self._row_values(row)[:3]
+            stats[int(seg_no)] = (int(row_cnt), int(row_checksum or 0))
+        return stats
+
+    def _fetch_range_rows(self, db_side: str, range_lo: Optional[int], range_hi: Optional[int]) -> pd.DataFrame:
+        """逐行拉取区间内的比对字段"""
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        sql = f"SELECT {', '.join(self._all_columns)} FROM {self._table_ref(db_side)}"
+        conditions = self._range_conditions(db_side, range_lo, range_hi)
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+
+        rows = adapter.query(sql)
+        if rows and isinstance(rows[0], dict):
+            return pd.DataFrame(rows, columns=self._all_columns)
+        return pd.DataFrame([tuple(row) for row in rows], columns=self._all_columns)
+
+    def _streaming_engine(self, where_clauses: Dict[str, str] = None):
+        """构造共用本引擎连接、元数据和比对字段的流式归并引擎，where_clauses为空时沿用本引擎的过滤条件"""
+        from core.compare_engine.streaming_engine import StreamingCompareEngine
+
+        # 差异明细由本引擎汇总，流式引擎不截断明细
+        engine = StreamingCompareEngine({**self.config, 'max_diff_records_threshold': sys.maxsize})
+        for attr in ('src_adapter', 'tgt_adapter', '_src_metadata_cache', '_tgt_metadata_cache', '_src_pk_cache',
+                     '_tgt_pk_cache', '_compare_columns_cache', '_incremental_window_cache'):
+            setattr(engine, attr, getattr(self, attr))
+        engine.load_data()
+        engine._where_clauses = dict(where_clauses or self._where_clauses)
+        return engine
+
+    def _compare_range_streaming(self, range_lo: int, range_hi: int, diff_records: Dict[str, List]) -> int:
+        """按主键顺序分块比对一个区间（记录数超过叶子大小但无法再按整数拆分），返回匹配行数"""
+        self.range_stats['leaf_ranges'] += 1
+        engine = self._streaming_engine({side: ' AND '.join(self._range_conditions(side, range_lo, range_hi))
+                                         for side in ('src', 'tgt')})
+        engine.compare()
+
+        leaf_diff = engine.compare_result['diff_records']
+        merge_diff_records(diff_records, leaf_diff)
+        return engine.compare_result['src_cnt'] - len(leaf_diff['mismatch']) - len(leaf_diff['src_only'])
+
+    def _compare_whole_streaming(self, reason: str):
+        """整表改用流式归并比对（沿用本引擎的断点），结果写入本引擎的比对结果"""
+        logger.warning(f"{reason}，无法按整数区间下钻，改用流式归并比对（按主键顺序分块读取，内存有界）")
+        engine = self._streaming_engine()
+        engine._checkpoint = self._checkpoint
+        engine.compare()
+        for key in ('src_cnt', 'tgt_cnt', 'diff_cnt', 'diff_records', 'compare_report', 'matching_rate',
+                    'resumed_from_key'):
+            if key in engine.compare_result:
+                self.compare_result[key] = engine.compare_result[key]
+
+    def _compare_leaf(self, range_lo: Optional[int], range_hi: Optional[int], diff_records: Dict[str, List]) -> int:
+        """逐行比对叶子区间，返回匹配行数"""
+        from utils.data_type_utils import unify_data_types
+
+        self.range_stats['leaf_ranges'] += 1
+        src_df = self._fetch_range_rows('src', range_lo, range_hi)
+        tgt_df = self._fetch_range_rows('tgt', range_lo, range_hi)
+        if not src_df.empty and not tgt_df.empty:
+            # 一端为空时无需统一类型（避免另一端被整体转换为字符串）
+            src_df, tgt_df = unify_data_types(src_df, tgt_df, self._src_metadata_cache, self._tgt_metadata_cache)
+
+        columns = self.get_compare_columns()
+        leaf_diff, matched_cnt = diff_dataframes(src_df, tgt_df, columns['key_columns'], columns['update_column'])
+        merge_diff_records(diff_records, leaf_diff)
+        return matched_cnt
+
+    def _split_range(self, range_lo: int, range_hi: int, row_cnt: int) -> Tuple[int, List[Tuple[int, int]]]:
+        """将区间拆分为若干等宽分段，返回(步长, 分段列表)"""
+        from config.settings import CHECKSUM_SEGMENT_COUNT, CHECKSUM_LEAF_SIZE
+
+        if self._checksum_comparable:
+            segment_count = self.config.get('checksum_segment_count', CHECKSUM_SEGMENT_COUNT)
+        else:
+            # 校验和不可比时直接按叶子大小拆分，避免无效的逐层下钻
+            leaf_size = self.config.get('checksum_leaf_size', CHECKSUM_LEAF_SIZE)
+            segment_count = max(2, math.ceil(row_cnt / leaf_size))
+
+        width = range_hi - range_lo
+        segment_count = max(1, min(segment_count, width))
+        step = math.ceil(width / segment_count)
+        segments = [(lo, min(lo + step, range_hi)) for lo in range(range_lo, range_hi, step)]
+        return step, segments
+
+    def _compare_range(self, range_lo: int, range_hi: int, src_stat: Tuple[int, int], tgt_stat: Tuple[int, int],
+                       leaf_size: int, diff_records: Dict[str, List]) -> int:
+        """比对一个区间（校验和一致时跳过，否则拆分下钻至叶子区间逐行比对），返回匹配行数"""
+        matched_cnt = 0
+        # 待处理区间：(左闭, 右开, 源端(记录数, 校验和), 目标端(记录数, 校验和))
+        pending = [(range_lo, range_hi, src_stat, tgt_stat)]
+        while pending:
+            lo, hi, (seg_src_cnt, seg_src_sum), (seg_tgt_cnt, seg_tgt_sum) = pending.pop()
+            if seg_src_cnt == 0 and seg_tgt_cnt == 0:
+                continue
+            if self._checksum_comparable and seg_src_cnt == seg_tgt_cnt and seg_src_sum == seg_tgt_sum:
+                self.range_stats['matched_ranges'] += 1
+                matched_cnt += seg_src_cnt
+                continue
+
+            row_cnt = max(seg_src_cnt, seg_tgt_cnt)
+            if row_cnt <= leaf_size:
+                matched_cnt += self._compare_leaf(lo, hi, diff_records)
+                continue
+            if hi - lo <= 1:
+                # 区间内主键不是整数（如小数主键），无法继续拆分，分块比对而不是整段拉取
+                matched_cnt += self._compare_range_streaming(lo, hi, diff_records)
+                continue
+
+            step, segments = self._split_range(lo, hi, row_cnt)
+            src_stats = self._fetch_segment_stats('src', lo, hi, step)
+            tgt_stats = self._fetch_segment_stats('tgt', lo, hi, step)
+            for seg_no, (seg_lo, seg_hi) in enumerate(segments):
+                pending.append((seg_lo, seg_hi, src_stats.get(seg_no, (0, 0)), tgt_stats.get(seg_no, (0, 0))))
+        return matched_cnt
+
+    def compare(self):
+        """执行校验和比对（逐层下钻不一致区间）"""
+        from config.settings import CHECKSUM_LEAF_SIZE
+        leaf_size = self.config.get('checksum_leaf_size', CHECKSUM_LEAF_SIZE)
+
+        if len(self.get_compare_columns()['key_columns']) > 1:
+            # 联合主键只按首个字段拆分时，首字段相同的大量记录会落在同一个无法拆分的区间
+            self._compare_whole_streaming("联合主键")
+            return
+
+        diff_records = empty_diff_records()
+        matched_cnt = 0
+        src_cnt = 0
+        tgt_cnt = 0
+
+        src_min, src_max = self._get_pk_bounds('src')
+        tgt_min, tgt_max = self._get_pk_bounds('tgt')
+        bounds_min = [v for v in (src_min, tgt_min) if v is not None]
+        bounds_max = [v for v in (src_max, tgt_max) if v is not None]
+
+        if not bounds_min:
+            self.compare_result['diff_cnt'] = 0
+            self.compare_result['diff_records'] = diff_records
+            self.compare_result['compare_report'] = "源端和目标端均无数据"
+            self.compare_result['matching_rate'] = 1.0
+            return
+
+        range_lo = self._to_int_bound(min(bounds_min))
+        range_hi = self._to_int_bound(max(bounds_max))
+
+        if range_lo is None or range_hi is None:
+            self._compare_whole_streaming(f"拆分字段{self._split_column}不是整数类型")
+            return
+
+        # 顶层区间及已完成区间的结果（续比时沿用中断运行的区间划分）
+        state = self._checkpoint.state if self._checkpoint is not None else {}
+        root_lo, root_hi = state.setdefault('root_range', (range_lo, range_hi + 1))
+        extra_ranges = state.setdefault('extra_ranges', [])
+        completed = state.setdefault('completed_ranges', {})
+        if completed:
+            logger.info(f"从断点继续：跳过已完成的{len(completed)}个区间")
+            self.compare_result['resumed_ranges'] = len(completed)
+
+        # 续比时主键范围可能已扩大（中断后新插入的记录），超出已划分范围的部分追加为新的顶层区间
+        covered_lo = min([root_lo] + [lo for lo, _ in extra_ranges])
+        covered_hi = max([root_hi] + [hi for _, hi in extra_ranges])
+        for lo, hi in ((range_lo, covered_lo), (covered_hi, range_hi + 1)):
+            if lo < hi:
+                logger.info(f"主键范围较断点扩大，追加比对区间[{lo}, {hi})")
+                extra_ranges.append((lo, hi))
+
+        step, segments = self._split_range(root_lo, root_hi, 0)
+        src_stats = self._fetch_segment_stats('src', root_lo, root_hi, step)
+        tgt_stats = self._fetch_segment_stats('tgt', root_lo, root_hi, step)
+        top_ranges = [(seg_lo, seg_hi, src_stats.get(seg_no, (0, 0)), tgt_stats.get(seg_no, (0, 0)))
+                      for seg_no, (seg_lo, seg_hi) in enumerate(segments)]
+        top_ranges += [(lo, hi, None, None) for lo, hi in extra_ranges]
+
+        for seg_no, (seg_lo, seg_hi, seg_src, seg_tgt) in enumerate(top_ranges):
+            if seg_no in completed:
+                done = completed[seg_no]
+                src_cnt += done['src_cnt']
+                tgt_cnt += done['tgt_cnt']
+                matched_cnt += done['matched_cnt']
+                merge_diff_records(diff_records, done['diff_records'])
+                continue
+
+            if seg_src is None:
+                # 追加区间整体作为一个分段获取记录数和校验和
+                seg_src = self._fetch_segment_stats('src', seg_lo, seg_hi, seg_hi - seg_lo).get(0, (0, 0))
+                seg_tgt = self._fetch_segment_stats('tgt', seg_lo, seg_hi, seg_hi - seg_lo).get(0, (0, 0))
+            seg_diff = empty_diff_records()
+            seg_matched = self._compare_range(seg_lo, seg_hi, seg_src, seg_tgt, leaf_size, seg_diff)
+            src_cnt += seg_src[0]
+            tgt_cnt += seg_tgt[0]
+            matched_cnt += seg_matched
+            merge_diff_records(diff_records, seg_diff)
+
+            if self._checkpoint is not None:
+                completed[seg_no] = {'range': (seg_lo, seg_hi), 'src_cnt': seg_src[0], 'tgt_cnt': seg_tgt[0],
+                                     'matched_cnt': seg_matched, 'diff_records': seg_diff}
+                self._checkpoint.save()
+
+        self.compare_result['src_cnt'] = src_cnt
+        self.compare_result['tgt_cnt'] = tgt_cnt
+        diff_cnt = len(diff_records['mismatch']) + len(diff_records['src_only']) + len(diff_records['tgt_only'])
+        self.compare_result['diff_cnt'] = diff_cnt
+        self.compare_result['diff_records'] = diff_records
+        self.compare_result['compare_report'] = (
+            f"校验和比对完成：源端{src_cnt}条，目标端{tgt_cnt}条，差异{diff_cnt}条"
+            f"（校验和查询{self.range_stats['checksum_queries']}次，"
+            f"一致区间{self.range_stats['matched_ranges']}个，逐行比对区间{self.range_stats['leaf_ranges']}个）"
+        )
+        logger.info(self.compare_result['compare_report'])
+
+        total_records = max(src_cnt, tgt_cnt)
+        if total_records > 0:
+            self.compare_result['matching_rate'] = matched_cnt / total_records
+        else:
+            self.compare_result['matching_rate'] = 1.0
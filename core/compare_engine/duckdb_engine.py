@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, List, Any, Tuple
+import duckdb
+import pandas as pd
+from core.compare_engine.base_engine import BaseCompareEngine
+from utils.diff_utils import empty_diff_records, pack_mismatch_full, SRC_SUFFIX, TGT_SUFFIX
+from utils.data_type_utils import rows_to_frame, resolve_column_kinds, convert_frame_types
+
+logger = logging.getLogger(__name__)
+
+# DuckDB中的数值类型（两端均为数值时统一转换为DOUBLE比较）
+_NUMERIC_TYPE_PATTERN = re.compile(r'^(U?(TINYINT|SMALLINT|INTEGER|BIGINT|HUGEINT)|FLOAT|DOUBLE|REAL|DECIMAL.*)$')
+
+# 比对类型对应的DuckDB字段类型（decimal为规范化的十进制文本）
+_DUCKDB_TYPES = {
+    'int': 'BIGINT',
+    'float': 'DOUBLE',
+    'decimal': 'VARCHAR',
+    'datetime': 'TIMESTAMP',
+    'bool': 'BOOLEAN',
+    'string': 'VARCHAR',
+}
+
+
+def _quote(name: str) -> str:
+    """DuckDB标识符加引号"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBCompareEngine(BaseCompareEngine):
+    """DuckDB比对引擎（适用于中等数据量，无需Java）
+
+    两端数据按主键分块写入本地嵌入式DuckDB数据库（超出内存限制的部分落盘），
+    在DuckDB中用SQL完成全外连接比对，只把差异记录取回到diff_records。
+    """
+
+    SRC_TABLE = 'src_data'
+    TGT_TABLE = 'tgt_data'
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.conn = None
+        self._db_dir: str = None
+        self._all_columns: List[str] = []
+        self._column_kinds: Dict[str, str] = {}
+
+    def init_duckdb(self):
+        """创建本次比对使用的临时DuckDB数据库"""
+        from config.settings import DUCKDB_TEMP_DIR, DUCKDB_MEMORY_LIMIT, DUCKDB_THREADS
+
+        base_dir = self.config.get('duckdb_temp_dir', DUCKDB_TEMP_DIR)
+        os.makedirs(base_dir, exist_ok=True)
+        self._db_dir = tempfile.mkdtemp(prefix=f"{self.config['src_table_name']}_", dir=base_dir)
+
+        self.conn = duckdb.connect(os.path.join(self._db_dir, 'compare.duckdb'))
+        self.conn.execute(f"SET memory_limit = '{self.config.get('duckdb_memory_limit', DUCKDB_MEMORY_LIMIT)}'")
+        self.conn.execute(f"SET temp_directory = '{os.path.join(self._db_dir, 'spill')}'")
+        self.conn.execute(f"SET threads = {int(self.config.get('duckdb_threads', DUCKDB_THREADS))}")
+        # 比对结果与插入顺序无关，关闭后大表连接和排序可以落盘
+        self.conn.execute("SET preserve_insertion_order = false")
+        logger.info(f"DuckDB初始化完成（目录：{self._db_dir}）")
+
+    def close_duckdb(self):
+        """关闭DuckDB连接并删除临时数据库文件"""
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception as e:
+                logger.warning(f"关闭DuckDB连接失败: {e}")
+            self.conn = None
+        if self._db_dir:
+            shutil.rmtree(self._db_dir, ignore_errors=True)
+            self._db_dir = None
+
+    def run(self) -> Dict[str, Any]:
+        """执行完整比对流程（结束后清理临时数据库）"""
+        try:
+            return super().run()
+        finally:
+            self.close_duckdb()
+
+    def load_data(self):
+        """将源端和目标端数据分块写入DuckDB（两端并发加载）"""
+        from config.settings import CHUNK_SIZE_FOR_DATA_SYNC
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.init_duckdb()
+
+        columns = self.get_compare_columns()
+        all_columns = columns['key_columns'] + columns['update_column'] + columns['extra_columns']
+        self._all_columns = list(dict.fromkeys(all_columns))
+        # 两端每列的比对类型和DuckDB表结构只由元数据决定，与各分块的取值无关
+        self._column_kinds = resolve_column_kinds(self._all_columns, self._src_metadata_cache, self._tgt_metadata_cache)
+        self.compare_result['column_type_mapping'] = dict(self._column_kinds)
+        where_clauses = {side: self.get_where_clause(side) for side in ('src', 'tgt')}
+        chunk_size = self.config.get('chunk_size_for_data_sync', CHUNK_SIZE_FOR_DATA_SYNC)
+
+        if self.src_adapter is self.tgt_adapter:
+            # 两端共用同一连接时不能并发使用，串行加载
+            self._load_side('src', where_clauses['src'], chunk_size)
+            self._load_side('tgt', where_clauses['tgt'], chunk_size)
+        else:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix='load') as executor:
+                futures = [executor.submit(self._load_side, side, where_clauses[side], chunk_size)
+                           for side in ('src', 'tgt')]
+                for future in futures:
+                    future.result()
+
+        self.compare_result['src_cnt'] = self.conn.execute(f"SELECT COUNT(*) FROM {self.SRC_TABLE}").fetchone()[0]
+        self.compare_result['tgt_cnt'] = self.conn.execute(f"SELECT COUNT(*) FROM {self.TGT_TABLE}").fetchone()[0]
+        logger.info(f"数据加载完成：源端{self.compare_result['src_cnt']}条，目标端{self.compare_result['tgt_cnt']}条")
+
+    def _iter_side_frames(self, db_side: str, where_clause: str, chunk_size: int):
+        """逐块读取一端数据（PostgreSQL使用COPY批量导出，Oracle按ROWID区间并行读取，其他数据库按主键键集分页）"""
+        if self._use_pg_copy(db_side):
+            yield from self._iter_copy_frames(db_side, self._all_columns, where_clause, chunk_size)
+            return
+        if self._use_oracle_rowid(db_side):
+            frames = self._iter_rowid_frames(db_side, self._all_columns, where_clause, chunk_size)
+            if frames is not None:
+                yield from frames
+                return
+
+        # 未在比对字段中的主键列（如敏感字段）仅用于分页，不写入DuckDB
+        select_columns = self._all_columns + [k for k in self._src_pk_cache if k not in self._all_columns]
+        dtypes = self.get_column_dtypes(db_side)
+        for chunk in self._iter_keyset_chunks(db_side, select_columns, where_clause, chunk_size):
+            yield rows_to_frame(chunk, columns=select_columns, dtypes=dtypes)[self._all_columns]
+
+    def _load_side(self, db_side: str, where_clause: str, chunk_size: int):
+        """按主键分块读取一端数据，统一类型后写入DuckDB"""
+        table = self.SRC_TABLE if db_side == 'src' else self.TGT_TABLE
+        column_list = ", ".join(_quote(c) for c in self._all_columns)
+
+        # 每个线程使用独立游标
+        cursor = self.conn.cursor()
+        try:
+            column_defs = ", ".join(f"{_quote(c)} {_DUCKDB_TYPES[self._column_kinds[c]]}" for c in self._all_columns)
+            cursor.execute(f"CREATE TABLE {table} ({column_defs})")
+            for frame in self._iter_side_frames(db_side, where_clause, chunk_size):
+                if frame.empty:
+                    continue
+                chunk_df = convert_frame_types(frame, self._column_kinds)
+                cursor.register('chunk_df', chunk_df)
+                cursor.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM chunk_df")
+                cursor.unregister('chunk_df')
+        finally:
+            cursor.close()
+
+    def _column_types(self, table: str) -> Dict[str, str]:
+        return {row[0]: row[1] for row in self.conn.execute(f"DESCRIBE {table}").fetchall()}
+
+    def _comparable_exprs(self, src_types: Dict[str, str], tgt_types: Dict[str, str]) -> Dict[str, Tuple[str, str]]:
+        """生成两端每列用于比较的表达式（类型不同时统一为DOUBLE或VARCHAR）"""
+        exprs = {}
+        for col in self._all_columns:
+            src_expr, tgt_expr = f"s.{_quote(col)}", f"t.{_quote(col)}"
+            src_type, tgt_type = src_types[col], tgt_types[col]
+            if src_type != tgt_type:
+                if _NUMERIC_TYPE_PATTERN.match(src_type) and _NUMERIC_TYPE_PATTERN.match(tgt_type):
+                    cast_type = 'DOUBLE'
+                else:
+                    cast_type = 'VARCHAR'
+                src_expr, tgt_expr = f"CAST({src_expr} AS {cast_type})", f"CAST({tgt_expr} AS {cast_type})"
+            exprs[col] = (src_expr, tgt_expr)
+        return exprs
+
+    def _fetch_records(self, sql: str) -> pd.DataFrame:
+        """执行查询并返回DataFrame（NULL统一为None）"""
+        df = self.conn.execute(sql).fetchdf()
+        return df.astype(object).where(df.notna(), None)
+
+    def compare(self):
+        """在DuckDB中执行全外连接比对"""
+        from config.settings import MAX_DIFF_RECORDS_THRESHOLD, DIFF_RECORDS_COLUMNAR
+
+        columns = self.get_compare_columns()
+        key_columns = columns['key_columns']
+        value_columns = [c for c in self._all_columns if c not in key_columns]
+        exprs = self._comparable_exprs(self._column_types(self.SRC_TABLE), self._column_types(self.TGT_TABLE))
+
+        join_cond = " AND ".join(f"{exprs[k][0]} = {exprs[k][1]}" for k in key_columns)
+        col_differ = {c: f"{exprs[c][0]} IS DISTINCT FROM {exprs[c][1]}" for c in value_columns}
+        row_differ = " OR ".join(f"({cond})" for cond in col_differ.values()) or "FALSE"
+        src_found = f"s.{_quote(key_columns[0])} IS NOT NULL"
+        tgt_found = f"t.{_quote(key_columns[0])} IS NOT NULL"
+        both_found = f"{src_found} AND {tgt_found}"
+
+        # 一次全外连接统计各类差异数和逐列不一致数
+        column_counts = "".join(
+            f", COUNT(*) FILTER (WHERE {both_found} AND ({cond}))" for cond in col_differ.values()
+        )
+        summary = self.conn.execute(
+            f"SELECT COUNT(*) FILTER (WHERE {both_found} AND NOT ({row_differ})),"
+            f" COUNT(*) FILTER (WHERE {both_found} AND ({row_differ})),"
+            f" COUNT(*) FILTER (WHERE NOT {tgt_found}),"
+            f" COUNT(*) FILTER (WHERE NOT {src_found}){column_counts}"
+            f" FROM {self.SRC_TABLE} s FULL OUTER JOIN {self.TGT_TABLE} t ON {join_cond}"
+        ).fetchone()
+        matched_cnt, mismatch_cnt, src_only_cnt, tgt_only_cnt = summary[:4]
+        column_mismatch_cnt = dict(zip(value_columns, summary[4:]))
+
+        # 只取回差异记录，每类最多保留max_diff_records条明细
+        max_diff_records = int(self.config.get('max_diff_records_threshold', MAX_DIFF_RECORDS_THRESHOLD))
+        diff_records = empty_diff_records()
+        order_by = ", ".join(exprs[k][0] for k in key_columns)
+
+        if mismatch_cnt > 0:
+            select_list = ", ".join(
+                [f"s.{_quote(c)} AS {_quote(c + SRC_SUFFIX)}" for c in self._all_columns] +
+                [f"t.{_quote(c)} AS {_quote(c + TGT_SUFFIX)}" for c in self._all_columns]
+            )
+            mismatch_df = self._fetch_records(
+                f"SELECT {select_list} FROM {self.SRC_TABLE} s JOIN {self.TGT_TABLE} t ON {join_cond}"
+                f" WHERE {row_differ} ORDER BY {order_by} LIMIT {max_diff_records}"
+            )
+            src_view = mismatch_df[[c + SRC_SUFFIX for c in self._all_columns]].set_axis(self._all_columns, axis=1)
+            tgt_view = mismatch_df[[c + TGT_SUFFIX for c in self._all_columns]].set_axis(self._all_columns, axis=1)
+            diff_records['mismatch'] = src_view[key_columns].to_dict('records')
+            diff_records['mismatch_full'] = pack_mismatch_full(
+                src_view[key_columns], src_view, tgt_view, columns.get('update_column', []),
+                self.config.get('diff_records_columnar', DIFF_RECORDS_COLUMNAR)
+            )
+
+        if src_only_cnt > 0:
+            diff_records['src_only'] = self._fetch_records(
+                f"SELECT s.* FROM {self.SRC_TABLE} s"
+                f" WHERE NOT EXISTS (SELECT 1 FROM {self.TGT_TABLE} t WHERE {join_cond})"
+                f" ORDER BY {order_by} LIMIT {max_diff_records}"
+            ).to_dict('records')
+
+        if tgt_only_cnt > 0:
+            key_list = ", ".join(f"t.{_quote(k)}" for k in key_columns)
+            diff_records['tgt_only'] = self._fetch_records(
+                f"SELECT {key_list} FROM {self.TGT_TABLE} t"
+                f" WHERE NOT EXISTS (SELECT 1 FROM {self.SRC_TABLE} s WHERE {join_cond})"
+                f" ORDER BY {', '.join(exprs[k][1] for k in key_columns)} LIMIT {max_diff_records}"
+            ).to_dict('records')
+
+        diff_cnt = mismatch_cnt + src_only_cnt + tgt_only_cnt
+        self.compare_result['diff_cnt'] = diff_cnt
+        self.compare_result['diff_records'] = diff_records
+        self.compare_result['column_mismatch_cnt'] = column_mismatch_cnt
+
+        report_lines = [
+            f"DuckDB比对完成：源端{self.compare_result['src_cnt']}条，目标端{self.compare_result['tgt_cnt']}条，差异{diff_cnt}条",
+            f"值不一致{mismatch_cnt}条，源端独有{src_only_cnt}条，目标端独有{tgt_only_cnt}条"
+        ]
+        column_diffs = {col: cnt for col, cnt in column_mismatch_cnt.items() if cnt > 0}
+        if column_diffs:
+            report_lines.append("字段不一致计数：" + ", ".join(f"{col}={cnt}" for col, cnt in column_diffs.items()))
+        self.compare_result['compare_report'] = "\n".join(report_lines)
+        logger.info(f"捕获到{diff_cnt}条差异数据")
+
+        total_records = max(self.compare_result['src_cnt'], self.compare_result['tgt_cnt'])
+        if total_records > 0:
+            self.compare_result['matching_rate'] = matched_cnt / total_records
+        else:
+            self.compare_result['matching_rate'] = 1.0
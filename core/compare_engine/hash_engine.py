@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+import logging
+from core.compare_engine.pandas_engine import PandasCompareEngine
+from utils.diff_utils import hash_compare
+
+logger = logging.getLogger(__name__)
+
+
+class HashCompareEngine(PandasCompareEngine):
+    """行哈希比对引擎（数据加载同Pandas引擎，比对使用内置哈希关联内核代替datacompy）"""
+
+    def compare(self):
+        """执行行哈希比对"""
+        from config.settings import DIFF_RECORDS_COLUMNAR
+
+        if self._fallback_engine is not None:
+            return self._compare_fallback()
+
+        if self.src_df.empty and self.tgt_df.empty:
+            self.compare_result['diff_cnt'] = 0
+            self.compare_result['compare_report'] = "源端和目标端均无数据"
+            self.compare_result['matching_rate'] = 1.0
+            return
+
+        columns = self.get_compare_columns()
+        result = hash_compare(
+            self.src_df,
+            self.tgt_df,
+            columns['key_columns'],
+            columns.get('update_column', []),
+            columnar=self.config.get('diff_records_columnar', DIFF_RECORDS_COLUMNAR)
+        )
+
+        diff_cnt = result['mismatch_cnt'] + result['src_only_cnt'] + result['tgt_only_cnt']
+        self.compare_result['diff_cnt'] = diff_cnt
+        self.compare_result['diff_records'] = result['diff_records']
+        self.compare_result['column_mismatch_cnt'] = result['column_mismatch_cnt']
+
+        report_lines = [
+            f"行哈希比对完成：源端{self.compare_result['src_cnt']}条，目标端{self.compare_result['tgt_cnt']}条，差异{diff_cnt}条",
+            f"值不一致{result['mismatch_cnt']}条，源端独有{result['src_only_cnt']}条，目标端独有{result['tgt_only_cnt']}条"
+        ]
+        column_diffs = {col: cnt for col, cnt in result['column_mismatch_cnt'].items() if cnt > 0}
+        if column_diffs:
+            report_lines.append("字段不一致计数：" + ", ".join(f"{col}={cnt}" for col, cnt in column_diffs.items()))
+        self.compare_result['compare_report'] = "\n".join(report_lines)
+        logger.info(f"捕获到{diff_cnt}条差异数据")
+
+        total_records = max(self.compare_result['src_cnt'], self.compare_result['tgt_cnt'])
+        if total_records > 0:
+            self.compare_result['matching_rate'] = result['matched_cnt'] / total_records
+        else:
+            self.compare_result['matching_rate'] = 1.0
@@ -7,14 +7,96 @@ import datacompy
 from typing import Dict, List, Any
 from datetime import datetime
 from core.compare_engine.base_engine import BaseCompareEngine
+from utils.diff_utils import empty_diff_records, build_mismatch_full, frame_records
+from utils.data_type_utils import rows_to_frame
+from utils.memory_planner import LoadMemoryGuard, MemoryBudgetExceeded, get_task_memory_budget
+
+# float64能精确表示的最大整数
+_FLOAT_EXACT_INT_MAX = 2 ** 53
 
 
 class PandasCompareEngine(BaseCompareEngine):
-    """Pandas比对引擎（适用于小数据量）"""
+    """Pandas比对引擎（适用于小数据量）
+
+    加载过程中累计已加载数据的内存，超过本任务内存预算时放弃Pandas加载，
+    自动切换为DuckDB引擎（未安装时为流式引擎）完成比对。
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self._memory_guard = None
+        self._fallback_engine = None
 
     def load_data(self):
-        """加载源端和目标端数据到Pandas DataFrame（支持分块加载）"""
+        """加载数据，超出内存预算时切换为落盘/流式引擎"""
+        from config.settings import PANDAS_MEMORY_FACTOR
+        import logging
+        logger = logging.getLogger(__name__)
+
+        # 比对过程中的副本按PANDAS_MEMORY_FACTOR倍估算，原始数据只能占预算的相应比例
+        self._memory_guard = LoadMemoryGuard(get_task_memory_budget(self.config) / PANDAS_MEMORY_FACTOR)
+        try:
+            self._load_dataframes()
+        except MemoryBudgetExceeded as e:
+            logger.warning(f"Pandas加载数据超出内存预算，切换比对引擎: {str(e)}")
+            self.src_df = pd.DataFrame()
+            self.tgt_df = pd.DataFrame()
+            self._switch_to_fallback()
+        finally:
+            self._memory_guard = None
+
+    def _switch_to_fallback(self):
+        """创建落盘/流式引擎，共用已初始化的连接和缓存，并由其重新加载数据"""
+        import importlib.util
+        if importlib.util.find_spec('duckdb') is not None:
+            from core.compare_engine.duckdb_engine import DuckDBCompareEngine
+            fallback = DuckDBCompareEngine(self.config)
+        else:
+            from core.compare_engine.streaming_engine import StreamingCompareEngine
+            fallback = StreamingCompareEngine(self.config)
+
+        fallback.src_adapter = self.src_adapter
+        fallback.tgt_adapter = self.tgt_adapter
+        fallback._src_metadata_cache = self._src_metadata_cache
+        fallback._tgt_metadata_cache = self._tgt_metadata_cache
+        fallback._src_pk_cache = self._src_pk_cache
+        fallback._tgt_pk_cache = self._tgt_pk_cache
+        fallback._compare_columns_cache = self._compare_columns_cache
+        fallback._incremental_window_cache = self._incremental_window_cache  # 沿用已确定的增量窗口
+        fallback.compare_result = self.compare_result  # 结果直接写入本引擎的比对结果
+        self._fallback_engine = fallback
+        try:
+            fallback.load_data()
+        except Exception:
+            self._close_fallback()
+            raise
+
+    def _close_fallback(self):
+        """释放切换后引擎的临时资源"""
+        close_duckdb = getattr(self._fallback_engine, 'close_duckdb', None)
+        if close_duckdb is not None:
+            close_duckdb()
+
+    def _compare_fallback(self):
+        """由切换后的引擎执行比对"""
+        try:
+            self._fallback_engine.compare()
+        finally:
+            self._close_fallback()
+        self.compare_result['compare_report'] = (
+            f"Pandas加载数据超出内存预算，已切换为{type(self._fallback_engine).__name__}比对\n"
+            f"{self.compare_result.get('compare_report', '')}"
+        )
+
+    def _track_memory(self, df: pd.DataFrame):
+        """登记已加载数据的内存占用（超出预算时抛出MemoryBudgetExceeded）"""
+        if self._memory_guard is not None:
+            self._memory_guard.add(int(df.memory_usage(index=True, deep=True).sum()))
+
+    def _load_dataframes(self):
+        """加载源端和目标端数据到Pandas DataFrame（两端并发加载，支持分块加载）"""
         from config.settings import CHUNK_SIZE_FOR_DATA_SYNC
+        from concurrent.futures import ThreadPoolExecutor
         import logging
         logger = logging.getLogger(__name__)
 
@@ -23,116 +105,102 @@ class PandasCompareEngine(BaseCompareEngine):
         all_columns = columns['key_columns'] + columns['update_column'] + columns['extra_columns']
         all_columns = list(set(all_columns))  # 去重
 
-        # 构建WHERE子句
-        where_clause = self.get_where_clause()
-
-        # 先获取总记录数，决定是否需要分块加载
-        src_total_count = self.src_adapter.get_table_count(
-            self.config['src_db_name'],
-            self.config['src_table_name'],
-            where_clause
-        )
-        tgt_total_count = self.tgt_adapter.get_table_count(
-            self.config['tgt_db_name'],
-            self.config['tgt_table_name'],
-            where_clause
-        )
+        # 构建WHERE子句（抽样条件按各端数据库语法生成）
+        src_where = self.get_where_clause('src')
+        tgt_where = self.get_where_clause('tgt')
 
         chunk_size = self.config.get('chunk_size_for_data_sync', CHUNK_SIZE_FOR_DATA_SYNC)
 
-        # 如果数据量小于chunk_size，直接加载
-        if src_total_count <= chunk_size and tgt_total_count <= chunk_size:
-            logger.debug(f"数据量较小（源端{src_total_count}，目标端{tgt_total_count}），直接加载")
-
-            # 加载源端数据
-            src_data = self.src_adapter.query_data(
-                self.config['src_db_name'],
-                self.config['src_table_name'],
-                all_columns,
-                where_clause
-            )
-            self.src_df = pd.DataFrame(src_data)
-            self.compare_result['src_cnt'] = len(self.src_df)
-
-            # 加载目标端数据
-            tgt_data = self.tgt_adapter.query_data(
-                self.config['tgt_db_name'],
-                self.config['tgt_table_name'],
-                all_columns,
-                where_clause  # 目标端使用相同的过滤条件
-            )
-            self.tgt_df = pd.DataFrame(tgt_data)
-            self.compare_result['tgt_cnt'] = len(self.tgt_df)
+        if self.src_adapter is self.tgt_adapter:
+            # 两端共用同一连接时不能并发使用，串行加载
+            self.src_df = self._load_side('src', all_columns, src_where, chunk_size)
+            self.tgt_df = self._load_side('tgt', all_columns, tgt_where, chunk_size)
         else:
-            # 数据量大，分块加载
-            logger.info(f"数据量较大（源端{src_total_count}，目标端{tgt_total_count}），启用分块加载（每块{chunk_size}条）")
-
-            # 分块加载源端数据
-            src_chunks = []
-            src_offset = 0
-            while src_offset < src_total_count:
-                chunk_data = self._query_data_with_limit(
-                    self.src_adapter,
-                    self.config['src_db_name'],
-                    self.config['src_table_name'],
-                    all_columns,
-                    where_clause,
-                    limit=chunk_size,
-                    offset=src_offset
-                )
-                if not chunk_data:
-                    break
-                src_chunks.append(pd.DataFrame(chunk_data))
-                src_offset += chunk_size
-                logger.debug(f"已加载源端数据：{min(src_offset, src_total_count)}/{src_total_count}")
-
-            self.src_df = pd.concat(src_chunks, ignore_index=True) if src_chunks else pd.DataFrame()
-            self.compare_result['src_cnt'] = len(self.src_df)
-
-            # 分块加载目标端数据
-            tgt_chunks = []
-            tgt_offset = 0
-            while tgt_offset < tgt_total_count:
-                chunk_data = self._query_data_with_limit(
-                    self.tgt_adapter,
-                    self.config['tgt_db_name'],
-                    self.config['tgt_table_name'],
-                    all_columns,
-                    where_clause,
-                    limit=chunk_size,
-                    offset=tgt_offset
-                )
-                if not chunk_data:
-                    break
-                tgt_chunks.append(pd.DataFrame(chunk_data))
-                tgt_offset += chunk_size
-                logger.debug(f"已加载目标端数据：{min(tgt_offset, tgt_total_count)}/{tgt_total_count}")
-
-            self.tgt_df = pd.concat(tgt_chunks, ignore_index=True) if tgt_chunks else pd.DataFrame()
-            self.compare_result['tgt_cnt'] = len(self.tgt_df)
-
-            logger.info(f"分块加载完成：源端{len(self.src_df)}条，目标端{len(self.tgt_df)}条")
-
-        # 数据类型转换（统一类型）
-        from utils.data_type_utils import unify_data_types
-        self.src_df, self.tgt_df = unify_data_types(self.src_df, self.tgt_df)
-
-    def _query_data_with_limit(self, adapter, db_name: str, table_name: str, columns: list,
-                                where_clause: str = "", limit: int = None, offset: int = 0) -> list:
-        """分页查询数据（支持LIMIT OFFSET）"""
-        columns_str = ', '.join(columns)
-        sql = f"SELECT {columns_str} FROM {db_name}.{table_name}"
-
-        if where_clause:
-            sql += f" WHERE {where_clause}"
-
-        if limit:
-            sql += f" LIMIT {limit} OFFSET {offset}"
-
-        return adapter.query(sql)
+            # 源端和目标端位于不同服务器，各用一个连接并发加载（含计数查询）
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix='load') as executor:
+                src_future = executor.submit(self._load_side, 'src', all_columns, src_where, chunk_size)
+                tgt_future = executor.submit(self._load_side, 'tgt', all_columns, tgt_where, chunk_size)
+                self.src_df = src_future.result()
+                self.tgt_df = tgt_future.result()
+
+        self.compare_result['src_cnt'] = len(self.src_df)
+        self.compare_result['tgt_cnt'] = len(self.tgt_df)
+        logger.info(f"数据加载完成：源端{len(self.src_df)}条，目标端{len(self.tgt_df)}条")
+
+        # 数据类型转换（按两端元数据统一类型，原地转换）
+        from utils.data_type_utils import normalise_data_types
+        type_mapping = normalise_data_types(self.src_df, self.tgt_df,
+                                            self._src_metadata_cache, self._tgt_metadata_cache)
+        self.compare_result['column_type_mapping'] = type_mapping
+        logger.debug(f"比对字段类型：{type_mapping}")
+
+    def _load_side(self, db_side: str, columns: list, where_clause: str, chunk_size: int) -> pd.DataFrame:
+        """加载一端数据
+
+        不按记录数选择一次性读取：选择引擎时的记录数可能是统计信息估算值（可能过期，且未考虑过滤条件），
+        一律分块读取，每块都登记内存占用，小表只有一块，没有额外开销。
+        """
+        return self._load_chunks_stream(db_side, columns, where_clause, chunk_size)
+
+    def _load_chunks_stream(self, db_side: str, columns: list, where_clause: str, chunk_size: int) -> pd.DataFrame:
+        """分批加载一端数据（可并行读取时多会话并行，PostgreSQL为COPY导出，否则为流式游标）"""
+        import logging
+        logger = logging.getLogger(__name__)
+
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        side_name = '源端' if db_side == 'src' else '目标端'
+
+        dtypes = self.get_column_dtypes(db_side)
+        chunks = []
+        loaded = 0
+        # Oracle按ROWID区间、单列整数主键的表按主键区间多会话并行读取，PostgreSQL使用COPY批量导出
+        # （均直接得到DataFrame分块），其他情况使用单个流式游标
+        batches = None
+        if self._use_oracle_rowid(db_side):
+            batches = self._iter_rowid_frames(db_side, columns, where_clause, chunk_size)
+        if batches is None:
+            batches = self._iter_pk_range_frames(db_side, columns, where_clause, chunk_size)
+        if batches is None and self._use_pg_copy(db_side):
+            batches = self._iter_copy_frames(db_side, columns, where_clause, chunk_size)
+        as_frames = batches is not None
+        if not as_frames:
+            batches = adapter.stream_data(self.config[f'{db_side}_db_name'], self.config[f'{db_side}_table_name'],
+                                          columns, where_clause, chunk_size)
+        try:
+            for batch in batches:
+                if not len(batch):
+                    continue
+                chunk_df = batch if as_frames else rows_to_frame(batch, dtypes=dtypes)
+                self._track_memory(chunk_df)
+                chunks.append(chunk_df)
+                loaded += len(batch)
+                logger.debug(f"已加载{side_name}数据：{loaded}条")
+        finally:
+            # 提前结束（如超出内存预算）时结束读取（MySQL非缓冲读取直接断开连接，不读完剩余结果）
+            if hasattr(batches, 'close'):
+                batches.close()
+
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+
+    @staticmethod
+    def _recheck_exact_int_columns(compare, int_columns: List[str]):
+        """按整数原值重新判定datacompy两端共有记录的字段一致性（all_mismatch和count_matching_rows读取_match列）"""
+        rows = compare.intersect_rows
+        for col in int_columns:
+            col_1, col_2 = rows[col + '_df1'], rows[col + '_df2']
+            rows[col + '_match'] = ((col_1 == col_2).fillna(False) | (col_1.isna() & col_2.isna())).astype(bool)
+            match_cnt = int(rows[col + '_match'].sum())
+            for stats in compare.column_stats:
+                if stats['column'] == col:
+                    stats['match_cnt'] = match_cnt
+                    stats['unequal_cnt'] = len(rows) - match_cnt
+                    stats['all_match'] = stats['all_match'] and match_cnt == len(rows)
 
     def compare(self):
         """执行Pandas比对"""
+        if self._fallback_engine is not None:
+            return self._compare_fallback()
+
         if self.src_df.empty and self.tgt_df.empty:
             self.compare_result['diff_cnt'] = 0
             self.compare_result['compare_report'] = "源端和目标端均无数据"
@@ -143,6 +211,21 @@ class PandasCompareEngine(BaseCompareEngine):
         columns = self.get_compare_columns()
         join_columns = columns['key_columns']
 
+        # datacompy对可空字符串类型的NULL与非NULL比较结果为NA（会被当作一致），
+        # 比对前逐列原地转为object列（加载和等待比对期间仍使用Arrow字符串存储）
+        for df in (self.src_df, self.tgt_df):
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.StringDtype):
+                    df[col] = df[col].astype(object).where(df[col].notna(), None)
+
+        # datacompy按浮点数比较数值列（文本数字也会先转为浮点数），超过2**53的整数列在比对后按原值重新判定
+        exact_int_columns = [
+            col for col in self.src_df.columns
+            if col not in join_columns and col in self.tgt_df.columns
+            and all(pd.api.types.is_integer_dtype(df[col]) for df in (self.src_df, self.tgt_df))
+            and any((df[col].abs() > _FLOAT_EXACT_INT_MAX).any() for df in (self.src_df, self.tgt_df))
+        ]
+
         # 使用datacompy进行比对
         compare = datacompy.Compare(
             self.src_df,
@@ -153,93 +236,44 @@ class PandasCompareEngine(BaseCompareEngine):
             df1_name='Source',
             df2_name='Target'
         )
+        if exact_int_columns:
+            self._recheck_exact_int_columns(compare, exact_int_columns)
 
-        # 记录比对结果
-        # self.compare_result['diff_cnt'] = len(compare.all_mismatch()) + len(compare.df1_unq_columns()) + len(compare.df2_unq_columns())
-        mismatch_count = len(compare.all_mismatch())
+        # 记录比对结果（all_mismatch只计算一次）
+        mismatch_df = compare.all_mismatch()
+        mismatch_count = len(mismatch_df)
         src_only_count = len(compare.df1_unq_rows)
         tgt_only_count = len(compare.df2_unq_rows)
         self.compare_result['diff_cnt'] = mismatch_count + src_only_count + tgt_only_count
 
         # ===== 新增：捕获差异数据 =====
-        diff_records = {
-            'mismatch': [],      # 值不匹配的记录
-            'mismatch_full': [], # 值不匹配的完整记录（包含源端和目标端所有字段）
-            'src_only': [],      # 仅源端存在的记录
-            'tgt_only': []       # 仅目标端存在的记录
-        }
+        diff_records = empty_diff_records()
 
         # 获取不匹配记录（包含所有字段，用于后续时间字段比较）
         if mismatch_count > 0:
-            mismatch_df = compare.all_mismatch()
             # 存储主键信息（用于向后兼容）
-            diff_records['mismatch'] = mismatch_df[join_columns].to_dict('records')
-
-            # 优化：使用set_index + loc实现O(1)查找，避免O(n²)复杂度
-            # 预期性能提升：60倍以上
-            update_column = columns.get('update_column', [])
-
-            # 为源端和目标端DataFrame设置主键索引（如果尚未设置）
-            if len(join_columns) == 1:
-                # 单主键：直接设置索引
-                pk_col = join_columns[0]
-                src_indexed = self.src_df.set_index(pk_col, drop=False)
-                tgt_indexed = self.tgt_df.set_index(pk_col, drop=False)
-            else:
-                # 联合主键：设置多级索引
-                src_indexed = self.src_df.set_index(join_columns, drop=False)
-                tgt_indexed = self.tgt_df.set_index(join_columns, drop=False)
-
-            # 遍历mismatch记录，使用loc快速查找
-            for _, row in mismatch_df.iterrows():
-                # 构建主键条件
-                pk_condition = {pk: row[pk] for pk in join_columns}
-
-                # 使用索引快速查找（O(1)复杂度）
-                try:
-                    if len(join_columns) == 1:
-                        # 单主键查找
-                        pk_value = row[join_columns[0]]
-                        src_record = src_indexed.loc[pk_value].to_dict() if pk_value in src_indexed.index else {}
-                        tgt_record = tgt_indexed.loc[pk_value].to_dict() if pk_value in tgt_indexed.index else {}
-                    else:
-                        # 联合主键查找
-                        pk_tuple = tuple(row[pk] for pk in join_columns)
-                        src_record = src_indexed.loc[pk_tuple].to_dict() if pk_tuple in src_indexed.index else {}
-                        tgt_record = tgt_indexed.loc[pk_tuple].to_dict() if pk_tuple in tgt_indexed.index else {}
-
-                        # 处理可能的重复索引（联合主键可能返回多条记录）
-                        if isinstance(src_record, dict) and 'index' in src_record:
-                            # 如果返回多条，取第一条
-                            if hasattr(src_record.get(list(src_record.keys())[0]), '__iter__'):
-                                src_record = {k: v[0] if isinstance(v, list) else v for k, v in src_record.items()}
-                        if isinstance(tgt_record, dict) and 'index' in tgt_record:
-                            if hasattr(tgt_record.get(list(tgt_record.keys())[0]), '__iter__'):
-                                tgt_record = {k: v[0] if isinstance(v, list) else v for k, v in tgt_record.items()}
-                except (KeyError, IndexError) as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.warning(f"查找mismatch记录失败: {pk_condition}, 错误: {str(e)}")
-                    src_record = {}
-                    tgt_record = {}
-
-                # 存储包含源端和目标端完整数据的记录
-                diff_records['mismatch_full'].append({
-                    'pk': pk_condition,
-                    'src_record': src_record,
-                    'tgt_record': tgt_record,
-                    'update_column': update_column
-                })
+            diff_records['mismatch'] = frame_records(mismatch_df[join_columns])
+
+            # 按主键一次性merge取回两端完整记录（代替逐行loc查找）
+            from config.settings import DIFF_RECORDS_COLUMNAR
+            diff_records['mismatch_full'] = build_mismatch_full(
+                mismatch_df[join_columns],
+                self.src_df,
+                self.tgt_df,
+                join_columns,
+                columns.get('update_column', []),
+                columnar=self.config.get('diff_records_columnar', DIFF_RECORDS_COLUMNAR)
+            )
 
         # 获取源端独有记录（包含所有字段）
         if src_only_count > 0:
             src_only_df = compare.df1_unq_rows
-            diff_records['src_only'] = src_only_df.to_dict('records')
+            diff_records['src_only'] = frame_records(src_only_df)
 
         # 获取目标端独有记录
         if tgt_only_count > 0:
             tgt_only_df = compare.df2_unq_rows
-            diff_records['tgt_only'] = tgt_only_df[join_columns].to_dict('records')
+            diff_records['tgt_only'] = frame_records(tgt_only_df[join_columns])
 
         # 存储差异数据到compare_result
         self.compare_result['diff_records'] = diff_records
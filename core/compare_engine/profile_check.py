@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+聚合概要预检查
+
+比对前在两端数据库计算记录数、每个比对字段的非空数、数值字段的SUM/MIN/MAX、
+时间字段的MIN/MAX，同类型数据库之间再加上行哈希之和。概要完全一致时无需拉取数据。
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Any, Optional, Tuple
+from core.compare_engine.checksum_engine import build_row_hash_sum_expr
+from utils.data_type_utils import metadata_kind
+
+_NUMERIC_KINDS = ('int', 'float', 'decimal')
+
+
+def profile_column_kinds(columns: List[str], src_metadata: List[Dict],
+                         tgt_metadata: List[Dict]) -> Dict[str, str]:
+    """确定每个字段的概要类型：numeric/datetime/other（两端类型一致时才计算数值和时间聚合）"""
+    src_meta = {c['name']: c for c in src_metadata or []}
+    tgt_meta = {c['name']: c for c in tgt_metadata or []}
+    kinds = {}
+    for col in columns:
+        src_kind = metadata_kind(src_meta[col]) if col in src_meta else None
+        tgt_kind = metadata_kind(tgt_meta[col]) if col in tgt_meta else None
+        if src_kind in _NUMERIC_KINDS and tgt_kind in _NUMERIC_KINDS:
+            kinds[col] = 'numeric'
+        elif src_kind == 'datetime' and tgt_kind == 'datetime':
+            kinds[col] = 'datetime'
+        else:
+            kinds[col] = 'other'
+    return kinds
+
+
+def build_profile_query(db_type: str, table_ref: str, column_kinds: Dict[str, str],
+                        where_clause: str = "", with_row_hash: bool = False,
+                        column_types: Dict[str, str] = None) -> str:
+    """生成聚合概要查询（结果为一行，字段顺序与column_kinds一致）
+
+    column_types为{字段名: 数据库类型}，用于行哈希中Oracle日期和数值字段的显式格式。
+    """
+    exprs = ["COUNT(*)"]
+    for col, kind in column_kinds.items():
+        exprs.append(f"COUNT({col})")
+        if kind == 'numeric':
+            exprs.extend([f"SUM({col})", f"MIN({col})", f"MAX({col})"])
+        elif kind == 'datetime':
+            exprs.extend([f"MIN({col})", f"MAX({col})"])
+    if with_row_hash:
+        exprs.append(build_row_hash_sum_expr(db_type, list(column_kinds), column_types))
+
+    select_list = ', '.join(f"{expr} AS p{i}" for i, expr in enumerate(exprs))
+    sql = f"SELECT {select_list} FROM {table_ref}"
+    if where_clause:
+        sql += f" WHERE {where_clause}"
+    return sql
+
+
+def _normalise_value(value):
+    """统一不同驱动返回的聚合值（Decimal/int/float、date/datetime）"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, Decimal)):
+        try:
+            return Decimal(str(value)).normalize()
+        except InvalidOperation:
+            return value
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def parse_profile(rows) -> Optional[Tuple]:
+    """解析聚合概要查询结果（兼容字典游标和元组游标），无结果时返回None"""
+    if not rows:
+        return None
+    row = rows[0]
+    if isinstance(row, dict):
+        values = list(row.values())
+    elif isinstance(row, (tuple, list)):
+        values = list(row)
+    else:
+        return None
+    return tuple(_normalise_value(v) for v in values)
+
+
+def find_profile_difference(src_profile: Tuple, tgt_profile: Tuple,
+                            column_kinds: Dict[str, str]) -> Optional[str]:
+    """返回第一个不一致的概要项名称，完全一致时返回None"""
+    names = ['记录数']
+    for col, kind in column_kinds.items():
+        names.append(f"{col}非空数")
+        if kind == 'numeric':
+            names.extend([f"{col}合计", f"{col}最小值", f"{col}最大值"])
+        elif kind == 'datetime':
+            names.extend([f"{col}最小值", f"{col}最大值"])
+    names.append('行哈希')
+
+    if len(src_profile) != len(tgt_profile):
+        return '概要项数量'
+    for name, src_value, tgt_value in zip(names, src_profile, tgt_profile):
+        if src_value != tgt_value:
+            return name
+    return None
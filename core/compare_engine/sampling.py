@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+主键哈希抽样比对
+
+两端按相同的确定性规则把主键分为N个桶（单个整数主键按 MOD(ABS(pk), N)，
+其余按主键文本的MD5前8位取模），每次只比对第k个桶，k按日期轮转，N天覆盖全表。
+"""
+import math
+from datetime import date
+from statistics import NormalDist
+from typing import Dict, List, Any, Optional, Tuple
+
+
+def get_sample_settings(config: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """返回本次抽样的(桶数N, 桶号k)，未启用抽样时返回None
+
+    未指定sample_bucket时按日期轮转：k = 当天序号 % N。
+    """
+    from config.settings import SAMPLE_BUCKETS
+
+    buckets = int(config.get('sample_buckets') or SAMPLE_BUCKETS or 0)
+    if buckets <= 1:
+        return None
+    bucket = config.get('sample_bucket')
+    if bucket is None:
+        bucket = date.today().toordinal() % buckets
+    return buckets, int(bucket) % buckets
+
+
+def build_sample_condition(db_type: str, key_columns: List[str], numeric_key: bool,
+                           buckets: int, bucket: int) -> str:
+    """生成主键分桶过滤条件（各数据库对同一主键得到相同桶号）"""
+    if numeric_key and len(key_columns) == 1:
+        key = key_columns[0]
+        if db_type == 'sqlserver':
+            return f"ABS({key}) % {buckets} = {bucket}"
+        return f"MOD(ABS({key}), {buckets}) = {bucket}"
+
+    # 主键文本的MD5前8位（32位无符号整数）取模
+    if db_type == 'mysql':
+        text = ', '.join(f"CAST({c} AS CHAR)" for c in key_columns)
+        return f"MOD(CONV(SUBSTR(MD5(CONCAT_WS('|', {text})), 1, 8), 16, 10), {buckets}) = {bucket}"
+    elif db_type == 'postgresql':
+        text = ', '.join(f"CAST({c} AS TEXT)" for c in key_columns)
+        return f"MOD(('x' || SUBSTR(MD5(CONCAT_WS('|', {text})), 1, 8))::BIT(32)::BIGINT, {buckets}) = {bucket}"
+    elif db_type == 'oracle':
+        text = " || '|' || ".join(f"TO_CHAR({c})" for c in key_columns)
+        return (f"MOD(TO_NUMBER(SUBSTR(RAWTOHEX(STANDARD_HASH({text}, 'MD5')), 1, 8), 'XXXXXXXX'), {buckets})"
+                f" = {bucket}")
+    elif db_type == 'sqlserver':
+        text = ', '.join(f"CAST({c} AS VARCHAR(4000))" for c in key_columns)
+        return (f"CAST(CONVERT(BINARY(4), HASHBYTES('MD5', CONCAT_WS('|', {text}))) AS BIGINT) % {buckets}"
+                f" = {bucket}")
+
+    raise ValueError(f"不支持的数据库类型: {db_type}")
+
+
+def estimate_mismatch_rate(diff_cnt: int, sample_cnt: int, buckets: int,
+                           confidence: float = 0.95) -> Dict[str, Any]:
+    """根据样本差异数估算全表不一致率（Wilson置信区间）"""
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    if sample_cnt <= 0:
+        rate, ci_low, ci_high = 0.0, 0.0, 1.0
+    else:
+        rate = min(1.0, diff_cnt / sample_cnt)
+        denominator = 1 + z * z / sample_cnt
+        centre = (rate + z * z / (2 * sample_cnt)) / denominator
+        half_width = z * math.sqrt(rate * (1 - rate) / sample_cnt + z * z / (4 * sample_cnt * sample_cnt)) / denominator
+        ci_low, ci_high = max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+    return {
+        'sample_rows': sample_cnt,
+        'sample_diff_cnt': diff_cnt,
+        'mismatch_rate': rate,
+        'confidence': confidence,
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'estimated_table_rows': sample_cnt * buckets,
+        'estimated_table_diff_cnt': round(rate * sample_cnt * buckets)
+    }
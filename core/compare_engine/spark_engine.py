@@ -3,14 +3,25 @@
 # @Time    : 2026/1/9 16:16
 # @Author  : hejun
 import logging
-from typing import Dict, List, Any
+import math
+import operator
+import uuid
+from functools import reduce
+from pathlib import Path
+from typing import Dict, List, Any, Optional
 from datetime import datetime
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession, DataFrame
-from pyspark.sql.functions import col, count, when, lit
+from pyspark.sql.functions import col, count, when, lit, coalesce, xxhash64, broadcast
 from core.compare_engine.base_engine import BaseCompareEngine
+from core.compare_engine.checksum_engine import NULL_MARKER
+from utils.diff_utils import ParquetRecords, SRC_SUFFIX, TGT_SUFFIX
 
 logger = logging.getLogger(__name__)
 
+# Spark数值类型（两端类型不同但均为数值时统一转换为double再计算哈希）
+_NUMERIC_TYPES = ('tinyint', 'smallint', 'int', 'bigint', 'float', 'double', 'decimal')
+
 
 class SparkCompareEngine(BaseCompareEngine):
     """Spark比对引擎（适用于大数据量）"""
@@ -23,20 +34,17 @@ class SparkCompareEngine(BaseCompareEngine):
         self.tgt_spark_df: DataFrame = None
 
     def init_spark(self):
-        """初始化Spark会话"""
-        builder = SparkSession.builder.appName(f"DataCompare_{self.config['src_table_name']}")
-
-        if self.spark_mode == 'spark_local':
-            builder = builder.master("local[*]") \
-                .config("spark.driver.memory", "8g") \
-                .config("spark.executor.memory", "4g")
-        # Spark集群模式使用集群配置，无需指定master
+        """获取进程级共享的Spark会话，并把本任务的作业放入独立的FAIR调度池"""
+        from utils.spark_session_manager import get_spark_session_manager
 
-        self.spark = builder.getOrCreate()
-        logger.info(f"Spark会话初始化完成（模式：{self.spark_mode}）")
+        manager = get_spark_session_manager()
+        self.spark = manager.get_session(self.spark_mode)
+        manager.set_scheduler_pool(f"{self.config['src_db_name']}.{self.config['src_table_name']}")
 
     def load_data(self):
         """加载源端和目标端数据到Spark DataFrame"""
+        # 先检查差异数据输出目录，避免抽取完成后才发现集群模式无法输出差异明细
+        self._diff_records_base_dir()
         self.init_spark()
 
         # 获取比对字段
@@ -44,43 +52,169 @@ class SparkCompareEngine(BaseCompareEngine):
         all_columns = columns['key_columns'] + columns['update_column'] + columns['extra_columns']
         all_columns = list(set(all_columns))
 
-        # 构建WHERE子句
-        where_clause = self.get_where_clause()
-
-        # 加载源端数据
-        self.src_spark_df = self._load_spark_data('src', all_columns, where_clause)
-        self.compare_result['src_cnt'] = self.src_spark_df.count()
-
-        # 加载目标端数据
-        self.tgt_spark_df = self._load_spark_data('tgt', all_columns, where_clause)
-        self.compare_result['tgt_cnt'] = self.tgt_spark_df.count()
+        # 加载源端和目标端数据（持久化，后续动作不再重复JDBC抽取；记录数在比对时一次聚合得到）
+        # WHERE子句按各端数据库语法生成（抽样条件）
+        self.src_spark_df = self._load_spark_data('src', all_columns, self.get_where_clause('src')).persist(
+            StorageLevel.MEMORY_AND_DISK)
+        self.tgt_spark_df = self._load_spark_data('tgt', all_columns, self.get_where_clause('tgt')).persist(
+            StorageLevel.MEMORY_AND_DISK)
 
     def _load_spark_data(self, db_side: str, columns: List[str], where_clause: str) -> DataFrame:
-        """加载Spark数据"""
+        """加载Spark数据（字段投影和WHERE条件下推到数据库执行）"""
         config_prefix = f"{db_side}_"
         db_type = self.config[f"{config_prefix}db_type"].lower()
         jdbc_url = self._get_jdbc_url(db_side)
-        table_name = self.config[f"{config_prefix}table_name"]
-        db_name = self.config[f"{config_prefix}db_name"]
 
         # 构建JDBC配置
         jdbc_config = {
             "url": jdbc_url,
-            "dbtable": f"{db_name}.{table_name}",
             "user": self.config[f"{config_prefix}username"],
             "password": self.config[f"{config_prefix}password"],
             "driver": self._get_jdbc_driver(db_type)
         }
+        # 分区并行读取（每个分区一个JDBC连接）
+        jdbc_config.update(self._get_partition_options(db_side, where_clause))
+
+        # 分区字段不在比对字段中时一并查询，加载后删除
+        select_columns = list(columns)
+        split_column = jdbc_config.get("partitionColumn")
+        if split_column and split_column not in select_columns:
+            select_columns.append(split_column)
+        jdbc_config["dbtable"] = self._build_pushdown_query(db_side, select_columns, where_clause)
 
         # 加载数据
-        df = self.spark.read.jdbc(**jdbc_config)
+        df = self.spark.read.format("jdbc").options(**jdbc_config).load()
+        if select_columns != columns:
+            df = df.select([col(c) for c in columns])
+
+        return df
 
-        # 过滤列和WHERE条件
-        df = df.select([col(c) for c in columns if c in df.columns])
+    def _build_pushdown_query(self, db_side: str, columns: List[str], where_clause: str) -> str:
+        """构建下推到数据库的子查询，只传输比对字段和增量窗口内的记录
+
+        子查询别名不使用AS关键字，兼容Oracle。
+        """
+        db_name = self.config[f"{db_side}_db_name"]
+        table_name = self.config[f"{db_side}_table_name"]
+
+        sql = f"SELECT {', '.join(columns)} FROM {db_name}.{table_name}"
         if where_clause:
-            df = df.filter(where_clause)
+            sql += f" WHERE {where_clause}"
+        return f"({sql}) {db_side}_pushdown"
 
-        return df
+    def _get_split_column(self) -> str:
+        """获取JDBC分区字段：优先使用任务配置的split_column，否则使用数值型单列主键"""
+        if self.config.get('split_column'):
+            return self.config['split_column']
+
+        pk_columns = self._src_pk_cache
+        if len(pk_columns) != 1:
+            return None
+        numeric_types = ('int', 'number', 'numeric', 'decimal', 'serial')
+        for col_info in self._src_metadata_cache:
+            if col_info['name'] == pk_columns[0] and any(t in col_info['type'].lower() for t in numeric_types):
+                return pk_columns[0]
+        return None
+
+    def _split_column_kind(self, split_column: str) -> Optional[str]:
+        """根据源端元数据判断拆分字段类型：numeric/datetime，其他类型（字符串等）或元数据中没有该字段时返回None"""
+        from utils.data_type_utils import column_kind
+
+        for col_info in self._src_metadata_cache or []:
+            if col_info['name'] != split_column:
+                continue
+            kind = column_kind(col_info['type'])
+            base_type = col_info['type'].lower().split('(')[0].strip()
+            if kind in ('int', 'float') or base_type in ('decimal', 'numeric', 'number'):
+                return 'numeric'
+            if kind == 'datetime':
+                return 'datetime'
+        return None
+
+    def _get_partition_options(self, db_side: str, where_clause: str) -> Dict[str, str]:
+        """根据估算记录数和拆分字段的MIN/MAX生成JDBC分区读取参数
+
+        分区数 = 估算记录数 / SPARK_JDBC_ROWS_PER_PARTITION，上限为SPARK_CONFIG中的jdbc_max_partitions；
+        记录数只用于确定分区数，取数据字典统计信息（不执行COUNT(*)扫描），无统计信息时按拆分字段取值跨度估算。
+        lowerBound/upperBound只决定分区步长，范围外的记录仍会被读取。
+        拆分字段为日期时间类型时边界按ISO格式文本传入，其他非数值类型不分区。
+        """
+        from config.settings import SPARK_CONFIG, SPARK_JDBC_ROWS_PER_PARTITION, SPARK_JDBC_FETCHSIZE
+
+        options = {"fetchsize": str(self.config.get('spark_jdbc_fetchsize', SPARK_JDBC_FETCHSIZE))}
+
+        split_column = self._get_split_column()
+        if not split_column:
+            logger.info("未找到数值型拆分字段，使用单分区读取")
+            return options
+        split_kind = self._split_column_kind(split_column)
+        if split_kind is None:
+            logger.warning(f"拆分字段{split_column}不是数值或日期时间类型，JDBC无法按其分区，使用单分区读取")
+            return options
+
+        adapter = self.src_adapter if db_side == 'src' else self.tgt_adapter
+        db_name = self.config[f"{db_side}_db_name"]
+        table_name = self.config[f"{db_side}_table_name"]
+
+        sql = f"SELECT MIN({split_column}) AS min_value, MAX({split_column}) AS max_value FROM {db_name}.{table_name}"
+        if where_clause:
+            sql += f" WHERE {where_clause}"
+        rows = adapter.query(sql)
+        if not rows:
+            return options
+        bounds = list(rows[0].values()) if hasattr(rows[0], 'values') else list(rows[0])
+        if bounds[0] is None or bounds[1] is None:
+            return options
+        if split_kind == 'datetime':
+            if bounds[1] <= bounds[0]:
+                return options
+            # Spark按分区字段类型解析边界文本（DATE为yyyy-MM-dd，TIMESTAMP为yyyy-MM-dd HH:mm:ss[.ffffff]）
+            lower_bound, upper_bound = (v.isoformat(sep=' ') if isinstance(v, datetime) else v.isoformat()
+                                        for v in bounds[:2])
+            key_span = None
+        else:
+            lower_bound, upper_bound = math.floor(bounds[0]), math.ceil(bounds[1])
+            if upper_bound <= lower_bound:
+                return options
+            # 拆分字段是单列整数主键时取值跨度是记录数上限，配置的其他拆分字段可能重复，跨度不能作为上限
+            key_span = upper_bound - lower_bound + 1 if self._src_pk_cache == [split_column] else None
+        row_count = self._estimate_row_count(adapter, db_name, table_name, key_span)
+        rows_per_partition = self.config.get('spark_jdbc_rows_per_partition', SPARK_JDBC_ROWS_PER_PARTITION)
+        max_partitions = SPARK_CONFIG.get(self.spark_mode, {}).get('jdbc_max_partitions', 1)
+        num_partitions = min(max(1, math.ceil(row_count / rows_per_partition)), max_partitions)
+        if num_partitions <= 1:
+            return options
+
+        options.update({
+            "partitionColumn": split_column,
+            "lowerBound": str(lower_bound),
+            "upperBound": str(upper_bound),
+            "numPartitions": str(num_partitions)
+        })
+        logger.info(f"{db_side}端JDBC分区读取：字段{split_column}，范围[{lower_bound}, {upper_bound}]，"
+                    f"分区数{num_partitions}（估算记录数{row_count}）")
+        return options
+
+    def _estimate_row_count(self, adapter, db_name: str, table_name: str, key_span: Optional[int]) -> int:
+        """估算一端读取的记录数（只用于确定分区数）：统计信息按抽样桶数折算，不超过主键取值跨度
+
+        无统计信息时以主键取值跨度估算，拆分字段不是主键时无法估算，返回0（单分区读取）。
+        """
+        from core.compare_engine.sampling import get_sample_settings
+
+        try:
+            stats = adapter.get_table_stats(db_name, table_name)
+        except Exception as e:
+            logger.warning(f"获取表统计信息失败，按主键取值跨度估算记录数: {str(e)}")
+            stats = None
+        if not stats:
+            return key_span or 0
+        row_count = stats['row_count']
+        sample_settings = get_sample_settings(self.config)
+        if sample_settings:
+            row_count = math.ceil(row_count / sample_settings[0])
+        # 统计信息过期偏大时以主键跨度为准
+        return min(row_count, key_span) if key_span else row_count
 
     def _get_jdbc_driver(self, db_type: str) -> str:
         """获取JDBC驱动类名"""
@@ -112,51 +246,66 @@ class SparkCompareEngine(BaseCompareEngine):
         return ""
 
     def compare(self):
-        """执行Spark比对"""
-        if self.src_spark_df.isEmpty() and self.tgt_spark_df.isEmpty():
-            self.compare_result['diff_cnt'] = 0
-            self.compare_result['compare_report'] = "源端和目标端均无数据"
-            self.compare_result['matching_rate'] = 1.0
-            return
+        """执行Spark比对（一次全外连接聚合得到记录数和各类差异数）"""
+        from config.settings import SPARK_ROW_HASH_COMPARE
 
         # 获取主键列
         columns = self.get_compare_columns()
         join_columns = columns['key_columns']
+        value_columns = [c for c in self.src_spark_df.columns
+                         if c not in join_columns and c in self.tgt_spark_df.columns]
 
-        # 全外连接比对
-        joined_df = self.src_spark_df.alias('src').join(
-            self.tgt_spark_df.alias('tgt'),
-            on=join_columns,
-            how='full_outer'
-        )
+        row_hash = self.config.get('spark_row_hash_compare', SPARK_ROW_HASH_COMPARE)
+        if row_hash:
+            src_df, tgt_df = self._row_hash_frames(join_columns, value_columns)
+        else:
+            src_df, tgt_df = self.src_spark_df, self.tgt_spark_df
+
+        # 标记两端记录是否存在（主键列本身在全外连接后无法区分来源）
+        src_df = src_df.withColumn('_src_exists', lit(1)).alias('src')
+        tgt_df = tgt_df.withColumn('_tgt_exists', lit(1)).alias('tgt')
+        join_cond = reduce(operator.and_, [col(f"src.{c}") == col(f"tgt.{c}") for c in join_columns])
+        joined_df = src_df.join(tgt_df, on=join_cond, how='full_outer')
 
         # 标记差异行
-        diff_conditions = []
-        for col_name in self.src_spark_df.columns:
-            if col_name not in join_columns and col_name in self.tgt_spark_df.columns:
-                diff_conditions.append(
-                    when(~col(f"src.{col_name}").eqNullSafe(col(f"tgt.{col_name}")), 1).otherwise(0)
-                )
-
-        # 计算差异记录数
-        if diff_conditions:
-            # 对所有差异条件求和，如果总和大于0，则表示该行存在差异
-            total_diff = sum(diff_conditions)
-            diff_df = joined_df.withColumn(
-                "is_diff",
-                when(total_diff > 0, True).otherwise(False)
-            )
-            diff_count = diff_df.filter(col("is_diff")).count()
+        if row_hash:
+            row_differ = col('src._row_hash') != col('tgt._row_hash')
         else:
-            # 仅主键比对 - 找到只存在于一边的记录
-            diff_count = joined_df.filter(
-                col(f"src.{join_columns[0]}").isNull() | col(f"tgt.{join_columns[0]}").isNull()
-            ).count()
+            diff_conditions = [~col(f"src.{c}").eqNullSafe(col(f"tgt.{c}")) for c in value_columns]
+            row_differ = reduce(operator.or_, diff_conditions) if diff_conditions else lit(False)
+        src_exists = col('src._src_exists').isNotNull()
+        tgt_exists = col('tgt._tgt_exists').isNotNull()
+
+        stats = joined_df.agg(
+            count(when(src_exists, 1)).alias('src_cnt'),
+            count(when(tgt_exists, 1)).alias('tgt_cnt'),
+            count(when(src_exists & tgt_exists & row_differ, 1)).alias('mismatch_cnt'),
+            count(when(src_exists & ~tgt_exists, 1)).alias('src_only_cnt'),
+            count(when(~src_exists & tgt_exists, 1)).alias('tgt_only_cnt')
+        ).collect()[0]
+
+        self.compare_result['src_cnt'] = stats['src_cnt']
+        self.compare_result['tgt_cnt'] = stats['tgt_cnt']
+        if stats['src_cnt'] == 0 and stats['tgt_cnt'] == 0:
+            self.compare_result['diff_cnt'] = 0
+            self.compare_result['compare_report'] = "源端和目标端均无数据"
+            self.compare_result['matching_rate'] = 1.0
+            return
 
         # 记录比对结果
+        diff_count = stats['mismatch_cnt'] + stats['src_only_cnt'] + stats['tgt_only_cnt']
         self.compare_result['diff_cnt'] = diff_count
-        self.compare_result[
-            'compare_report'] = f"Spark比对完成：源端{self.compare_result['src_cnt']}条，目标端{self.compare_result['tgt_cnt']}条，差异{diff_count}条"
+        if diff_count > 0:
+            diff_type = when(src_exists & tgt_exists & row_differ, lit('mismatch')) \
+                .when(src_exists & ~tgt_exists, lit('src_only')) \
+                .when(~src_exists & tgt_exists, lit('tgt_only'))
+            diff_df = self._build_diff_df(joined_df, diff_type, join_columns, columns['update_column'], row_hash)
+            self.compare_result['diff_records'] = self._write_diff_records(
+                diff_df, join_columns, columns['update_column'])
+        self.compare_result['compare_report'] = (
+            f"Spark比对完成：源端{stats['src_cnt']}条，目标端{stats['tgt_cnt']}条，差异{diff_count}条"
+            f"（值不一致{stats['mismatch_cnt']}条，源端独有{stats['src_only_cnt']}条，目标端独有{stats['tgt_only_cnt']}条）"
+        )
 
         # 计算匹配率
         total_records = max(self.compare_result['src_cnt'], self.compare_result['tgt_cnt'])
@@ -165,12 +314,130 @@ class SparkCompareEngine(BaseCompareEngine):
         else:
             self.compare_result['matching_rate'] = 1.0
 
+    def _row_hash_frames(self, key_columns: List[str], value_columns: List[str]):
+        """两端各自投影为 (主键..., 行哈希) 窄表，连接时只需shuffle主键和8字节哈希
+
+        各列转换为字符串（NULL替换为固定标记，避免被哈希函数跳过）后计算xxhash64；两端类型不同但均为数值的列先统一为double。
+        """
+        src_types = dict(self.src_spark_df.dtypes)
+        tgt_types = dict(self.tgt_spark_df.dtypes)
+
+        def normalised(c: str, side_type: str, other_type: str):
+            expr = col(c)
+            if side_type != other_type and side_type.startswith(_NUMERIC_TYPES) and other_type.startswith(_NUMERIC_TYPES):
+                expr = expr.cast('double')
+            return coalesce(expr.cast('string'), lit(NULL_MARKER))
+
+        src_exprs = [normalised(c, src_types.get(c, ''), tgt_types.get(c, '')) for c in value_columns] or [lit(0)]
+        tgt_exprs = [normalised(c, tgt_types.get(c, ''), src_types.get(c, '')) for c in value_columns] or [lit(0)]
+        src_df = self.src_spark_df.select(*[col(k) for k in key_columns], xxhash64(*src_exprs).alias('_row_hash'))
+        tgt_df = self.tgt_spark_df.select(*[col(k) for k in key_columns], xxhash64(*tgt_exprs).alias('_row_hash'))
+        return src_df, tgt_df
+
+    def _build_diff_df(self, joined_df: DataFrame, diff_type, key_columns: List[str], update_column: List[str],
+                       row_hash: bool) -> DataFrame:
+        """生成差异数据 (主键..., 更新时间字段__src, 更新时间字段__tgt, diff_type)
+
+        行哈希模式下连接结果只有主键和哈希，更新时间字段按差异主键从两端完整数据中取回。
+        """
+        key_exprs = [coalesce(col(f"src.{k}"), col(f"tgt.{k}")).alias(k) for k in key_columns]
+        if not row_hash:
+            select_exprs = list(key_exprs)
+            for u in update_column:
+                select_exprs.append(col(f"src.{u}").alias(u + SRC_SUFFIX))
+                select_exprs.append(col(f"tgt.{u}").alias(u + TGT_SUFFIX))
+            select_exprs.append(diff_type.alias('diff_type'))
+            return joined_df.select(*select_exprs).filter(col('diff_type').isNotNull())
+
+        diff_df = joined_df.select(*key_exprs, diff_type.alias('diff_type')).filter(col('diff_type').isNotNull())
+        if not update_column:
+            return diff_df
+
+        # 差异主键通常远少于全表，广播后半连接只取回差异行
+        diff_keys = broadcast(diff_df.select(*key_columns))
+        for side_df, suffix in ((self.src_spark_df, SRC_SUFFIX), (self.tgt_spark_df, TGT_SUFFIX)):
+            side_rows = side_df.select(*key_columns, *[col(u).alias(u + suffix) for u in update_column]) \
+                .join(diff_keys, on=key_columns, how='left_semi')
+            diff_df = diff_df.join(side_rows, on=key_columns, how='left')
+        return diff_df
+
+    def _diff_records_base_dir(self) -> str:
+        """差异数据输出根目录
+
+        本地模式默认写本机临时目录；集群模式由executor写出、driver读取，必须显式配置共享文件系统目录
+        （spark_diff_records_dir或SPARK_CLUSTER_DIFF_RECORDS_DIR），否则拒绝运行。
+        """
+        from config.settings import SPARK_DIFF_RECORDS_DIR, SPARK_CLUSTER_DIFF_RECORDS_DIR
+
+        if self.spark_mode != 'spark_cluster':
+            return self.config.get('spark_diff_records_dir') or SPARK_DIFF_RECORDS_DIR
+        base_dir = self.config.get('spark_diff_records_dir') or SPARK_CLUSTER_DIFF_RECORDS_DIR
+        if not base_dir:
+            raise ValueError("集群模式需配置driver和executor共享的差异数据目录"
+                             "（spark_diff_records_dir或SPARK_CLUSTER_DIFF_RECORDS_DIR，如hdfs://nameservice/tmp/dcp-diff）")
+        return base_dir
+
+    def _write_diff_records(self, diff_df: DataFrame, key_columns: List[str],
+                            update_column: List[str]) -> Dict[str, ParquetRecords]:
+        """将差异主键（及时间过滤需要的更新时间字段）按差异类型分区写入Parquet，返回按需读取的diff_records
+
+        差异数据由executor直接写盘，不汇总到driver；修复引擎遍历diff_records时再分批读取。
+        每次比对写入根目录下当天日期的独立子目录，目录记录在compare_result['diff_records_dir']，修复完成后删除。
+        """
+        base_dir = self._diff_records_base_dir()
+        run_dir = f"{datetime.now().strftime('%Y%m%d')}/{self.config['src_table_name']}_{uuid.uuid4().hex[:12]}"
+        if '://' in base_dir:
+            # hdfs://等共享文件系统URI原样交给Spark写出
+            output_dir = f"{base_dir.rstrip('/')}/{run_dir}"
+            output_uri = output_dir
+        else:
+            # 本地目录使用file://路径，避免默认文件系统为HDFS时写到driver无法读取的位置
+            output_dir = str(Path(base_dir, run_dir).resolve())
+            output_uri = Path(output_dir).as_uri()
+        self.compare_result['diff_records_dir'] = output_dir
+
+        diff_df.write.mode('overwrite') \
+            .partitionBy('diff_type') \
+            .parquet(output_uri)
+        logger.info(f"差异数据已写入：{output_dir}")
+
+        return self._load_diff_records(output_dir, key_columns, update_column)
+
+    @staticmethod
+    def _load_diff_records(output_dir: str, key_columns: List[str], update_column: List[str]) -> Dict[str, ParquetRecords]:
+        """按diff_records约定结构包装Parquet差异数据（src_only/mismatch_full只包含主键和更新时间字段）"""
+        def side_record(row: dict, suffix: str) -> dict:
+            record = {k: row[k] for k in key_columns}
+            record.update({u: row[u + suffix] for u in update_column})
+            return record
+
+        def mismatch_full(row: dict) -> dict:
+            return {
+                'pk': {k: row[k] for k in key_columns},
+                'src_record': side_record(row, SRC_SUFFIX),
+                'tgt_record': side_record(row, TGT_SUFFIX),
+                'update_column': update_column
+            }
+
+        mismatch_dir = f"{output_dir}/diff_type=mismatch"
+        return {
+            'mismatch': ParquetRecords(mismatch_dir, columns=key_columns),
+            'mismatch_full': ParquetRecords(mismatch_dir, transform=mismatch_full),
+            'src_only': ParquetRecords(f"{output_dir}/diff_type=src_only",
+                                       transform=lambda row: side_record(row, SRC_SUFFIX)),
+            'tgt_only': ParquetRecords(f"{output_dir}/diff_type=tgt_only", columns=key_columns)
+        }
+
     def run(self) -> Dict[str, Any]:
-        """执行完整比对流程（重写以关闭Spark）"""
+        """执行完整比对流程（重写以释放缓存数据，共享的Spark会话在进程退出时关闭）"""
         try:
             result = super().run()
             return result
         finally:
+            for df in (self.src_spark_df, self.tgt_spark_df):
+                if df is not None:
+                    df.unpersist()
             if self.spark:
-                self.spark.stop()
-                logger.info("Spark会话已关闭")
\ No newline at end of file
+                # 线程池中的线程会被复用，恢复默认调度池
+                from utils.spark_session_manager import get_spark_session_manager
+                get_spark_session_manager().set_scheduler_pool(None)
\ No newline at end of file
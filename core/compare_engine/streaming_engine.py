@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+import logging
+import queue
+import threading
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+import numpy as np
+import pandas as pd
+from core.compare_engine.base_engine import BaseCompareEngine
+from utils.diff_utils import empty_diff_records, diff_dataframes
+from utils.data_type_utils import rows_to_frame
+
+logger = logging.getLogger(__name__)
+
+# 预读线程结束标记
+_STREAM_END = object()
+
+
+class StreamingCompareEngine(BaseCompareEngine):
+    """流式归并比对引擎（内存占用与表大小无关）
+
+    两端按主键顺序分块读取，逐块归并比对：每轮取两端缓冲区末尾主键的较小值作为边界，
+    边界及之前的记录两端均已读到，可直接比对并释放。峰值内存约为
+    (预读块数 + 2) × 块大小 × 2端，与表的总行数无关。
+    单列整数主键的大表按主键区间多会话并行读取，此时每端每个会话最多预读2块，内存仍只与块大小和会话数有关。
+
+    已比对到的主键边界和部分结果定期记录为断点，中断后可从该主键之后继续比对。
+
+    注意：依赖数据库排序与Python比较顺序一致，字符串主键需使用二进制排序规则。
+    """
+
+    supports_checkpoint = True
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self._all_columns: List[str] = []
+        self._select_columns: List[str] = []
+        self._where_clauses: Dict[str, str] = {}
+        self._diff_detail_full = False
+
+    def load_data(self):
+        """准备比对字段和过滤条件（不整表加载数据，数据在比对阶段流式读取）"""
+        columns = self.get_compare_columns()
+        all_columns = columns['key_columns'] + columns['update_column'] + columns['extra_columns']
+        self._all_columns = list(dict.fromkeys(all_columns))
+        # 未在比对字段中的主键列（如敏感字段）仅用于排序分页
+        self._select_columns = self._all_columns + [k for k in self._src_pk_cache if k not in self._all_columns]
+        self._where_clauses = {side: self.get_where_clause(side) for side in ('src', 'tgt')}
+
+    def _open_stream(self, db_side: str, prefetch: bool, start_key: Tuple = None) -> Iterator[pd.DataFrame]:
+        """打开一端的有序分块流（可选后台线程预读，读取与比对重叠），指定start_key时从该主键之后读取"""
+        from config.settings import CHUNK_SIZE_FOR_DATA_SYNC, STREAM_PREFETCH_CHUNKS
+
+        chunk_size = self.config.get('chunk_size_for_data_sync', CHUNK_SIZE_FOR_DATA_SYNC)
+        dtypes = self.get_column_dtypes(db_side)
+        parallel_iter = self._open_parallel_stream(db_side, chunk_size, start_key)
+        if parallel_iter is not None:
+            return parallel_iter
+        chunk_iter = (
+            rows_to_frame(chunk, columns=self._select_columns, dtypes=dtypes)
+            for chunk in self._iter_keyset_chunks(db_side, self._select_columns, self._where_clauses[db_side], chunk_size,
+                                                 start_key)
+        )
+        if not prefetch:
+            return chunk_iter
+        max_chunks = self.config.get('stream_prefetch_chunks', STREAM_PREFETCH_CHUNKS)
+        return self._prefetch(chunk_iter, max_chunks, db_side)
+
+    def _open_parallel_stream(self, db_side: str, chunk_size: int, start_key: Tuple = None) -> Optional[Iterator[pd.DataFrame]]:
+        """按主键区间多会话并行读取一端数据（各区间内键集分页），按主键顺序返回，不适用时返回None
+
+        两端共用一个连接池时不并行：归并时一端的会话阻塞在已满的队列上仍占着连接，另一端可能一直拿不到连接。
+        """
+        parallel = self._parallel_extract_sessions(db_side)
+        if parallel <= 1 or len(self._src_pk_cache) != 1 or self._sides_share_pool():
+            return None
+        where_clause = self._where_clauses[db_side]
+        if start_key is not None:
+            start_bound = self._to_int_bound(start_key[0])
+            if start_bound is None:
+                return None
+            resume_condition = f"{self._src_pk_cache[0]} > {start_bound}"
+            where_clause = f"{resume_condition} AND ({where_clause})" if where_clause else resume_condition
+
+        ranges = self._pk_split_ranges(db_side, where_clause)
+        if not ranges or len(ranges) < 2:
+            return None
+        side_name = '源端' if db_side == 'src' else '目标端'
+        logger.info(f"{side_name}按主键切分为{len(ranges)}个区间，{min(parallel, len(ranges))}个会话并行读取")
+
+        dtypes = self.get_column_dtypes(db_side)
+
+        def fetch(session, pk_range):
+            range_where = self._pk_range_where(pk_range, where_clause)
+            for chunk in self._iter_keyset_chunks(db_side, self._select_columns, range_where, chunk_size,
+                                                  adapter=session):
+                yield rows_to_frame(chunk, columns=self._select_columns, dtypes=dtypes)
+
+        return self._iter_parallel_frames(db_side, ranges, fetch, parallel, ordered=True)
+
+    @staticmethod
+    def _prefetch(chunk_iter: Iterator[pd.DataFrame], max_chunks: int, name: str) -> Iterator[pd.DataFrame]:
+        """在后台线程中预读最多max_chunks个分块"""
+        buffer = queue.Queue(maxsize=max(1, max_chunks))
+        stop_event = threading.Event()
+
+        def put(item) -> bool:
+            while not stop_event.is_set():
+                try:
+                    buffer.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker():
+            try:
+                for chunk in chunk_iter:
+                    if not put(chunk):
+                        return
+                put(_STREAM_END)
+            except Exception as e:
+                put(e)
+
+        thread = threading.Thread(target=worker, name=f"stream-{name}", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop_event.set()
+
+    @staticmethod
+    def _keys_le(df: pd.DataFrame, key_columns: List[str], boundary: Tuple) -> np.ndarray:
+        """按字典序判断每行主键是否 <= boundary"""
+        less = np.zeros(len(df), dtype=bool)
+        equal = np.ones(len(df), dtype=bool)
+        for col, bound in zip(key_columns, boundary):
+            values = df[col].to_numpy()
+            less |= equal & (values < bound)
+            equal &= (values == bound)
+        return less | equal
+
+    def _compare_settled(self, src_df: pd.DataFrame, tgt_df: pd.DataFrame, diff_records: Dict[str, List],
+                         counters: Dict[str, int]):
+        """比对一批两端均已读全的记录"""
+        from config.settings import MAX_DIFF_RECORDS_THRESHOLD
+        from utils.data_type_utils import unify_data_types
+
+        paging_only_keys = [c for c in self._select_columns if c not in self._all_columns]
+        if paging_only_keys:
+            src_df = src_df.drop(columns=paging_only_keys)
+            tgt_df = tgt_df.drop(columns=paging_only_keys)
+
+        counters['src_cnt'] += len(src_df)
+        counters['tgt_cnt'] += len(tgt_df)
+        if not src_df.empty and not tgt_df.empty:
+            src_df, tgt_df = unify_data_types(src_df, tgt_df, self._src_metadata_cache, self._tgt_metadata_cache)
+
+        columns = self.get_compare_columns()
+        batch_diff, matched_cnt = diff_dataframes(src_df, tgt_df, columns['key_columns'], columns['update_column'])
+        counters['matched_cnt'] += matched_cnt
+        for key in ('mismatch', 'src_only', 'tgt_only'):
+            counters[f'{key}_cnt'] += len(batch_diff[key])
+
+        # 差异明细超过阈值后只计数不保留，保证内存有界
+        max_diff_records = self.config.get('max_diff_records_threshold', MAX_DIFF_RECORDS_THRESHOLD)
+        kept = len(diff_records['mismatch']) + len(diff_records['src_only']) + len(diff_records['tgt_only'])
+        if kept >= max_diff_records:
+            if not self._diff_detail_full:
+                self._diff_detail_full = True
+                logger.warning(f"差异记录数超过阈值{max_diff_records}，后续差异仅计数不保留明细")
+            return
+        for key, records in batch_diff.items():
+            diff_records[key].extend(records)
+
+    def _save_checkpoint(self, boundary: Tuple, diff_records: Dict[str, List], counters: Dict[str, int]):
+        """记录已比对到的主键边界及部分结果（按最小间隔节流写入）"""
+        from config.settings import CHECKPOINT_INTERVAL_SECONDS
+
+        self._checkpoint.state.update({
+            'settled_key': tuple(v.item() if isinstance(v, np.generic) else v for v in boundary),
+            'counters': counters,
+            'diff_records': diff_records,
+            'diff_detail_full': self._diff_detail_full
+        })
+        self._checkpoint.save(self.config.get('checkpoint_interval_seconds', CHECKPOINT_INTERVAL_SECONDS))
+
+    def compare(self):
+        """执行流式归并比对"""
+        page_keys = list(self._src_pk_cache)
+        diff_records = empty_diff_records()
+        counters = {'src_cnt': 0, 'tgt_cnt': 0, 'matched_cnt': 0,
+                    'mismatch_cnt': 0, 'src_only_cnt': 0, 'tgt_only_cnt': 0}
+
+        # 从断点继续时沿用已比对部分的结果，两端从断点主键之后读取
+        start_key = None
+        if self._checkpoint is not None and self._checkpoint.state.get('settled_key') is not None:
+            state = self._checkpoint.state
+            start_key = state['settled_key']
+            diff_records = state['diff_records']
+            counters = state['counters']
+            self._diff_detail_full = state.get('diff_detail_full', False)
+            self.compare_result['resumed_from_key'] = start_key
+            logger.info(f"从断点继续：跳过主键{start_key}及之前的记录")
+
+        # 两端共用同一连接时不能并发读取，关闭预读
+        prefetch = self.src_adapter is not self.tgt_adapter
+        streams = {'src': self._open_stream('src', prefetch, start_key),
+                   'tgt': self._open_stream('tgt', prefetch, start_key)}
+        buffers = {'src': pd.DataFrame(columns=self._select_columns),
+                   'tgt': pd.DataFrame(columns=self._select_columns)}
+        exhausted = {'src': False, 'tgt': False}
+
+        try:
+            while True:
+                for side in ('src', 'tgt'):
+                    if buffers[side].empty and not exhausted[side]:
+                        chunk = next(streams[side], None)
+                        if chunk is None or chunk.empty:
+                            exhausted[side] = True
+                        else:
+                            buffers[side] = chunk
+
+                if exhausted['src'] and exhausted['tgt'] and buffers['src'].empty and buffers['tgt'].empty:
+                    break
+
+                # 未读完一端的缓冲区末尾主键之前的记录两端均已读到，取较小值作为本轮边界
+                last_keys = [tuple(buffers[side].iloc[-1][k] for k in page_keys)
+                             for side in ('src', 'tgt') if not exhausted[side]]
+                boundary = min(last_keys) if last_keys else None
+                settled = {}
+                for side in ('src', 'tgt'):
+                    if boundary is not None:
+                        mask = self._keys_le(buffers[side], page_keys, boundary)
+                    else:
+                        mask = np.ones(len(buffers[side]), dtype=bool)
+                    # 布尔索引得到的是新数据，浅拷贝去掉切片标记，比对前可原地统一类型
+                    settled[side] = buffers[side][mask].copy(deep=False)
+                    buffers[side] = buffers[side][~mask]
+
+                self._compare_settled(settled['src'], settled['tgt'], diff_records, counters)
+                if self._checkpoint is not None and boundary is not None:
+                    self._save_checkpoint(boundary, diff_records, counters)
+        finally:
+            for stream in streams.values():
+                if hasattr(stream, 'close'):
+                    stream.close()
+
+        self.compare_result['src_cnt'] = counters['src_cnt']
+        self.compare_result['tgt_cnt'] = counters['tgt_cnt']
+        diff_cnt = counters['mismatch_cnt'] + counters['src_only_cnt'] + counters['tgt_only_cnt']
+        self.compare_result['diff_cnt'] = diff_cnt
+        self.compare_result['diff_records'] = diff_records
+        self.compare_result['compare_report'] = (
+            f"流式比对完成：源端{counters['src_cnt']}条，目标端{counters['tgt_cnt']}条，差异{diff_cnt}条"
+            f"（值不一致{counters['mismatch_cnt']}条，源端独有{counters['src_only_cnt']}条，"
+            f"目标端独有{counters['tgt_only_cnt']}条）"
+        )
+        logger.info(self.compare_result['compare_report'])
+
+        total_records = max(counters['src_cnt'], counters['tgt_cnt'])
+        if total_records > 0:
+            self.compare_result['matching_rate'] = counters['matched_cnt'] / total_records
+        else:
+            self.compare_result['matching_rate'] = 1.0
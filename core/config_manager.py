@@ -56,6 +56,7 @@ class ConfigManager:
             'engine_strategy': ENGINE_STRATEGY,
             'decode_password_flag': DECODE_PASSWORD_FLAG,
             'extra_column_flag': EXTRA_COLUMN_FLAG,
+            'resume': getattr(self.args, 'resume', False) is True,
             'alert_threshold': WX_ALERT_THRESHOLD,
             'config_file': getattr(self.args, 'config_file', 'config/config.json') if hasattr(self.args,
                                                                                               'config_file') and self.args.config_file is not None else 'config/config.json'
@@ -137,6 +138,7 @@ class ConfigManager:
         parser.add_argument('--incremental_days', type=int,default=1, help='增量比对天数')
         parser.add_argument('--concurrency', type=int, default=5, help='批量执行并发数')
         parser.add_argument('--enable_repair', default=True, help='是否启用修复')
+        parser.add_argument('--resume', action='store_true', help='从上次中断的比对断点继续')
 
         self.args = parser.parse_args()
 
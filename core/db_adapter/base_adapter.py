@@ -2,21 +2,69 @@
 # -*- coding: utf-8 -*-
 # @Time    : 2026/1/9 12:43
 # @Author  : hejun
+import logging
 from abc import ABC, abstractmethod
-from typing import List, Dict, Tuple, Any
+from collections.abc import Sequence
+from typing import List, Dict, Tuple, Any, Optional, Iterator
 import time
 from utils.retry_utils import retry_decorator
 
+logger = logging.getLogger(__name__)
+
+
+class TupleRows(Sequence):
+    """以元组保存的查询结果（不逐行构造dict）
+
+    按下标访问或迭代时返回dict，兼容按字段名取值的调用方；
+    构造DataFrame时由utils.data_type_utils.rows_to_frame直接按列转换。
+    """
+
+    def __init__(self, columns: List[str], rows: List[tuple]):
+        self.columns = list(columns)
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TupleRows(self.columns, self.rows[index])
+        return dict(zip(self.columns, self.rows[index]))
+
 
 class BaseDBAdapter(ABC):
     """数据库适配器基类"""
 
+    # 驱动参数占位符风格（format: %s, qmark: ?, numeric: :1）
+    PARAM_STYLE = 'format'
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.connection = None
         self.cursor = None
+        # 连接由本适配器建立（包装连接池借出的连接时为False，连接的关闭和重建由连接池负责）
+        self._owns_connection = True
         self.connect()
 
+    @classmethod
+    def wrap_connection(cls, config: Dict[str, Any], connection, cursor=None, param_style: str = None):
+        """包装已建立的连接（如连接池借出的连接），不另建连接
+
+        Args:
+            config: 数据库配置（需包含db_type）
+            connection: 已建立的连接
+            cursor: 执行普通查询的游标，默认新建
+            param_style: 参数占位符风格，驱动与本适配器默认驱动不同时指定
+        """
+        adapter = cls.__new__(cls)
+        adapter.config = config
+        adapter.connection = connection
+        adapter.cursor = cursor if cursor is not None else connection.cursor()
+        adapter._owns_connection = False
+        if param_style:
+            adapter.PARAM_STYLE = param_style
+        return adapter
+
     @abstractmethod
     def connect(self):
         """建立数据库连接"""
@@ -60,6 +108,67 @@ class BaseDBAdapter(ABC):
         """查询数据"""
         pass
 
+    def query_tuples(self, sql: str, params: Tuple = None, batch_size: int = None) -> TupleRows:
+        """执行查询，按fetchmany分批读取元组行（不构造逐行dict），返回TupleRows"""
+        columns, rows = [], []
+        for batch in self.stream_query(sql, params, batch_size):
+            columns = batch.columns
+            rows.extend(batch.rows)
+        return TupleRows(columns, rows)
+
+    def stream_query(self, sql: str, params: Tuple = None, batch_size: int = None) -> Iterator[TupleRows]:
+        """执行查询，通过非缓冲/服务端游标分批返回元组行（每批为TupleRows），驱动端只缓冲一批
+
+        读取结束（或迭代器关闭）前连接不能执行其他查询。
+        """
+        from config.settings import FETCH_BATCH_SIZE
+        batch_size = batch_size or FETCH_BATCH_SIZE
+        cursor = self._stream_cursor(batch_size)
+        aborted = False
+        try:
+            yield from iter_cursor_batches(cursor, sql, params, batch_size)
+        except GeneratorExit:
+            # 调用方提前结束读取（如超出内存预算）
+            aborted = True
+            self._abort_stream(cursor)
+            raise
+        finally:
+            if not aborted:
+                cursor.close()
+
+    def _stream_cursor(self, batch_size: int):
+        """创建流式读取用的游标（默认游标按fetchmany分批读取，子类按驱动改为非缓冲/服务端游标）"""
+        return self.connection.cursor()
+
+    def _abort_stream(self, cursor):
+        """结果未读完时结束流式读取（默认直接关闭游标，子类按驱动改为中断查询）"""
+        cursor.close()
+
+    def stream_data(self, db_name: str, table_name: str, columns: List[str], where_clause: str = "",
+                    batch_size: int = None) -> Iterator[TupleRows]:
+        """流式查询数据（一次查询分批读取，不排序不分页）"""
+        sql = f"SELECT {', '.join(columns)} FROM {db_name}.{table_name}"
+        if where_clause:
+            sql += f" WHERE {where_clause}"
+        return self.stream_query(sql, batch_size=batch_size)
+
+    def query_data_keyset(self, db_name: str, table_name: str, columns: List[str], key_columns: List[str],
+                          last_key: Tuple = None, where_clause: str = "", limit: int = 10000) -> List[Dict]:
+        """键集分页查询数据（WHERE pk > last_pk ORDER BY pk），每页耗时与所处位置无关，返回TupleRows"""
+        sql, params = build_keyset_query(
+            self.config.get('db_type', '').lower(), f"{db_name}.{table_name}", columns,
+            key_columns, last_key, where_clause, limit, self.PARAM_STYLE
+        )
+        return self.query_tuples(sql, params)
+
+    def get_table_stats(self, db_name: str, table_name: str) -> Optional[Dict[str, Any]]:
+        """从数据字典获取表的估算记录数和平均行长（不扫描表），无统计信息时返回None"""
+        sql, params = build_table_stats_query(self.config.get('db_type', '').lower(), db_name, table_name,
+                                              self.PARAM_STYLE)
+        if not sql:
+            return None
+        return parse_table_stats(self.query(sql, params))
+
     def get_extra_columns(self, db_name: str, table_name: str) -> List[str]:
         """获取额外比对字段（根据字段类型筛选）"""
         from config.settings import SUPPORT_COLUMN_TYPE, EXTRA_COLUMN_FLAG
@@ -80,21 +189,171 @@ class BaseDBAdapter(ABC):
         return extra_columns
 
 
-def get_db_adapter(config: Dict[str, Any]) -> BaseDBAdapter:
-    """获取数据库适配器实例"""
-    db_type = config.get('db_type', '').lower()
+def set_cursor_attr(cursor, name: str, value):
+    """设置驱动游标属性（DBUtils包装的游标只代理读取，需设置到底层游标上）"""
+    raw_cursor = getattr(cursor, '_cursor', None) or cursor
+    try:
+        setattr(raw_cursor, name, value)
+    except AttributeError:
+        # 旧版本驱动不支持该属性（如cx_Oracle 8之前没有prefetchrows）
+        logger.debug(f"游标不支持属性{name}")
+
+
+def iter_cursor_batches(cursor, sql: str, params: Tuple = None, batch_size: int = 10000) -> Iterator[TupleRows]:
+    """在给定游标上执行查询并按fetchmany逐批返回TupleRows（不关闭游标）
+
+    PostgreSQL服务端游标首次fetch后才有description；空结果也返回一个空批以保留列名。
+    """
+    if params:
+        cursor.execute(sql, params)
+    else:
+        cursor.execute(sql)
+    batch = cursor.fetchmany(batch_size)
+    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+    yield TupleRows(columns, [tuple(row) for row in batch])
+    while batch:
+        batch = cursor.fetchmany(batch_size)
+        if batch:
+            yield TupleRows(columns, [tuple(row) for row in batch])
+
+
+def _param_placeholder(param_style: str, index: int) -> str:
+    """生成第index个（从1开始）参数占位符"""
+    if param_style == 'qmark':
+        return '?'
+    if param_style == 'numeric':
+        return f':{index}'
+    return '%s'
+
+
+def build_keyset_query(db_type: str, table_ref: str, columns: List[str], key_columns: List[str],
+                       last_key: Tuple = None, where_clause: str = "", limit: int = 10000,
+                       param_style: str = 'format') -> Tuple[str, Tuple]:
+    """构建键集（seek）分页SQL
+
+    联合主键在MySQL/PostgreSQL使用行值比较 (k1, k2) > (v1, v2)，
+    Oracle/SQL Server不支持行值比较，展开为 k1 > v1 OR (k1 = v1 AND k2 > v2)。
+
+    Returns:
+        (sql, params)
+    """
+    conditions = []
+    params = []
+    if where_clause:
+        conditions.append(f"({where_clause})")
+
+    if last_key is not None:
+        last_key = tuple(last_key)
+        if len(key_columns) == 1:
+            conditions.append(f"{key_columns[0]} > {_param_placeholder(param_style, 1)}")
+            params.append(last_key[0])
+        elif db_type in ('mysql', 'postgresql'):
+            placeholders = ', '.join(_param_placeholder(param_style, i + 1) for i in range(len(key_columns)))
+            conditions.append(f"({', '.join(key_columns)}) > ({placeholders})")
+            params.extend(last_key)
+        else:
+            or_parts = []
+            for i, key_col in enumerate(key_columns):
+                and_parts = []
+                for j in range(i):
+                    and_parts.append(f"{key_columns[j]} = {_param_placeholder(param_style, len(params) + 1)}")
+                    params.append(last_key[j])
+                and_parts.append(f"{key_col} > {_param_placeholder(param_style, len(params) + 1)}")
+                params.append(last_key[i])
+                or_parts.append(f"({' AND '.join(and_parts)})")
+            conditions.append(f"({' OR '.join(or_parts)})")
+
+    columns_str = ', '.join(columns)
+    order_by = ', '.join(key_columns)
+    where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    if db_type == 'oracle':
+        sql = f"SELECT * FROM (SELECT {columns_str} FROM {table_ref}{where_sql} ORDER BY {order_by}) WHERE ROWNUM <= {limit}"
+    elif db_type == 'sqlserver':
+        sql = f"SELECT TOP {limit} {columns_str} FROM {table_ref}{where_sql} ORDER BY {order_by}"
+    else:
+        sql = f"SELECT {columns_str} FROM {table_ref}{where_sql} ORDER BY {order_by} LIMIT {limit}"
+
+    return sql, tuple(params) if params else None
+
+
+def build_table_stats_query(db_type: str, db_name: str, table_name: str,
+                            param_style: str = 'format') -> Tuple[Optional[str], Optional[Tuple]]:
+    """构建读取数据字典统计信息的SQL（查询字段依次为估算记录数、平均行字节数）
+
+    Returns:
+        (sql, params)，不支持的数据库类型返回 (None, None)
+    """
+    p1, p2 = _param_placeholder(param_style, 1), _param_placeholder(param_style, 2)
+    if db_type == 'mysql':
+        sql = f"""
+            SELECT TABLE_ROWS AS row_count, AVG_ROW_LENGTH AS avg_row_bytes
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = {p1} AND TABLE_NAME = {p2}
+        """
+        return sql, (db_name, table_name)
+    elif db_type == 'postgresql':
+        # reltuples为-1表示从未ANALYZE
+        sql = f"""
+            SELECT CASE WHEN c.reltuples >= 0 THEN c.reltuples::BIGINT END AS row_count,
+                   CASE WHEN c.reltuples > 0 THEN pg_relation_size(c.oid) / c.reltuples END AS avg_row_bytes
+            FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = {p1} AND c.relname = {p2}
+        """
+        return sql, (db_name, table_name)
+    elif db_type == 'oracle':
+        sql = f"""
+            SELECT NUM_ROWS AS row_count, AVG_ROW_LEN AS avg_row_bytes
+            FROM ALL_TABLES
+            WHERE OWNER = UPPER({p1}) AND TABLE_NAME = UPPER({p2})
+        """
+        return sql, (db_name.upper(), table_name.upper())
+    elif db_type == 'sqlserver':
+        # 堆表(index_id=0)或聚集索引(index_id=1)的行数，与COUNT查询使用相同的对象名解析
+        sql = f"""
+            SELECT SUM(p.rows) AS row_count, NULL AS avg_row_bytes
+            FROM sys.partitions p
+            WHERE p.object_id = OBJECT_ID({p1}) AND p.index_id IN (0, 1)
+        """
+        return sql, (f"{db_name}.{table_name}",)
+    return None, None
+
+
+def parse_table_stats(rows: List[Any]) -> Optional[Dict[str, Any]]:
+    """解析统计信息查询结果（兼容字典游标和元组游标）"""
+    if not rows:
+        return None
+    row = rows[0]
+    values = list(row.values()) if hasattr(row, 'values') else list(row)
+    row_count, avg_row_bytes = values[0], values[1]
+    if row_count is None:
+        return None
+    return {
+        'row_count': int(row_count),
+        'avg_row_bytes': float(avg_row_bytes) if avg_row_bytes else None
+    }
+
+
+def get_adapter_class(db_type: str) -> type:
+    """获取数据库类型对应的适配器类"""
+    db_type = db_type.lower()
 
     if db_type == 'mysql':
         from core.db_adapter.mysql_adapter import MySQLAdapter
-        return MySQLAdapter(config)
+        return MySQLAdapter
     elif db_type == 'oracle':
         from core.db_adapter.oracle_adapter import OracleAdapter
-        return OracleAdapter(config)
+        return OracleAdapter
     elif db_type == 'postgresql':
         from core.db_adapter.postgres_adapter import PostgresAdapter
-        return PostgresAdapter(config)
+        return PostgresAdapter
     elif db_type == 'sqlserver':
         from core.db_adapter.sqlserver_adapter import SQLServerAdapter
-        return SQLServerAdapter(config)
+        return SQLServerAdapter
     else:
-        raise ValueError(f"不支持的数据库类型: {db_type}")
\ No newline at end of file
+        raise ValueError(f"不支持的数据库类型: {db_type}")
+
+
+def get_db_adapter(config: Dict[str, Any]) -> BaseDBAdapter:
+    """获取数据库适配器实例"""
+    return get_adapter_class(config.get('db_type', ''))(config)
\ No newline at end of file
@@ -46,6 +46,31 @@ class MySQLAdapter(BaseDBAdapter):
             logger.error(f"MySQL查询失败：SQL={sql}, 参数={params}, 错误={str(e)}")
             raise
 
+    def _stream_cursor(self, batch_size: int):
+        """非缓冲游标（SSCursor），结果逐批从网络读取"""
+        return self.connection.cursor(pymysql.cursors.SSCursor)
+
+    def _abort_stream(self, cursor):
+        """非缓冲游标关闭时会读完剩余结果（整表读取时相当于继续读完整表），提前结束时直接断开连接
+
+        服务端在连接断开后终止查询。本适配器自建的连接随后重新连接；
+        连接池借出的连接由DBUtils在下次使用或借出时检测到断开并重连。
+        """
+        connection = self.connection
+        # DBUtils包装的连接（PooledDedicatedDBConnection -> SteadyDBConnection -> pymysql连接）
+        for _ in range(2):
+            if isinstance(connection, pymysql.connections.Connection):
+                break
+            connection = getattr(connection, '_con', connection)
+        force_close = getattr(connection, '_force_close', None) or connection.close
+        try:
+            force_close()
+        except Exception as e:
+            logger.warning(f"断开MySQL流式查询连接失败：{str(e)}")
+        logger.info("流式读取提前结束，已断开连接以终止服务端查询")
+        if self._owns_connection:
+            self.connect()
+
     def execute(self, sql: str, params: Tuple = None) -> int:
         """执行增删改"""
         try:
@@ -60,7 +85,8 @@ class MySQLAdapter(BaseDBAdapter):
     def get_table_metadata(self, db_name: str, table_name: str) -> List[Dict]:
         """获取表元数据"""
         sql = f"""
-            SELECT COLUMN_NAME as name, DATA_TYPE as type 
+            SELECT COLUMN_NAME as name, DATA_TYPE as type, 
+                   NUMERIC_PRECISION as num_precision, NUMERIC_SCALE as num_scale 
             FROM INFORMATION_SCHEMA.COLUMNS 
             WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
         """
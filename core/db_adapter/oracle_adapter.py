@@ -4,14 +4,16 @@
 # @Author  : hejun
 import cx_Oracle
 import logging
-from typing import List, Dict, Tuple, Any
-from core.db_adapter.base_adapter import BaseDBAdapter
+from typing import List, Dict, Tuple, Any, Iterator
+from core.db_adapter.base_adapter import BaseDBAdapter, TupleRows, iter_cursor_batches, set_cursor_attr
 from utils.retry_utils import retry_decorator
 
 logger = logging.getLogger(__name__)
 
 
 class OracleAdapter(BaseDBAdapter):
+    PARAM_STYLE = 'numeric'
+
     def connect(self):
         """建立Oracle连接"""
         try:
@@ -63,6 +65,41 @@ class OracleAdapter(BaseDBAdapter):
             logger.error(f"Oracle查询失败：SQL={sql}, 参数={params}, 错误={str(e)}")
             raise
 
+    def _stream_cursor(self, batch_size: int):
+        """按批大小设置arraysize/prefetchrows，减少网络往返"""
+        cursor = self.connection.cursor()
+        set_cursor_attr(cursor, 'arraysize', batch_size)
+        # cx_Oracle 8及以上支持
+        set_cursor_attr(cursor, 'prefetchrows', batch_size + 1)
+        return cursor
+
+    def get_rowid_ranges(self, db_name: str, table_name: str, chunk_count: int) -> List[Tuple[str, str]]:
+        """按区（extent）信息把表切分为约chunk_count个ROWID区间，无法获取区信息时返回空列表"""
+        from core.db_adapter.oracle_rowid import build_rowid_ranges_query, parse_rowid_ranges
+
+        for extents_view in ('DBA_EXTENTS', 'USER_EXTENTS'):
+            try:
+                sql = build_rowid_ranges_query(extents_view)
+                return parse_rowid_ranges(self.query(sql, (db_name.upper(), table_name.upper(), chunk_count)))
+            except Exception as e:
+                logger.warning(f"通过{extents_view}计算ROWID区间失败: {str(e)}")
+        return []
+
+    def stream_rowid_range(self, db_name: str, table_name: str, columns: List[str], rowid_range: Tuple[str, str],
+                           where_clause: str = "", batch_size: int = None) -> Iterator[TupleRows]:
+        """读取一个ROWID区间的数据，NUMBER字段按精度取为原生类型，逐批返回TupleRows"""
+        from config.settings import FETCH_BATCH_SIZE
+        from core.db_adapter.oracle_rowid import build_rowid_range_select, numeric_output_type_handler
+
+        batch_size = batch_size or FETCH_BATCH_SIZE
+        sql = build_rowid_range_select(f"{db_name}.{table_name}", columns, where_clause)
+        cursor = self._stream_cursor(batch_size)
+        set_cursor_attr(cursor, 'outputtypehandler', numeric_output_type_handler)
+        try:
+            yield from iter_cursor_batches(cursor, sql, tuple(rowid_range), batch_size)
+        finally:
+            cursor.close()
+
     @retry_decorator(max_retries=3, delay=5)
     def execute(self, sql: str, params: Tuple = None) -> int:
         """执行增删改"""
@@ -81,7 +118,8 @@ class OracleAdapter(BaseDBAdapter):
     def get_table_metadata(self, db_name: str, table_name: str) -> List[Dict]:
         """获取表元数据"""
         sql = """
-            SELECT COLUMN_NAME as name, DATA_TYPE as type 
+            SELECT COLUMN_NAME as name, DATA_TYPE as type, 
+                   DATA_PRECISION as num_precision, DATA_SCALE as num_scale 
             FROM ALL_TAB_COLUMNS 
             WHERE OWNER = UPPER(%s) AND TABLE_NAME = UPPER(%s)
         """
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+Oracle ROWID区间切分
+
+参照DBMS_PARALLEL_EXECUTE.CREATE_CHUNKS_BY_ROWID的做法：从数据字典的区（extent）信息
+按块数把表均分为若干组，每组的首块和末块构造出一个ROWID区间。各区间互不重叠且覆盖全表，
+可由多个会话并行读取，且与主键类型无关（非数值主键、联合主键同样适用）。
+"""
+from decimal import Decimal
+from typing import List, Tuple
+
+
+def build_rowid_ranges_query(extents_view: str = 'DBA_EXTENTS') -> str:
+    """构建计算ROWID区间的SQL（参数依次为所有者、表名、区间数）
+
+    Args:
+        extents_view: DBA_EXTENTS（需要查询权限）或USER_EXTENTS（表属于当前登录用户时）
+    """
+    if extents_view.upper() == 'USER_EXTENTS':
+        extents = """
+            SELECT o.data_object_id, e.relative_fno, e.block_id, e.blocks
+            FROM user_extents e
+            JOIN user_objects o ON o.object_name = e.segment_name
+                AND NVL(o.subobject_name, ' ') = NVL(e.partition_name, ' ')
+                AND o.object_type LIKE 'TABLE%'
+            WHERE :1 IS NOT NULL AND e.segment_name = UPPER(:2)  -- 所有者即当前用户，:1仅保持参数一致
+        """
+    else:
+        extents = """
+            SELECT o.data_object_id, e.relative_fno, e.block_id, e.blocks
+            FROM dba_extents e
+            JOIN all_objects o ON o.owner = e.owner AND o.object_name = e.segment_name
+                AND NVL(o.subobject_name, ' ') = NVL(e.partition_name, ' ')
+                AND o.object_type LIKE 'TABLE%'
+            WHERE e.owner = UPPER(:1) AND e.segment_name = UPPER(:2)
+        """
+
+    # 按(数据对象, 文件, 块)顺序累计块数分组，同一组跨数据对象（分区）时拆开
+    return f"""
+        SELECT ROWIDTOCHAR(DBMS_ROWID.ROWID_CREATE(1, data_object_id, lo_fno, lo_block, 0)) AS start_rowid,
+               ROWIDTOCHAR(DBMS_ROWID.ROWID_CREATE(1, data_object_id, hi_fno, hi_block, 32767)) AS end_rowid
+        FROM (
+            SELECT grp, data_object_id,
+                   MIN(relative_fno) KEEP (DENSE_RANK FIRST ORDER BY relative_fno, block_id) AS lo_fno,
+                   MIN(block_id) KEEP (DENSE_RANK FIRST ORDER BY relative_fno, block_id) AS lo_block,
+                   MAX(relative_fno) KEEP (DENSE_RANK LAST ORDER BY relative_fno, block_id) AS hi_fno,
+                   MAX(block_id + blocks - 1) KEEP (DENSE_RANK LAST ORDER BY relative_fno, block_id) AS hi_block
+            FROM (
+                SELECT data_object_id, relative_fno, block_id, blocks,
+                       TRUNC((SUM(blocks) OVER (ORDER BY data_object_id, relative_fno, block_id) - 0.01)
+                             / (SUM(blocks) OVER () / :3)) AS grp
+                FROM ({extents})
+            )
+            GROUP BY grp, data_object_id
+        )
+        ORDER BY data_object_id, lo_fno, lo_block
+    """
+
+
+def build_rowid_range_select(table_ref: str, columns: List[str], where_clause: str = "") -> str:
+    """构建读取一个ROWID区间的SQL（参数依次为起止ROWID）"""
+    sql = f"SELECT {', '.join(columns)} FROM {table_ref} WHERE ROWID BETWEEN CHARTOROWID(:1) AND CHARTOROWID(:2)"
+    if where_clause:
+        sql += f" AND ({where_clause})"
+    return sql
+
+
+def parse_rowid_ranges(rows) -> List[Tuple[str, str]]:
+    """解析ROWID区间查询结果（兼容字典游标和元组游标）"""
+    ranges = []
+    for row in rows or []:
+        values = list(row.values()) if hasattr(row, 'values') else list(row)
+        ranges.append((values[0], values[1]))
+    return ranges
+
+
+def numeric_output_type_handler(cursor, name, default_type, size, precision, scale):
+    """NUMBER字段按精度直接取为原生类型，避免默认转换的开销和精度损失
+
+    NUMBER(p<=18, 0)取为原生整数，BINARY_FLOAT/BINARY_DOUBLE取为原生浮点，
+    其他NUMBER（带小数位或未指定精度）取为Decimal。
+    """
+    import cx_Oracle
+
+    if default_type == cx_Oracle.NUMBER:
+        if scale == 0 and 0 < precision <= 18:
+            return cursor.var(cx_Oracle.NATIVE_INT, arraysize=cursor.arraysize)
+        return cursor.var(Decimal, arraysize=cursor.arraysize)
+    if default_type in (cx_Oracle.NATIVE_FLOAT, getattr(cx_Oracle, 'DB_TYPE_BINARY_FLOAT', None)):
+        return cursor.var(cx_Oracle.NATIVE_FLOAT, arraysize=cursor.arraysize)
+    return None
@@ -2,11 +2,13 @@
 # -*- coding: utf-8 -*-
 # @Time    : 2026/1/9 16:23
 # @Author  : hejun
+import uuid
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import logging
-from typing import List, Dict, Tuple, Any
-from core.db_adapter.base_adapter import BaseDBAdapter
+from typing import List, Dict, Tuple, Any, Iterator
+import pandas as pd
+from core.db_adapter.base_adapter import BaseDBAdapter, set_cursor_attr
 from utils.retry_utils import retry_decorator
 
 logger = logging.getLogger(__name__)
@@ -47,6 +49,26 @@ class PostgresAdapter(BaseDBAdapter):
             logger.error(f"PostgreSQL查询失败：SQL={sql}, 参数={params}, 错误={str(e)}")
             raise
 
+    def _stream_cursor(self, batch_size: int):
+        """命名（服务端）游标，每次从服务端取itersize行"""
+        cursor = self.connection.cursor(name=f"stream_{uuid.uuid4().hex}",
+                                        cursor_factory=psycopg2.extensions.cursor)
+        set_cursor_attr(cursor, 'itersize', batch_size)
+        return cursor
+
+    def copy_data(self, db_name: str, table_name: str, columns: List[str], where_clause: str = "",
+                  batch_size: int = None, column_types: Dict[str, str] = None) -> Iterator[pd.DataFrame]:
+        """通过COPY (SELECT ...) TO STDOUT批量导出数据，逐块返回DataFrame"""
+        from config.settings import FETCH_BATCH_SIZE
+        from core.db_adapter.postgres_copy import build_copy_sql, iter_copy_frames
+
+        copy_sql = build_copy_sql(f"{db_name}.{table_name}", columns, where_clause)
+        cursor = self.connection.cursor()
+        try:
+            yield from iter_copy_frames(cursor, copy_sql, columns, column_types, batch_size or FETCH_BATCH_SIZE)
+        finally:
+            cursor.close()
+
     @retry_decorator(max_retries=3, delay=5)
     def execute(self, sql: str, params: Tuple = None) -> int:
         """执行增删改"""
@@ -62,7 +84,8 @@ class PostgresAdapter(BaseDBAdapter):
     def get_table_metadata(self, db_name: str, table_name: str) -> List[Dict]:
         """获取表元数据"""
         sql = """
-            SELECT column_name as name, data_type as type 
+            SELECT column_name as name, data_type as type, 
+                   numeric_precision as num_precision, numeric_scale as num_scale 
             FROM information_schema.columns 
             WHERE table_schema = %s AND table_name = %s
         """
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+PostgreSQL COPY批量导出
+
+用 COPY (SELECT ...) TO STDOUT 以CSV格式导出查询结果，后台线程把数据写入管道，
+调用方线程用pandas的C解析器按块读取并按字段类型转换为DataFrame，网络传输与解析重叠。
+比逐行经游标读取少了每行每字段的Python对象构造，大表加载快数倍。
+"""
+import logging
+import os
+import threading
+from decimal import Decimal
+from typing import Dict, List, Iterator, Optional
+import pandas as pd
+from utils.data_type_utils import column_kind, STRING_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# COPY导出的NULL标记（CSV中空字符串为""，与NULL区分）
+COPY_NULL = r'\N'
+
+
+def build_copy_sql(table_ref: str, columns: List[str], where_clause: str = "") -> str:
+    """构建导出查询结果的COPY语句"""
+    sql = f"SELECT {', '.join(columns)} FROM {table_ref}"
+    if where_clause:
+        sql += f" WHERE {where_clause}"
+    return f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, NULL '{COPY_NULL}', ENCODING 'UTF8')"
+
+
+def _parse_copy_column(values: pd.Series, col_type: str):
+    """将COPY导出的文本列转换为与游标读取一致的类型，无法转换时保留文本"""
+    kind = column_kind(col_type) if col_type else None
+    try:
+        if kind in ('int', 'float'):
+            return pd.to_numeric(values)
+        if kind == 'datetime':
+            return pd.to_datetime(values, format='ISO8601')
+        if kind == 'string':
+            return values.astype(STRING_DTYPE)
+        if kind == 'category':
+            return values.astype('category')
+        if col_type in ('numeric', 'decimal'):
+            return values.map(Decimal, na_action='ignore').astype(object).where(values.notna(), None)
+        if col_type == 'boolean':
+            return values.map({'t': True, 'f': False})
+    except (TypeError, ValueError, ArithmeticError, pd.errors.OutOfBoundsDatetime):
+        pass
+    return values.astype(object).where(values.notna(), None)
+
+
+def parse_copy_frame(df: pd.DataFrame, column_types: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """按字段类型（元数据中的type）原地转换COPY导出的文本分块"""
+    column_types = column_types or {}
+    for col in df.columns:
+        col_type = (column_types.get(col) or '').lower().split('(')[0].strip()
+        df[col] = _parse_copy_column(df[col], col_type)
+    return df
+
+
+def iter_copy_frames(cursor, copy_sql: str, columns: List[str], column_types: Optional[Dict[str, str]] = None,
+                     batch_size: int = 10000) -> Iterator[pd.DataFrame]:
+    """执行COPY导出并按batch_size行逐块返回DataFrame（无数据时返回一个带列名的空块）
+
+    Args:
+        cursor: psycopg2游标（在后台线程中执行copy_expert）
+        copy_sql: build_copy_sql生成的COPY语句
+        columns: 导出字段（与COPY中SELECT的字段顺序一致）
+        column_types: {字段名: 数据库字段类型}
+        batch_size: 每块行数
+    """
+    read_fd, write_fd = os.pipe()
+    reader = os.fdopen(read_fd, 'rb')
+    writer = os.fdopen(write_fd, 'wb')
+    errors = []
+
+    def run_copy():
+        try:
+            cursor.copy_expert(copy_sql, writer)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                writer.close()
+            except OSError:
+                # 读取端已提前关闭
+                pass
+
+    thread = threading.Thread(target=run_copy, name='pg-copy', daemon=True)
+    thread.start()
+    try:
+        chunks = pd.read_csv(reader, header=None, names=columns, dtype=str, keep_default_na=False,
+                             na_values=[COPY_NULL], encoding='utf-8', chunksize=batch_size)
+        for chunk in chunks:
+            yield parse_copy_frame(chunk, column_types)
+    finally:
+        # 提前结束时关闭读取端，COPY线程写入失败后退出
+        reader.close()
+        thread.join()
+
+    if errors:
+        logger.error(f"COPY导出失败: SQL={copy_sql}, 错误={str(errors[0])}")
+        raise errors[0]
@@ -12,6 +12,8 @@ logger = logging.getLogger(__name__)
 
 
 class SQLServerAdapter(BaseDBAdapter):
+    PARAM_STYLE = 'qmark'
+
     def connect(self):
         """建立SQL Server连接"""
         try:
@@ -69,7 +71,8 @@ class SQLServerAdapter(BaseDBAdapter):
     def get_table_metadata(self, db_name: str, table_name: str) -> List[Dict]:
         """获取表元数据"""
         sql = """
-            SELECT COLUMN_NAME as name, DATA_TYPE as type 
+            SELECT COLUMN_NAME as name, DATA_TYPE as type, 
+                   NUMERIC_PRECISION as num_precision, NUMERIC_SCALE as num_scale 
             FROM INFORMATION_SCHEMA.COLUMNS 
             WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?
         """
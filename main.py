@@ -13,6 +13,7 @@ from core.repair_engine.datax_repair import DataXRepairEngine
 from core.notification import WeChatNotification
 from config.settings import MAX_THREAD_COUNT, TASK_DB_CONFIG, TASK_LOG_TABLE, TASK_CONFIG_TABLE, LOG_LEVEL
 from utils.db_utils import write_task_log
+from utils.diff_utils import remove_diff_records
 from utils.log_utils import setup_logging
 
 # 配置日志
@@ -37,13 +38,17 @@ def process_single_table(config: dict):
         # 3. 执行修复（如需）
         repair_result = {}
 
-        if config.get('enable_repair', False):
-            logger.info(f"开始修复表：{config['src_table_name']}")
-            repair_engine = DataXRepairEngine(config, compare_result)
-            repair_result = repair_engine.repair()
+        try:
+            if config.get('enable_repair', False):
+                logger.info(f"开始修复表：{config['src_table_name']}")
+                repair_engine = DataXRepairEngine(config, compare_result)
+                repair_result = repair_engine.repair()
 
-            # 发送修复告警（如有）
-            # notification.send_repair_alert(config, repair_result)
+                # 发送修复告警（如有）
+                # notification.send_repair_alert(config, repair_result)
+        finally:
+            # 落盘的差异数据（Spark引擎）只供修复使用，修复完成或无需修复后删除
+            remove_diff_records(compare_result)
 
         # 4. 合并结果
         total_result = {**config, **compare_result, **repair_result}
@@ -148,11 +153,13 @@ def main():
 
         # 多线程处理
         concurrency = global_config.get('concurrency', MAX_THREAD_COUNT)
+        # 同时运行的任务数，用于平分进程内存预算
+        concurrent_tasks = max(1, min(concurrency, len(task_configs)))
         with ThreadPoolExecutor(max_workers=concurrency) as executor:
             futures = []
             for task in task_configs:
                 # 合并全局配置和任务配置
-                merged_config = {**global_config, **task}
+                merged_config = {**global_config, **task, 'concurrent_tasks': concurrent_tasks}
                 futures.append(executor.submit(process_single_table, merged_config))
 
             for future in as_completed(futures):
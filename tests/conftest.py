@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Mock未安装的可选依赖模块,避免测试环境依赖
 sys.modules['pyspark'] = MagicMock()
 sys.modules['pyspark.sql'] = MagicMock()
+sys.modules['pyspark.sql.functions'] = MagicMock()
 sys.modules['cx_Oracle'] = MagicMock()
 sys.modules['psycopg2'] = MagicMock()
 sys.modules['pyodbc'] = MagicMock()
@@ -166,11 +167,137 @@ def mock_db_adapter():
     adapter.get_table_metadata = Mock(return_value=[])
     adapter.get_primary_keys = Mock(return_value=['id'])
     adapter.get_table_count = Mock(return_value=100)
+    adapter.get_table_stats = Mock(return_value=None)
     adapter.query_data = Mock(return_value=[])
+    # 流式读取返回query_data设置的数据（一批）
+    adapter.stream_data = Mock(side_effect=lambda *args, **kwargs: iter([adapter.query_data.return_value]))
     adapter.get_extra_columns = Mock(return_value=['age', 'salary'])
     return adapter
 
 
+def _filter_rows(rows, where_clause, key):
+    """按主键条件过滤内存数据
+
+    只识别用AND连接的主键比较条件（key >= v、key < v、key > v等，可带括号），
+    其他条件（抽样、增量时间窗口等）抛出ValueError，避免测试静默忽略过滤条件。
+    """
+    import operator
+    import re
+
+    compare = {'>=': operator.ge, '<=': operator.le, '>': operator.gt, '<': operator.lt, '=': operator.eq}
+    selected = rows
+    for term in re.split(r'\s+AND\s+', where_clause or '', flags=re.IGNORECASE):
+        term = term.strip().strip('()').strip()
+        if not term:
+            continue
+        match = re.fullmatch(rf"{key}\s*(>=|<=|>|<|=)\s*(-?\d+)", term)
+        if match is None:
+            raise ValueError(f"内存表适配器不支持的WHERE条件: {term}")
+        op, value = compare[match.group(1)], int(match.group(2))
+        selected = [r for r in selected if op(r[key], value)]
+    return selected
+
+
+def make_table_adapter(rows, key='id', delays=None):
+    """以内存数据模拟一张表的适配器（行按主键升序）
+
+    支持键集分页、流式读取、一次性读取、计数、主键和元数据查询，以及主键范围查询（MIN/MAX/COUNT）；
+    WHERE条件只识别主键比较条件，其他条件抛出ValueError。delays为{区间起点: 秒数}，模拟某个区间读取较慢。
+    """
+    import time
+    from core.db_adapter.base_adapter import TupleRows
+
+    rows = sorted(rows, key=lambda r: r[key])
+
+    def select(where_clause):
+        selected = _filter_rows(rows, where_clause, key)
+        if delays and selected:
+            time.sleep(delays.get(selected[0][key], 0))
+        return selected
+
+    def fake_keyset(db_name, table_name, columns, key_columns, last_key, where_clause, limit):
+        start = None if last_key is None else last_key[0]
+        return [{c: r.get(c) for c in columns} for r in select(where_clause)
+                if start is None or r[key] > start][:limit]
+
+    def fake_stream(db_name, table_name, columns, where_clause="", batch_size=10000):
+        selected = select(where_clause)
+        yield TupleRows(list(columns), [tuple(r.get(c) for c in columns) for r in selected[:batch_size]])
+        for i in range(batch_size, len(selected), batch_size):
+            yield TupleRows(list(columns), [tuple(r.get(c) for c in columns) for r in selected[i:i + batch_size]])
+
+    def fake_query(sql, params=None):
+        if 'MIN(' not in sql:
+            return []
+        selected = select(sql.split(' WHERE ', 1)[1] if ' WHERE ' in sql else '')
+        keys = [r[key] for r in selected]
+        return [{'min_pk': min(keys, default=None), 'max_pk': max(keys, default=None), 'row_cnt': len(keys)}]
+
+    adapter = Mock()
+    adapter.query_data_keyset = Mock(side_effect=fake_keyset)
+    adapter.stream_data = Mock(side_effect=fake_stream)
+    adapter.query_data = Mock(side_effect=lambda db, table, columns, where_clause="": [
+        {c: r.get(c) for c in columns} for r in select(where_clause)])
+    adapter.get_table_count = Mock(side_effect=lambda db, table, where_clause="": len(select(where_clause)))
+    adapter.query = Mock(side_effect=fake_query)
+    # 无统计信息；元数据为空时按数据推断类型
+    adapter.get_table_stats = Mock(return_value=None)
+    adapter.get_table_metadata = Mock(return_value=[])
+    adapter.get_primary_keys = Mock(return_value=[key])
+    return adapter
+
+
+@pytest.fixture
+def table_adapter():
+    """内存表适配器工厂，见make_table_adapter"""
+    return make_table_adapter
+
+
+@pytest.fixture
+def build_engine(sample_config):
+    """比对引擎工厂：主键、元数据缓存和两端适配器直接注入（不连接数据库）
+
+    build_engine(引擎类, *引擎参数, pk_columns=['id'], metadata=[], tgt_metadata=None,
+                 src_adapter=None, tgt_adapter=None, **覆盖的任务配置)，未指定tgt_adapter时两端共用src_adapter。
+    """
+    def factory(engine_cls, *args, pk_columns=('id',), metadata=None, tgt_metadata=None,
+                src_adapter=None, tgt_adapter=None, **config):
+        engine = engine_cls({**sample_config, **config}, *args)
+        engine._src_pk_cache = list(pk_columns)
+        engine._src_metadata_cache = metadata or []
+        if tgt_metadata is not None:
+            engine._tgt_metadata_cache = tgt_metadata
+        engine.src_adapter = src_adapter
+        engine.tgt_adapter = tgt_adapter if tgt_adapter is not None else src_adapter
+        return engine
+
+    return factory
+
+
+@pytest.fixture
+def select_engine():
+    """按auto策略选择引擎（连接池返回给定适配器），前后清空表统计信息缓存"""
+    from core.compare_engine import base_engine
+
+    def select(config, adapter):
+        with patch('utils.db_connection_pool.get_pooled_connection', return_value=adapter), \
+                patch('utils.db_connection_pool.return_pooled_connection'), \
+                patch('config.settings.ENGINE_STRATEGY', 'auto'):
+            return base_engine.get_compare_engine(config)
+
+    base_engine._table_stats_cache.clear()
+    yield select
+    base_engine._table_stats_cache.clear()
+
+
+@pytest.fixture
+def pooled_sessions():
+    """替换连接池：get_pooled_connection按side_effect或return_value返回会话，返回两个补丁对象"""
+    with patch('utils.db_connection_pool.get_pooled_connection') as get_conn, \
+            patch('utils.db_connection_pool.return_pooled_connection') as return_conn:
+        yield get_conn, return_conn
+
+
 @pytest.fixture
 def temp_config_file(tmp_path):
     """临时配置文件"""
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比对断点存储测试用例
+"""
+import os
+import pytest
+from unittest.mock import patch
+from utils.checkpoint_store import open_checkpoint
+
+
+class TestCompareCheckpoint:
+    """比对断点续比测试"""
+
+    def test_signature_mismatch_starts_new_run(self, sample_config, tmp_path):
+        """测试比对内容变化或未要求续比时不沿用旧断点"""
+        config = {**sample_config, 'checkpoint_dir': str(tmp_path), 'resume': True}
+        checkpoint = open_checkpoint(config, {'engine': 'ChecksumCompareEngine'})
+        checkpoint.state['completed_ranges'] = {0: {}}
+        checkpoint.save()
+
+        resumed = open_checkpoint(config, {'engine': 'ChecksumCompareEngine'})
+        assert resumed.resumed
+        assert resumed.state['completed_ranges']
+        assert not open_checkpoint(config, {'engine': 'StreamingCompareEngine'}).resumed
+        assert not open_checkpoint({**config, 'resume': False}, {'engine': 'ChecksumCompareEngine'}).resumed
+
+    def test_run_removes_checkpoint_on_success(self, build_engine, tmp_path):
+        """测试比对成功后删除断点，失败时保留"""
+        from core.compare_engine.streaming_engine import StreamingCompareEngine
+
+        def run(engine, **compare):
+            engine._compare_columns_cache = {'key_columns': ['id'], 'update_column': [], 'extra_columns': []}
+            with patch.object(engine, 'init_adapters'), patch.object(engine, 'profile_precheck', return_value=False), \
+                    patch.object(engine, 'load_data'), patch.object(engine, 'compare', **compare), \
+                    patch.object(engine, 'generate_report'):
+                return engine.run()
+
+        engine = build_engine(StreamingCompareEngine, checkpoint_dir=str(tmp_path))
+
+        def failing_compare():
+            engine._checkpoint.save()
+            raise ConnectionError("网络中断")
+
+        with pytest.raises(ConnectionError):
+            run(engine, side_effect=failing_compare)
+        assert os.path.exists(engine._checkpoint.path)
+
+        engine = build_engine(StreamingCompareEngine, checkpoint_dir=str(tmp_path), resume=True)
+        result = run(engine)
+        assert result['checkpoint_resumed']
+        assert not os.path.exists(engine._checkpoint.path)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+校验和比对引擎测试用例
+"""
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from core.compare_engine.base_engine import get_compare_engine
+from core.compare_engine.checksum_engine import ChecksumCompareEngine
+
+
+def _in_range(row, lo, hi):
+    return (lo is None or row['id'] >= lo) and (hi is None or row['id'] < hi)
+
+
+@pytest.fixture
+def checksum_engine(build_engine):
+    """以内存数据模拟两端数据库的校验和引擎工厂（区间统计和逐行拉取按内存数据计算）"""
+    from core.compare_engine.checksum_engine import ChecksumCompareEngine
+
+    def factory(src_rows, tgt_rows, leaf_size=4, id_type='int', **config):
+        engine = build_engine(ChecksumCompareEngine, metadata=[{'name': 'id', 'type': id_type},
+                                                               {'name': 'age', 'type': 'int'}],
+                              checksum_leaf_size=leaf_size, checksum_segment_count=4, update_time_str='', **config)
+        engine.fetched_rows = 0
+        data = {'src': src_rows, 'tgt': tgt_rows}
+
+        def fake_bounds(db_side):
+            ids = [row['id'] for row in data[db_side]]
+            return (min(ids), max(ids)) if ids else (None, None)
+
+        def fake_stats(db_side, lo, hi, step):
+            engine.range_stats['checksum_queries'] += 1
+            stats = {}
+            for row in data[db_side]:
+                if _in_range(row, lo, hi):
+                    seg_no = (row['id'] - lo) // step
+                    cnt, total = stats.get(seg_no, (0, 0))
+                    stats[seg_no] = (cnt + 1, total + hash((row['id'], row['age'])))
+            return stats
+
+        def fake_rows(db_side, lo, hi):
+            rows = [row for row in data[db_side] if _in_range(row, lo, hi)]
+            engine.fetched_rows += len(rows)
+            return pd.DataFrame(rows, columns=engine._all_columns)
+
+        engine._get_pk_bounds = fake_bounds
+        engine._fetch_segment_stats = fake_stats
+        engine._fetch_range_rows = fake_rows
+        return engine
+
+    return factory
+
+
+class TestChecksumCompareEngine:
+    """校验和比对引擎测试"""
+
+    def test_identical_tables_skip_row_fetch(self, checksum_engine):
+        """测试两端一致时不逐行拉取数据"""
+        rows = [{'id': i, 'age': i % 7} for i in range(1, 101)]
+        engine = checksum_engine(rows, [dict(r) for r in rows])
+
+        engine.load_data()
+        engine.compare()
+
+        assert engine.compare_result['diff_cnt'] == 0
+        assert engine.compare_result['src_cnt'] == 100
+        assert engine.compare_result['matching_rate'] == 1.0
+        assert engine.fetched_rows == 0
+
+    def test_drill_down_only_mismatching_ranges(self, checksum_engine):
+        """测试仅下钻不一致区间并输出修复引擎所需的差异结构"""
+        src_rows = [{'id': i, 'age': i % 7} for i in range(1, 101)]
+        tgt_rows = [dict(r) for r in src_rows if r['id'] != 50]
+        tgt_rows[9]['age'] = 99  # id=10 值不一致
+        tgt_rows.append({'id': 150, 'age': 1})  # 目标端多余记录
+
+        engine = checksum_engine(src_rows, tgt_rows)
+        engine.load_data()
+        engine.compare()
+
+        diff_records = engine.compare_result['diff_records']
+        assert engine.compare_result['diff_cnt'] == 3
+        assert diff_records['mismatch'] == [{'id': 10}]
+        assert diff_records['mismatch_full'][0]['src_record']['age'] == 3
+        assert diff_records['mismatch_full'][0]['tgt_record']['age'] == 99
+        assert diff_records['src_only'] == [{'id': 50, 'age': 1}]
+        assert diff_records['tgt_only'] == [{'id': 150}]
+        assert engine.fetched_rows < len(src_rows) + len(tgt_rows)
+
+    def test_row_hash_expr_per_dialect(self, sample_config):
+        """测试各数据库的行哈希表达式"""
+        from core.compare_engine.checksum_engine import ChecksumCompareEngine
+
+        engine = ChecksumCompareEngine(sample_config)
+        engine._all_columns = ['id', 'age']
+
+        assert 'CRC32' in engine._row_hash_expr('mysql')
+        assert 'ORA_HASH' in engine._row_hash_expr('oracle')
+        assert 'MD5' in engine._row_hash_expr('postgresql')
+        assert 'BINARY_CHECKSUM' in engine._row_hash_expr('sqlserver')
+
+    def test_oracle_row_hash_keeps_time_of_day(self, build_engine):
+        """测试Oracle行哈希按类型显式格式化：DATE保留时分秒，只改时间部分的记录哈希不同；逐字段哈希不拼接长文本"""
+        engine = build_engine(ChecksumCompareEngine, metadata=[
+            {'name': 'id', 'type': 'NUMBER'}, {'name': 'update_time', 'type': 'DATE'},
+            {'name': 'created_at', 'type': 'TIMESTAMP(6) WITH TIME ZONE'}, {'name': 'name', 'type': 'VARCHAR2'}])
+        engine._all_columns = ['id', 'update_time', 'created_at', 'name']
+
+        expr = engine._row_hash_expr('oracle')
+
+        assert "TO_CHAR(update_time, 'YYYY-MM-DD HH24:MI:SS')" in expr
+        assert "TO_CHAR(SYS_EXTRACT_UTC(created_at), 'YYYY-MM-DD HH24:MI:SS.FF9')" in expr
+        assert "TO_CHAR(id, 'TM9'" in expr
+        assert '||' not in expr
+        assert expr.count('ORA_HASH(') == 4
+
+    def test_force_checksum_engine(self, sample_config):
+        """测试强制使用校验和引擎，不查询数据量"""
+        with patch('config.settings.ENGINE_STRATEGY', 'checksum'), \
+                patch('utils.db_connection_pool.get_pooled_connection') as get_conn:
+            engine = get_compare_engine(sample_config)
+
+        assert type(engine) is ChecksumCompareEngine
+        get_conn.assert_not_called()
+
+
+class TestChecksumResume:
+    """校验和比对断点续比测试"""
+
+    @staticmethod
+    def _attach_checkpoint(engine, tmp_path, resume=False):
+        from utils.checkpoint_store import open_checkpoint
+
+        engine.config.update({'checkpoint_dir': str(tmp_path), 'checkpoint_interval_seconds': 0, 'resume': resume})
+        engine._checkpoint = open_checkpoint(engine.config, {'engine': type(engine).__name__})
+        return engine._checkpoint
+
+    def _interrupt_after_first_ranges(self, engine, tmp_path):
+        """比对到主键50之后的区间时模拟网络中断"""
+        self._attach_checkpoint(engine, tmp_path)
+        engine.load_data()
+        original_leaf = engine._compare_leaf
+
+        def failing_leaf(lo, hi, diff_records):
+            if lo is not None and lo > 50:
+                raise ConnectionError("网络中断")
+            return original_leaf(lo, hi, diff_records)
+
+        engine._compare_leaf = failing_leaf
+        with pytest.raises(ConnectionError):
+            engine.compare()
+
+    def test_resume_skips_completed_ranges(self, checksum_engine, tmp_path):
+        """测试中断后续比跳过已完成区间，结果与完整比对一致"""
+        src_rows = [{'id': i, 'age': i % 7} for i in range(1, 101)]
+        tgt_rows = [dict(r) for r in src_rows if r['id'] not in (10, 90)]
+        self._interrupt_after_first_ranges(checksum_engine(src_rows, tgt_rows), tmp_path)
+
+        resumed = checksum_engine(src_rows, tgt_rows)
+        assert self._attach_checkpoint(resumed, tmp_path, resume=True).resumed
+        resumed.load_data()
+        resumed.compare()
+
+        result = resumed.compare_result
+        assert result['resumed_ranges'] >= 1
+        assert result['src_cnt'] == 100 and result['tgt_cnt'] == 98
+        assert sorted(r['id'] for r in result['diff_records']['src_only']) == [10, 90]
+        # 已完成区间（含id=10）不再逐行拉取
+        assert resumed.fetched_rows < sum(1 for r in src_rows + tgt_rows if r['id'] > 50) + 1
+
+    def test_resume_covers_rows_inserted_outside_saved_range(self, checksum_engine, tmp_path):
+        """测试中断后新插入的主键超出断点区间范围时，续比仍会比对这些记录"""
+        src_rows = [{'id': i, 'age': i % 7} for i in range(1, 101)]
+        tgt_rows = [dict(r) for r in src_rows if r['id'] != 90]
+        self._interrupt_after_first_ranges(checksum_engine(src_rows, tgt_rows), tmp_path)
+
+        # 中断期间源端新增id 101~130（目标端只同步到120），并新增一条低于原范围的记录
+        src_rows += [{'id': i, 'age': 1} for i in range(101, 131)] + [{'id': -5, 'age': 1}]
+        tgt_rows += [{'id': i, 'age': 1} for i in range(101, 121)]
+        resumed = checksum_engine(src_rows, tgt_rows)
+        self._attach_checkpoint(resumed, tmp_path, resume=True)
+        resumed.load_data()
+        resumed.compare()
+
+        result = resumed.compare_result
+        assert result['resumed_ranges'] >= 1
+        assert result['src_cnt'] == 131 and result['tgt_cnt'] == 119
+        assert sorted(r['id'] for r in result['diff_records']['src_only']) == [-5, 90] + list(range(121, 131))
+
+
+class TestChecksumStreamingFallback:
+    """无法按整数区间下钻时改用流式归并测试"""
+
+    def test_non_integer_pk_streams_instead_of_full_fetch(self, build_engine, table_adapter):
+        """测试非整数主键整表改用键集分页归并，不一次性拉取整表"""
+        src_rows = [{'code': f'c{i:03d}', 'age': i} for i in range(30)]
+        tgt_rows = [dict(r, age=99) if r['code'] == 'c007' else dict(r) for r in src_rows if r['code'] != 'c020']
+        engine = build_engine(ChecksumCompareEngine, pk_columns=('code',),
+                              metadata=[{'name': 'code', 'type': 'varchar'}, {'name': 'age', 'type': 'int'}],
+                              src_adapter=table_adapter(src_rows, key='code'),
+                              tgt_adapter=table_adapter(tgt_rows, key='code'),
+                              update_time_str='', chunk_size_for_data_sync=7)
+
+        engine.load_data()
+        engine.compare()
+
+        result = engine.compare_result
+        assert result['src_cnt'] == 30 and result['tgt_cnt'] == 29
+        assert [r['code'] for r in result['diff_records']['mismatch']] == ['c007']
+        assert [r['code'] for r in result['diff_records']['src_only']] == ['c020']
+        # 只查询主键范围，数据按7条一块分页读取
+        assert all('MIN(' in call.args[0] for call in engine.src_adapter.query.call_args_list)
+        assert engine.src_adapter.query_data_keyset.call_count >= 5
+
+    def test_composite_pk_streams_whole_table(self, build_engine, table_adapter):
+        """测试联合主键不按首个字段下钻（首字段相同的记录无法拆分），整表改用流式归并"""
+        src_rows = [{'id': i // 10, 'seq': i % 10, 'age': i} for i in range(50)]
+        tgt_rows = [dict(r, age=-1) if (r['id'], r['seq']) == (2, 3) else dict(r) for r in src_rows]
+        engine = build_engine(ChecksumCompareEngine, pk_columns=('id', 'seq'),
+                              metadata=[{'name': 'id', 'type': 'int'}, {'name': 'seq', 'type': 'int'},
+                                        {'name': 'age', 'type': 'int'}],
+                              src_adapter=table_adapter(src_rows), tgt_adapter=table_adapter(tgt_rows),
+                              update_time_str='')
+
+        engine.load_data()
+        engine.compare()
+
+        result = engine.compare_result
+        assert result['src_cnt'] == 50 and result['diff_cnt'] == 1
+        assert result['diff_records']['mismatch'] == [{'id': 2, 'seq': 3}]
+        engine.src_adapter.query.assert_not_called()
+
+    def test_unsplittable_range_compared_in_chunks(self, checksum_engine, table_adapter):
+        """测试宽度为1仍超过叶子大小的区间（小数主键）按主键顺序分块比对，不整段拉取"""
+        from decimal import Decimal
+
+        src_rows = [{'id': Decimal(i) / 4, 'age': i} for i in range(4, 13)]
+        tgt_rows = [dict(r, age=99) if r['id'] == Decimal('1.5') else dict(r) for r in src_rows]
+        engine = checksum_engine(src_rows, tgt_rows, leaf_size=2, id_type='decimal',
+                                 src_adapter=table_adapter(src_rows), tgt_adapter=table_adapter(tgt_rows),
+                                 chunk_size_for_data_sync=2)
+
+        engine.load_data()
+        engine.compare()
+
+        result = engine.compare_result
+        assert result['src_cnt'] == 9 and result['diff_cnt'] == 1
+        assert [Decimal(str(r['id'])) for r in result['diff_records']['mismatch']] == [Decimal('1.5')]
+        assert engine.fetched_rows == 0
+        where_clauses = {call.args[5] for call in engine.src_adapter.query_data_keyset.call_args_list}
+        assert where_clauses == {'id >= 1 AND id < 2'}
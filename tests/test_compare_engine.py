@@ -362,11 +362,12 @@ class TestGetCompareEngine:
             assert isinstance(engine, PandasCompareEngine)
 
     def test_get_spark_local_medium_data(self, sample_config, mock_db_adapter):
-        """测试中等数据量选择Spark本地模式"""
+        """测试中等数据量未安装duckdb时选择Spark本地模式"""
         with patch('core.db_adapter.base_adapter.get_db_adapter', return_value=mock_db_adapter):
             mock_db_adapter.get_table_count.return_value = 800000  # 80万条
 
-            with patch('config.settings.ENGINE_STRATEGY', 'auto'):
+            with patch('config.settings.ENGINE_STRATEGY', 'auto'), \
+                    patch('core.compare_engine.base_engine.importlib.util.find_spec', return_value=None):
                 with patch('core.compare_engine.spark_engine.SparkSession'):
                     engine = get_compare_engine(sample_config)
 
@@ -486,3 +487,59 @@ class TestCompareEngineEdgeCases:
         result = engine.compare()
 
         assert result['matching_rate'] == 1.0
+
+
+class TestEngineConsistency:
+    """同一份数据经各比对引擎得到相同差异测试"""
+
+    METADATA = [{'name': 'id', 'type': 'int'}, {'name': 'biz_date', 'type': 'date'},
+                {'name': 'qty', 'type': 'int'}, {'name': 'name', 'type': 'varchar'}]
+    TGT_METADATA = [{'name': 'id', 'type': 'NUMBER', 'num_precision': 10, 'num_scale': 0},
+                    {'name': 'biz_date', 'type': 'DATE'},
+                    {'name': 'qty', 'type': 'NUMBER', 'num_precision': 10, 'num_scale': 0},
+                    {'name': 'name', 'type': 'VARCHAR2'}]
+
+    @staticmethod
+    def _rows():
+        """源端为MySQL风格（date值），目标端为Oracle风格（datetime值、数值为float），首块qty全为NULL"""
+        from datetime import date
+
+        src_rows = [{'id': i, 'biz_date': date(2026, 1, i % 28 + 1), 'qty': None if i < 4 else i,
+                     'name': f'n{i}'} for i in range(20)]
+        tgt_rows = [{'id': r['id'], 'biz_date': datetime(r['biz_date'].year, r['biz_date'].month, r['biz_date'].day),
+                     'qty': None if r['qty'] is None else float(r['qty']), 'name': r['name']}
+                    for r in src_rows if r['id'] != 13]
+        tgt_rows[6]['qty'] = 7.0  # id=6 数值不一致
+        tgt_rows[9]['name'] = None  # id=9 一端为NULL
+        tgt_rows[11]['biz_date'] = datetime(2026, 1, 12, 8, 0)  # id=11 时间部分不同
+        tgt_rows.append({'id': 30, 'biz_date': None, 'qty': None, 'name': 'x'})
+        return src_rows, tgt_rows
+
+    @pytest.mark.parametrize('module_name, class_name', [
+        ('pandas_engine', 'PandasCompareEngine'),
+        ('hash_engine', 'HashCompareEngine'),
+        ('streaming_engine', 'StreamingCompareEngine'),
+        ('duckdb_engine', 'DuckDBCompareEngine'),
+    ])
+    def test_same_differences_across_engines(self, build_engine, table_adapter, tmp_path, module_name, class_name):
+        """测试各引擎识别出相同的不一致、源端独有和目标端独有记录"""
+        import importlib
+
+        engine_cls = getattr(importlib.import_module(f'core.compare_engine.{module_name}'), class_name)
+        src_rows, tgt_rows = self._rows()
+        engine = build_engine(engine_cls, metadata=self.METADATA, tgt_metadata=self.TGT_METADATA,
+                              src_adapter=table_adapter(src_rows), tgt_adapter=table_adapter(tgt_rows),
+                              chunk_size_for_data_sync=4, update_time_str='name', duckdb_temp_dir=str(tmp_path))
+        try:
+            engine.load_data()
+            engine.compare()
+        finally:
+            getattr(engine, 'close_duckdb', lambda: None)()
+
+        result = engine.compare_result
+        diff_records = result['diff_records']
+        assert result['src_cnt'] == 20 and result['tgt_cnt'] == 20
+        assert sorted(r['id'] for r in diff_records['mismatch']) == [6, 9, 11]
+        assert [r['id'] for r in diff_records['src_only']] == [13]
+        assert [r['id'] for r in diff_records['tgt_only']] == [30]
+        assert result['diff_cnt'] == 5
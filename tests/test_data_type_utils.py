@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据类型统一工具测试用例
+"""
+import pandas as pd
+from datetime import date, datetime
+
+
+class TestNormaliseDataTypes:
+    """按元数据统一两端类型测试"""
+
+    def test_metadata_driven_mapping(self):
+        """测试按元数据确定目标类型并返回映射"""
+        from decimal import Decimal
+        from utils.data_type_utils import normalise_data_types
+
+        df1 = pd.DataFrame({'id': [1, 2], 'amount': [Decimal('1.10'), Decimal('2.00')], 'qty': [Decimal('3'), Decimal('4')]})
+        df2 = pd.DataFrame({'id': [1, 2], 'amount': [Decimal('1.1'), Decimal('2')], 'qty': [3, 4]})
+        meta1 = [{'name': 'id', 'type': 'bigint'},
+                 {'name': 'amount', 'type': 'decimal', 'num_precision': 38, 'num_scale': 2},
+                 {'name': 'qty', 'type': 'decimal', 'num_precision': 10, 'num_scale': 0}]
+        meta2 = [{'name': 'id', 'type': 'NUMBER', 'num_precision': 19, 'num_scale': 0},
+                 {'name': 'amount', 'type': 'NUMBER', 'num_precision': 38, 'num_scale': 2},
+                 {'name': 'qty', 'type': 'NUMBER', 'num_precision': 10, 'num_scale': 0}]
+
+        mapping = normalise_data_types(df1, df2, meta1, meta2)
+
+        assert mapping == {'id': 'int', 'amount': 'decimal', 'qty': 'int'}
+        assert df1['qty'].dtype == 'int64' and df2['qty'].dtype == 'int64'
+        # 高精度十进制按规范文本比较，1.10与1.1一致
+        assert df1['amount'].tolist() == df2['amount'].tolist() == ['1.1', '2']
+
+    def test_decimal_and_string_columns_use_arrow_strings(self):
+        """测试十进制列按列转换为规范文本，十进制与字符串列均为Arrow字符串"""
+        from decimal import Decimal
+        from utils.data_type_utils import normalise_data_types, STRING_DTYPE
+
+        df1 = pd.DataFrame({'amount': [Decimal('100.000'), Decimal('0.00'), None, Decimal('-2.50')],
+                            'name': ['a', None, 'c', 'd']})
+        df2 = pd.DataFrame({'amount': [Decimal('100'), Decimal('0'), None, Decimal('-2.5')],
+                            'name': pd.Series(['a', None, 'c', 'd'], dtype=STRING_DTYPE)})
+        meta = [{'name': 'amount', 'type': 'decimal', 'num_precision': 38, 'num_scale': 3},
+                {'name': 'name', 'type': 'varchar'}]
+
+        normalise_data_types(df1, df2, meta, meta)
+
+        for df in (df1, df2):
+            assert df['amount'].dtype == STRING_DTYPE and df['name'].dtype == STRING_DTYPE
+            assert df['amount'].tolist()[:2] == ['100', '0'] and df['amount'].tolist()[3] == '-2.5'
+            assert df['amount'].isna().tolist() == [False, False, True, False]
+
+    def test_in_place_and_null_strings(self):
+        """测试原地转换、删除非共有列，字符串列为Arrow字符串，NULL保持为NULL"""
+        from utils.data_type_utils import normalise_data_types, STRING_DTYPE
+
+        df1 = pd.DataFrame({'id': [1, 2], 'name': ['a', None], 'only_src': [1, 2]})
+        df2 = pd.DataFrame({'id': [1, 2], 'name': pd.Series([1, None], dtype=object)})
+
+        mapping = normalise_data_types(df1, df2)
+
+        assert list(df1.columns) == ['id', 'name']
+        assert mapping['name'] == 'string'
+        assert df1['name'].dtype == STRING_DTYPE and df2['name'].dtype == STRING_DTYPE
+        assert df1['name'].isna().tolist() == [False, True]
+        assert df2['name'].tolist()[0] == '1' and df2['name'].isna().iloc[1]
+
+    def test_nullable_bigint_not_cast_to_float(self):
+        """测试一端含NULL的BIGINT列两端统一为可空Int64，不转为float64使超过2**53的相邻值相等"""
+        from utils.data_type_utils import normalise_data_types
+
+        big = 2 ** 53
+        df1 = pd.DataFrame({'id': [1, 2, 3], 'amount': pd.Series([big, big + 2, None], dtype=object)})
+        df2 = pd.DataFrame({'id': [1, 2, 3], 'amount': [big + 1, big + 2, 7]})
+        meta = [{'name': 'id', 'type': 'bigint'}, {'name': 'amount', 'type': 'bigint'}]
+
+        mapping = normalise_data_types(df1, df2, meta, meta)
+
+        assert mapping['amount'] == 'int'
+        assert df1['amount'].dtype == df2['amount'].dtype == 'Int64'
+        assert df1['amount'].iloc[0] != df2['amount'].iloc[0]
+        assert df1['amount'].iloc[1] == df2['amount'].iloc[1] == big + 2
+
+    def test_timezone_normalised(self):
+        """测试带时区的时间统一换算为UTC"""
+        from utils.data_type_utils import normalise_data_types
+
+        df1 = pd.DataFrame({'id': [1], 'ts': pd.to_datetime(['2026-01-01 08:00:00+08:00'])})
+        df2 = pd.DataFrame({'id': [1], 'ts': pd.to_datetime(['2026-01-01 00:00:00'])})
+
+        mapping = normalise_data_types(df1, df2)
+
+        assert mapping['ts'] == 'datetime'
+        assert df1['ts'].iloc[0] == df2['ts'].iloc[0]
+
+
+class TestRowsToFrame:
+    """按元数据类型从元组结果构造DataFrame测试"""
+
+    def test_tuple_rows_use_metadata_dtypes(self):
+        """测试元组结果按元数据确定列类型"""
+        from core.db_adapter.base_adapter import TupleRows
+        from utils.data_type_utils import rows_to_frame, build_dtype_map
+
+        metadata = [{'name': 'id', 'type': 'bigint'}, {'name': 'score', 'type': 'double'},
+                    {'name': 'ts', 'type': 'datetime'}, {'name': 'name', 'type': 'varchar'},
+                    {'name': 'status', 'type': 'enum'}]
+        rows = TupleRows(['id', 'score', 'ts', 'name', 'status'], [
+            (1, 1.5, datetime(2026, 1, 1), 'a', 'on'),
+            (2, None, datetime(2026, 1, 2), None, 'off'),
+        ])
+
+        df = rows_to_frame(rows, dtypes=build_dtype_map(metadata))
+
+        assert df['id'].dtype == 'int64'
+        assert df['score'].dtype == 'float64'
+        assert pd.api.types.is_datetime64_any_dtype(df['ts'])
+        assert pd.api.types.is_string_dtype(df['name']) and df['name'].isna().tolist() == [False, True]
+        assert isinstance(df['status'].dtype, pd.CategoricalDtype)
+
+    def test_int_column_with_null_uses_nullable_int(self):
+        """测试整数列含NULL时使用可空Int64，超过2**53的BIGINT不丢失精度"""
+        from core.db_adapter.base_adapter import TupleRows
+        from utils.data_type_utils import rows_to_frame
+
+        df = rows_to_frame(TupleRows(['id', 'v'], [(1, 2 ** 53 + 1), (2, None)]), dtypes={'v': 'int'})
+
+        assert df['v'].dtype == 'Int64'
+        assert df['v'].iloc[0] == 2 ** 53 + 1 and df['v'].isna().iloc[1]
+
+    def test_empty_rows_keep_columns(self):
+        """测试空结果保留列名"""
+        from core.db_adapter.base_adapter import TupleRows
+        from utils.data_type_utils import rows_to_frame
+
+        df = rows_to_frame(TupleRows(['id', 'name'], []), dtypes={'id': 'int'})
+
+        assert df.empty
+        assert list(df.columns) == ['id', 'name']
+
+    def test_tuple_rows_index_as_dict(self):
+        """测试TupleRows按下标访问返回dict"""
+        from core.db_adapter.base_adapter import TupleRows
+
+        rows = TupleRows(['id', 'name'], [(1, 'a'), (2, 'b')])
+
+        assert rows[-1]['id'] == 2
+        assert [r['name'] for r in rows] == ['a', 'b']
+        assert len(rows[:1]) == 1
+
+    def test_unify_with_string_dtype(self):
+        """测试统一类型时兼容string扩展类型"""
+        from utils.data_type_utils import unify_data_types, STRING_DTYPE
+
+        df1 = pd.DataFrame({'id': [1], 'name': pd.array(['a'], dtype=STRING_DTYPE)})
+        df2 = pd.DataFrame({'id': [1], 'name': ['a']})
+
+        df1_unified, df2_unified = unify_data_types(df1, df2)
+
+        assert df1_unified['name'].tolist() == df2_unified['name'].tolist()
+
+
+class TestResolveColumnKinds:
+    """分块加载时按元数据确定列类型测试"""
+
+    def test_kinds_from_both_sides_metadata(self):
+        """测试两端元数据不同时统一类型：MySQL DATE与Oracle DATE为时间，无元数据的列为字符串"""
+        from utils.data_type_utils import resolve_column_kinds
+
+        mysql_meta = [{'name': 'id', 'type': 'int'}, {'name': 'biz_date', 'type': 'date'},
+                      {'name': 'amount', 'type': 'decimal', 'num_precision': 38, 'num_scale': 2},
+                      {'name': 'name', 'type': 'varchar'}]
+        oracle_meta = [{'name': 'id', 'type': 'NUMBER', 'num_precision': 10, 'num_scale': 0},
+                       {'name': 'biz_date', 'type': 'DATE'},
+                       {'name': 'amount', 'type': 'NUMBER', 'num_precision': 38, 'num_scale': 2},
+                       {'name': 'name', 'type': 'VARCHAR2'}]
+
+        kinds = resolve_column_kinds(['id', 'biz_date', 'amount', 'name', 'extra'], mysql_meta, oracle_meta)
+
+        assert kinds == {'id': 'int', 'biz_date': 'datetime', 'amount': 'decimal', 'name': 'string',
+                         'extra': 'string'}
+
+    def test_chunks_converted_to_same_types(self):
+        """测试取值不同的两个分块（首块全为NULL）按同一类型转换，date与datetime值可直接比较"""
+        from utils.data_type_utils import convert_frame_types, STRING_DTYPE
+
+        kinds = {'id': 'int', 'biz_date': 'datetime', 'name': 'string'}
+        first = pd.DataFrame({'id': [1, 2], 'biz_date': [None, None], 'name': [None, None]})
+        second = pd.DataFrame({'id': [3, 4], 'biz_date': [date(2026, 1, 1), None], 'name': ['a', None]})
+        other_side = pd.DataFrame({'id': [3], 'biz_date': [datetime(2026, 1, 1)], 'name': ['a']})
+
+        for chunk in (first, second, other_side):
+            convert_frame_types(chunk, kinds)
+
+        assert first.dtypes.to_dict() == second.dtypes.to_dict()
+        assert first['name'].dtype == STRING_DTYPE
+        assert pd.api.types.is_datetime64_any_dtype(second['biz_date'])
+        assert second['biz_date'].iloc[0] == other_side['biz_date'].iloc[0]
+        assert second['name'].isna().tolist() == [False, True]
+
+    def test_nullable_int_chunk_keeps_precision(self):
+        """测试含NULL的整数块转换为可空整数，不转为float64丢失精度"""
+        from utils.data_type_utils import convert_frame_types
+
+        chunk = pd.DataFrame({'id': [9007199254740993, None]}, dtype=object)
+
+        convert_frame_types(chunk, {'id': 'int'})
+
+        assert chunk['id'].dtype == 'Int64'
+        assert chunk['id'].iloc[0] == 9007199254740993
@@ -469,3 +469,388 @@ class TestAdapterEdgeCases:
 
             assert result[0]['name'] == '张三'
             assert result[1]['name'] == '李四'
+
+
+class TestKeysetQuery:
+    """键集分页SQL构建测试"""
+
+    def test_first_page_without_last_key(self):
+        """测试首页查询不带主键条件"""
+        from core.db_adapter.base_adapter import build_keyset_query
+
+        sql, params = build_keyset_query('mysql', 'db.t', ['id', 'name'], ['id'], None, "", 100)
+
+        assert sql == "SELECT id, name FROM db.t ORDER BY id LIMIT 100"
+        assert params is None
+
+    def test_mysql_composite_key_row_value(self):
+        """测试MySQL联合主键使用行值比较"""
+        from core.db_adapter.base_adapter import build_keyset_query
+
+        sql, params = build_keyset_query('mysql', 'db.t', ['a', 'b'], ['a', 'b'], (1, 'x'), "a > 0", 50)
+
+        assert "(a > 0) AND (a, b) > (%s, %s)" in sql
+        assert sql.endswith("ORDER BY a, b LIMIT 50")
+        assert params == (1, 'x')
+
+    def test_oracle_composite_key_expanded(self):
+        """测试Oracle联合主键展开为OR条件并使用ROWNUM"""
+        from core.db_adapter.base_adapter import build_keyset_query
+
+        sql, params = build_keyset_query('oracle', 'db.t', ['a', 'b'], ['a', 'b'], (1, 2), "", 10, 'numeric')
+
+        assert "((a > :1) OR (a = :2 AND b > :3))" in sql
+        assert "ROWNUM <= 10" in sql
+        assert params == (1, 1, 2)
+
+    def test_sqlserver_uses_top(self):
+        """测试SQL Server使用TOP"""
+        from core.db_adapter.base_adapter import build_keyset_query
+
+        sql, params = build_keyset_query('sqlserver', 'db.t', ['id'], ['id'], (5,), "", 10, 'qmark')
+
+        assert sql == "SELECT TOP 10 id FROM db.t WHERE id > ? ORDER BY id"
+        assert params == (5,)
+
+
+class TestTableStatsQuery:
+    """数据字典统计信息查询测试"""
+
+    def test_mysql_information_schema(self):
+        """测试MySQL读取information_schema.TABLES"""
+        from core.db_adapter.base_adapter import build_table_stats_query
+
+        sql, params = build_table_stats_query('mysql', 'test_db', 'orders')
+
+        assert 'information_schema.TABLES' in sql
+        assert 'TABLE_SCHEMA = %s AND TABLE_NAME = %s' in sql
+        assert params == ('test_db', 'orders')
+
+    def test_oracle_numeric_placeholders(self):
+        """测试Oracle使用:1/:2占位符并转为大写"""
+        from core.db_adapter.base_adapter import build_table_stats_query
+
+        sql, params = build_table_stats_query('oracle', 'scott', 'emp', 'numeric')
+
+        assert 'ALL_TABLES' in sql
+        assert 'UPPER(:1)' in sql and 'UPPER(:2)' in sql
+        assert params == ('SCOTT', 'EMP')
+
+    def test_postgresql_and_sqlserver(self):
+        """测试PostgreSQL读取pg_class，SQL Server读取sys.partitions"""
+        from core.db_adapter.base_adapter import build_table_stats_query
+
+        pg_sql, pg_params = build_table_stats_query('postgresql', 'public', 'orders')
+        ss_sql, ss_params = build_table_stats_query('sqlserver', 'dbo', 'orders', 'qmark')
+
+        assert 'pg_class' in pg_sql and pg_params == ('public', 'orders')
+        assert 'sys.partitions' in ss_sql and 'OBJECT_ID(?)' in ss_sql
+        assert ss_params == ('dbo.orders',)
+
+    def test_unsupported_db_type(self):
+        """测试不支持的数据库类型"""
+        from core.db_adapter.base_adapter import build_table_stats_query
+
+        assert build_table_stats_query('db2', 'x', 'y') == (None, None)
+
+    def test_parse_table_stats(self):
+        """测试解析字典游标、元组游标和缺失统计信息"""
+        from core.db_adapter.base_adapter import parse_table_stats
+        from decimal import Decimal
+
+        assert parse_table_stats([{'row_count': 1200, 'avg_row_bytes': Decimal('85')}]) == \
+            {'row_count': 1200, 'avg_row_bytes': 85.0}
+        assert parse_table_stats([(50, None)]) == {'row_count': 50, 'avg_row_bytes': None}
+        assert parse_table_stats([(None, None)]) is None
+        assert parse_table_stats([]) is None
+
+
+class TestPooledAdapterTupleFetch:
+    """连接池适配器元组批量读取测试"""
+
+    def test_query_tuples_fetchmany(self):
+        """测试按fetchmany分批读取元组并保留列名"""
+        from utils.db_connection_pool import PooledAdapter
+
+        cursor = Mock()
+        cursor.description = [('id',), ('name',)]
+        cursor.fetchmany.side_effect = [[(1, 'a'), (2, 'b')], [(3, 'c')], []]
+        pool = Mock()
+        pool.db_type = 'oracle'
+        pool.get_raw_connection.return_value.cursor.return_value = cursor
+
+        adapter = PooledAdapter(pool, {})
+        rows = adapter.query_tuples("SELECT id, name FROM t", batch_size=2)
+
+        assert rows.columns == ['id', 'name']
+        assert rows.rows == [(1, 'a'), (2, 'b'), (3, 'c')]
+        cursor.fetchmany.assert_called_with(2)
+        cursor.close.assert_called()
+
+
+
+class TestStreamQuery:
+    """流式游标分批读取测试"""
+
+    @staticmethod
+    def _make_cursor(batches):
+        cursor = Mock()
+        cursor.description = [('id',), ('name',)]
+        cursor.fetchmany.side_effect = batches
+        return cursor
+
+    def test_pooled_stream_yields_batches(self):
+        """测试逐批返回TupleRows，读取结束后关闭游标"""
+        from utils.db_connection_pool import PooledAdapter
+
+        cursor = self._make_cursor([[(1, 'a'), (2, 'b')], [(3, 'c')], []])
+        pool = Mock()
+        pool.db_type = 'sqlserver'
+        pool.get_raw_connection.return_value.cursor.return_value = cursor
+
+        adapter = PooledAdapter(pool, {})
+        batches = list(adapter.stream_query("SELECT id, name FROM t", batch_size=2))
+
+        assert [b.rows for b in batches] == [[(1, 'a'), (2, 'b')], [(3, 'c')]]
+        assert batches[0].columns == ['id', 'name']
+        cursor.close.assert_called_once()
+
+    def test_pooled_stream_cursor_per_driver(self):
+        """测试连接池适配器委托给对应数据库的适配器：MySQL使用非缓冲游标，Oracle设置到底层游标的arraysize/prefetchrows"""
+        import pymysql
+        from utils.db_connection_pool import PooledAdapter
+
+        pool = Mock()
+        pool.db_type = 'mysql'
+        adapter = PooledAdapter(pool, {})
+        adapter.connection.cursor.return_value = Mock(description=[('1',)], fetchmany=Mock(return_value=[]))
+        list(adapter.stream_query("SELECT 1"))
+        adapter.connection.cursor.assert_called_with(pymysql.cursors.SSCursor)
+
+        pool.db_type = 'oracle'
+        raw_cursor = Mock()
+        adapter = PooledAdapter(pool, {})
+        adapter.connection.cursor.return_value = Mock(_cursor=raw_cursor, description=[('ID',)],
+                                                      fetchmany=Mock(return_value=[]))
+        list(adapter.stream_query("SELECT 1 FROM dual", batch_size=500))
+        assert raw_cursor.arraysize == 500
+        assert raw_cursor.prefetchrows == 501
+
+    def test_empty_result_keeps_columns(self):
+        """测试空结果返回带列名的空批"""
+        from utils.db_connection_pool import PooledAdapter
+
+        cursor = self._make_cursor([[]])
+        pool = Mock()
+        pool.db_type = 'sqlserver'
+        pool.get_raw_connection.return_value.cursor.return_value = cursor
+
+        rows = PooledAdapter(pool, {}).query_tuples("SELECT id, name FROM t WHERE 1 = 0")
+
+        assert rows.columns == ['id', 'name']
+        assert len(rows) == 0
+
+    def test_stream_closes_cursor_after_last_batch(self):
+        """测试读完结果后正常关闭游标"""
+        from core.db_adapter.mysql_adapter import MySQLAdapter
+
+        with patch('pymysql.connect') as mock_connect:
+            adapter = MySQLAdapter({'host': 'localhost', 'port': 3306, 'user': 'u', 'password': 'p', 'database': 'd'})
+        cursor = self._make_cursor([[(1, 'a')], []])
+        mock_connect.return_value.cursor.return_value = cursor
+
+        assert [b.rows for b in adapter.stream_data('d', 't', ['id', 'name'], batch_size=1)] == [[(1, 'a')]]
+        cursor.execute.assert_called_once_with("SELECT id, name FROM d.t")
+        cursor.close.assert_called_once()
+
+    def test_abandoned_mysql_stream_drops_connection(self):
+        """测试提前结束MySQL非缓冲读取时断开连接（不关闭游标，关闭会读完剩余结果）并重新连接"""
+        import pymysql
+        from core.db_adapter.mysql_adapter import MySQLAdapter
+
+        first_conn = Mock(spec=pymysql.connections.Connection)
+        second_conn = Mock(spec=pymysql.connections.Connection)
+        cursor = self._make_cursor([[(1, 'a')], [(2, 'b')], []])
+        first_conn.cursor.return_value = cursor
+        with patch('pymysql.connect', side_effect=[first_conn, second_conn]):
+            adapter = MySQLAdapter({'host': 'localhost', 'port': 3306, 'user': 'u', 'password': 'p', 'database': 'd'})
+            batches = adapter.stream_data('d', 't', ['id', 'name'], batch_size=1)
+            first = next(batches)
+            batches.close()
+
+        assert first.rows == [(1, 'a')]
+        first_conn._force_close.assert_called_once()
+        cursor.close.assert_not_called()
+        assert adapter.connection is second_conn
+
+    def test_abandoned_pooled_stream_drops_driver_connection(self):
+        """测试连接池连接上提前结束读取时断开底层pymysql连接，连接仍归还连接池（由DBUtils重连）"""
+        import pymysql
+        from utils.db_connection_pool import PooledAdapter
+
+        driver_conn = Mock(spec=pymysql.connections.Connection)
+        cursor = self._make_cursor([[(1, 'a')], [(2, 'b')], []])
+        pool = Mock()
+        pool.db_type = 'mysql'
+        pooled_conn = pool.get_raw_connection.return_value
+        pooled_conn._con._con = driver_conn
+        pooled_conn.cursor.return_value = cursor
+
+        adapter = PooledAdapter(pool, {})
+        batches = adapter.stream_data('d', 't', ['id', 'name'], batch_size=1)
+        next(batches)
+        batches.close()
+        adapter.close()
+
+        driver_conn._force_close.assert_called_once()
+        pool.release_raw_connection.assert_called_once_with(pooled_conn)
+
+
+class TestPostgresCopy:
+    """PostgreSQL COPY批量导出测试"""
+
+    @staticmethod
+    def _make_cursor(csv_text: str, error: Exception = None):
+        cursor = Mock()
+
+        def fake_copy(sql, file):
+            file.write(csv_text.encode('utf-8'))
+            if error:
+                raise error
+
+        cursor.copy_expert = Mock(side_effect=fake_copy)
+        return cursor
+
+    def test_build_copy_sql(self):
+        """测试COPY语句包装查询并指定CSV和NULL标记"""
+        from core.db_adapter.postgres_copy import build_copy_sql
+
+        sql = build_copy_sql('public.orders', ['id', 'amount'], "status = 'paid'")
+
+        assert sql == ("COPY (SELECT id, amount FROM public.orders WHERE status = 'paid') TO STDOUT "
+                       "WITH (FORMAT csv, NULL '\\N', ENCODING 'UTF8')")
+
+    def test_frames_typed_by_metadata(self):
+        """测试按字段类型解析，区分NULL与空字符串"""
+        from decimal import Decimal
+        from core.db_adapter.postgres_copy import iter_copy_frames
+
+        csv_text = ('1,12.50,2026-01-02 03:04:05,t,""\n'
+                    '2,\\N,\\N,f,\\N\n'
+                    '3,0.10,2026-01-03 00:00:00,t,"a,b"\n')
+        column_types = {'id': 'bigint', 'amount': 'numeric', 'created_at': 'timestamp without time zone',
+                        'paid': 'boolean', 'remark': 'character varying'}
+
+        frames = list(iter_copy_frames(self._make_cursor(csv_text), 'COPY ...', list(column_types),
+                                       column_types, batch_size=2))
+
+        assert [len(f) for f in frames] == [2, 1]
+        first = frames[0]
+        assert first['id'].dtype == 'int64'
+        assert first['amount'].tolist() == [Decimal('12.50'), None]
+        assert str(first['created_at'].dtype) == 'datetime64[ns]' and first['created_at'].isna().tolist() == [False, True]
+        assert first['paid'].tolist() == [True, False]
+        assert first['remark'].iloc[0] == '' and first['remark'].isna().iloc[1]
+        assert frames[1]['remark'].iloc[0] == 'a,b'
+
+    def test_empty_result_keeps_columns(self):
+        """测试无数据时返回带列名的空块"""
+        from core.db_adapter.postgres_copy import iter_copy_frames
+
+        frames = list(iter_copy_frames(self._make_cursor(''), 'COPY ...', ['id', 'name']))
+
+        assert len(frames) == 1 and frames[0].empty
+        assert list(frames[0].columns) == ['id', 'name']
+
+    def test_copy_error_raised(self):
+        """测试COPY中途失败时抛出异常"""
+        from core.db_adapter.postgres_copy import iter_copy_frames
+
+        cursor = self._make_cursor('1,a\n', error=RuntimeError("连接中断"))
+
+        with pytest.raises(RuntimeError, match="连接中断"):
+            list(iter_copy_frames(cursor, 'COPY ...', ['id', 'name']))
+
+    def test_pooled_copy_requires_postgresql(self):
+        """测试非PostgreSQL连接池不支持COPY导出"""
+        from utils.db_connection_pool import PooledAdapter
+
+        pool = Mock()
+        pool.db_type = 'mysql'
+
+        with pytest.raises(ValueError):
+            next(PooledAdapter(pool, {}).copy_data('db', 't', ['id']))
+
+
+class TestOracleRowidRanges:
+    """Oracle ROWID区间切分与读取测试"""
+
+    def test_ranges_query_by_extents_view(self):
+        """测试按区信息生成区间查询，USER_EXTENTS不按所有者过滤"""
+        from core.db_adapter.oracle_rowid import build_rowid_ranges_query
+
+        dba_sql = build_rowid_ranges_query()
+        user_sql = build_rowid_ranges_query('USER_EXTENTS')
+
+        assert 'dba_extents' in dba_sql and 'e.owner = UPPER(:1)' in dba_sql
+        assert 'user_extents' in user_sql and 'e.owner' not in user_sql
+        for sql in (dba_sql, user_sql):
+            assert 'DBMS_ROWID.ROWID_CREATE' in sql and ':3' in sql
+
+    def test_range_select(self):
+        """测试区间读取语句附加过滤条件"""
+        from core.db_adapter.oracle_rowid import build_rowid_range_select
+
+        sql = build_rowid_range_select('HR.ORDERS', ['ID', 'AMOUNT'], "STATUS = 'PAID'")
+
+        assert sql == ("SELECT ID, AMOUNT FROM HR.ORDERS WHERE ROWID BETWEEN CHARTOROWID(:1) AND CHARTOROWID(:2)"
+                       " AND (STATUS = 'PAID')")
+
+    def test_numeric_output_type_handler(self):
+        """测试整数NUMBER取为原生整数，带小数位的NUMBER取为Decimal，其他类型不处理"""
+        import cx_Oracle
+        from decimal import Decimal
+        from core.db_adapter.oracle_rowid import numeric_output_type_handler
+
+        cursor = Mock(arraysize=1000)
+        numeric_output_type_handler(cursor, 'ID', cx_Oracle.NUMBER, 22, 10, 0)
+        cursor.var.assert_called_with(cx_Oracle.NATIVE_INT, arraysize=1000)
+        numeric_output_type_handler(cursor, 'AMOUNT', cx_Oracle.NUMBER, 22, 12, 2)
+        cursor.var.assert_called_with(Decimal, arraysize=1000)
+        assert numeric_output_type_handler(cursor, 'NAME', cx_Oracle.STRING, 50, 0, 0) is None
+
+    def test_pooled_ranges_fall_back_to_user_extents(self):
+        """测试DBA_EXTENTS无权限时改用USER_EXTENTS"""
+        from utils.db_connection_pool import PooledAdapter
+
+        pool = Mock()
+        pool.db_type = 'oracle'
+        adapter = PooledAdapter(pool, {})
+        adapter.query = Mock(side_effect=[Exception("ORA-00942"), [{'START_ROWID': 'A', 'END_ROWID': 'B'}]])
+
+        ranges = adapter.get_rowid_ranges('hr', 'orders', 8)
+
+        assert ranges == [('A', 'B')]
+        assert 'user_extents' in adapter.query.call_args.args[0]
+        assert adapter.query.call_args.args[1] == ('HR', 'ORDERS', 8)
+
+    def test_pooled_stream_rowid_range(self):
+        """测试区间读取绑定起止ROWID并在底层游标设置数值类型处理"""
+        from core.db_adapter.oracle_rowid import numeric_output_type_handler
+        from utils.db_connection_pool import PooledAdapter
+
+        raw_cursor = Mock()
+        cursor = Mock(_cursor=raw_cursor)
+        cursor.description = [('ID',)]
+        cursor.fetchmany.side_effect = [[(1,), (2,)], []]
+        pool = Mock()
+        pool.db_type = 'oracle'
+        adapter = PooledAdapter(pool, {})
+        adapter.connection.cursor.return_value = cursor
+
+        batches = list(adapter.stream_rowid_range('HR', 'ORDERS', ['ID'], ('A', 'B'), batch_size=100))
+
+        assert [b.rows for b in batches] == [[(1,), (2,)]]
+        assert cursor.execute.call_args.args[1] == ('A', 'B')
+        assert raw_cursor.outputtypehandler is numeric_output_type_handler
+        cursor.close.assert_called_once()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+差异数据工具测试用例
+"""
+import pandas as pd
+
+
+class TestDiffUtils:
+    """差异数据工具测试"""
+
+    def test_build_mismatch_full_composite_and_duplicate_keys(self):
+        """测试联合主键和重复主键（取每端第一条）"""
+        from utils.diff_utils import build_mismatch_full
+
+        src_df = pd.DataFrame({'a': [1, 1, 2], 'b': ['x', 'x', 'y'], 'v': [10, 11, 20]})
+        tgt_df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y'], 'v': [99, 21]})
+        keys = pd.DataFrame({'a': [1, 2, 1], 'b': ['x', 'y', 'x']})
+
+        result = build_mismatch_full(keys, src_df, tgt_df, ['a', 'b'], ['v'])
+
+        assert len(result) == 2
+        assert result[0]['pk'] == {'a': 1, 'b': 'x'}
+        assert result[0]['src_record'] == {'a': 1, 'b': 'x', 'v': 10}
+        assert result[0]['tgt_record'] == {'a': 1, 'b': 'x', 'v': 99}
+        assert result[1]['update_column'] == ['v']
+
+    def test_build_mismatch_full_columnar_matches_records(self):
+        """测试列式结构与字典列表输出一致，缺失端为空字典"""
+        from utils.diff_utils import build_mismatch_full, ColumnarMismatchFull
+
+        src_df = pd.DataFrame({'id': [1, 2, 3], 'v': [1, 2, 3]})
+        tgt_df = pd.DataFrame({'id': [1, 2], 'v': [5, 6]})
+        keys = pd.DataFrame({'id': [1, 2, 3]})
+
+        records = build_mismatch_full(keys, src_df, tgt_df, ['id'])
+        columnar = build_mismatch_full(keys, src_df, tgt_df, ['id'], columnar=True)
+
+        assert isinstance(columnar, ColumnarMismatchFull)
+        assert list(columnar) == records
+        assert columnar[-1]['tgt_record'] == {}
+        assert columnar[0:2] == records[0:2]
+
+    def test_hash_compare_null_strings_in_arrow_columns(self):
+        """测试Arrow字符串列一端为NULL时判为不一致，差异记录中的NULL为None"""
+        from utils.data_type_utils import STRING_DTYPE
+        from utils.diff_utils import hash_compare
+
+        src_df = pd.DataFrame({'id': [1, 2, 3], 'v': pd.Series(['x', None, 'z'], dtype=STRING_DTYPE)})
+        tgt_df = pd.DataFrame({'id': [1, 2, 4], 'v': pd.Series(['x', 'y', None], dtype=STRING_DTYPE)})
+
+        result = hash_compare(src_df, tgt_df, ['id'])
+
+        assert result['matched_cnt'] == 1 and result['mismatch_cnt'] == 1
+        assert result['column_mismatch_cnt'] == {'v': 1}
+        assert result['diff_records']['mismatch_full'][0]['src_record'] == {'id': 2, 'v': None}
+        assert result['diff_records']['src_only'] == [{'id': 3, 'v': 'z'}]
+
+    def test_hash_compare_bigint_beyond_float_precision(self):
+        """测试两端整数类型不同（int64与可空Int64）时超过2**53的BIGINT不转浮点，相邻值判为不一致"""
+        from utils.diff_utils import hash_compare
+
+        big = 2 ** 53
+        src_df = pd.DataFrame({'id': [1, 2], 'amount': pd.Series([big, big + 2], dtype='int64')})
+        tgt_df = pd.DataFrame({'id': [1, 2], 'amount': pd.array([big + 1, big + 2], dtype='Int64')})
+
+        result = hash_compare(src_df, tgt_df, ['id'])
+
+        assert result['matched_cnt'] == 1 and result['mismatch_cnt'] == 1
+        assert result['diff_records']['mismatch'] == [{'id': 1}]
+        assert result['column_mismatch_cnt'] == {'amount': 1}
+
+    def test_frame_records_nulls_as_none(self):
+        """测试可空扩展类型列中的NULL输出为None，原DataFrame不变"""
+        from utils.data_type_utils import STRING_DTYPE
+        from utils.diff_utils import frame_records
+
+        df = pd.DataFrame({'id': pd.array([1, None], dtype='Int64'), 'v': pd.Series([None, 'b'], dtype=STRING_DTYPE)})
+
+        assert frame_records(df) == [{'id': 1, 'v': None}, {'id': None, 'v': 'b'}]
+        assert df['v'].dtype == STRING_DTYPE
+
+    def test_remove_diff_records_local_dir(self, tmp_path):
+        """测试删除差异数据目录，未记录目录时不做处理"""
+        from utils.diff_utils import remove_diff_records
+
+        output_dir = tmp_path / 'orders_abc'
+        (output_dir / 'diff_type=mismatch').mkdir(parents=True)
+
+        remove_diff_records({'diff_records_dir': str(output_dir)})
+        remove_diff_records({})
+
+        assert not output_dir.exists()
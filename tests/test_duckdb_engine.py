@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DuckDB比对引擎测试用例
+"""
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch
+from core.compare_engine.base_engine import get_compare_engine
+from core.compare_engine.duckdb_engine import DuckDBCompareEngine
+
+METADATA = [{'name': 'id', 'type': 'int'}, {'name': 'name', 'type': 'varchar'}, {'name': 'age', 'type': 'int'}]
+
+
+@pytest.fixture
+def duckdb_engine(build_engine, table_adapter, tmp_path):
+    """按内存数据构造两端的DuckDB引擎（分块大小4，更新时间字段为name），比对后删除临时数据库"""
+    engines = []
+
+    def factory(src_rows, tgt_rows, metadata=METADATA, tgt_metadata=None):
+        engine = build_engine(DuckDBCompareEngine, metadata=metadata, tgt_metadata=tgt_metadata,
+                              src_adapter=table_adapter(src_rows), tgt_adapter=table_adapter(tgt_rows),
+                              chunk_size_for_data_sync=4, update_time_str='name', duckdb_temp_dir=str(tmp_path))
+        engines.append(engine)
+        return engine
+
+    yield factory
+    for engine in engines:
+        engine.close_duckdb()
+
+
+class TestDuckDBCompareEngine:
+    """DuckDB比对引擎测试"""
+
+    def test_compare_classifies_differences(self, duckdb_engine):
+        """测试分块写入DuckDB后正确识别三类差异和逐列不一致数"""
+        src_rows = [{'id': i, 'name': f'n{i}', 'age': i} for i in range(0, 20)]
+        tgt_rows = [{'id': i, 'name': f'n{i}', 'age': float(i)} for i in range(5, 25) if i != 12]
+        tgt_rows[0]['age'] = None  # id=5 值不一致（NULL）
+        tgt_rows[1]['name'] = 'changed'  # id=6 值不一致
+
+        engine = duckdb_engine(src_rows, tgt_rows)
+        engine.load_data()
+        engine.compare()
+
+        result = engine.compare_result
+        diff_records = result['diff_records']
+        assert result['src_cnt'] == 20
+        assert result['tgt_cnt'] == 19
+        assert diff_records['mismatch'] == [{'id': 5}, {'id': 6}]
+        assert diff_records['mismatch_full'][1]['tgt_record']['name'] == 'changed'
+        assert diff_records['mismatch_full'][0]['tgt_record']['age'] is None
+        assert sorted(r['id'] for r in diff_records['src_only']) == [0, 1, 2, 3, 4, 12]
+        assert diff_records['tgt_only'] == [{'id': i} for i in range(20, 25)]
+        assert result['column_mismatch_cnt'] == {'name': 1, 'age': 1}
+        assert result['diff_cnt'] == 13
+        assert result['matching_rate'] == pytest.approx(12 / 20)
+
+    def test_date_matches_datetime_across_dialects(self, duckdb_engine):
+        """测试MySQL DATE（date值）与Oracle DATE（datetime值）按元数据统一为时间后不误报差异"""
+        src_rows = [{'id': i, 'name': 'x', 'age': date(2026, 1, i + 1)} for i in range(10)]
+        tgt_rows = [{'id': i, 'name': 'x', 'age': datetime(2026, 1, i + 1)} for i in range(10)]
+        tgt_rows[7]['age'] = datetime(2026, 1, 8, 12, 30)  # 时间部分不同
+
+        engine = duckdb_engine(src_rows, tgt_rows,
+                               metadata=[{'name': 'id', 'type': 'int'}, {'name': 'age', 'type': 'date'}],
+                               tgt_metadata=[{'name': 'ID', 'type': 'NUMBER'}, {'name': 'age', 'type': 'DATE'}])
+        engine.load_data()
+        engine.compare()
+
+        assert engine.compare_result['column_type_mapping']['age'] == 'datetime'
+        assert engine.compare_result['diff_records']['mismatch'] == [{'id': 7}]
+
+    def test_column_type_not_taken_from_first_chunk(self, duckdb_engine):
+        """测试首块整数列全为NULL时表结构仍按元数据为整数，后续块的1与1.0不误报差异，真正不一致的值仍被识别"""
+        src_rows = [{'id': i, 'name': 'x', 'age': None if i < 4 else i} for i in range(12)]
+        tgt_rows = [{'id': i, 'name': 'x', 'age': None if i < 4 else float(i)} for i in range(12)]
+        tgt_rows[10]['age'] = 11.0
+
+        engine = duckdb_engine(src_rows, tgt_rows)
+        engine.load_data()
+        assert engine._column_types(engine.SRC_TABLE)['age'] == 'BIGINT'
+        engine.compare()
+
+        assert engine.compare_result['diff_records']['mismatch'] == [{'id': 10}]
+
+    def test_first_chunk_null_strings_keep_later_values(self, duckdb_engine):
+        """测试首块字符串列全为NULL时后续块的文本值正常写入和比较"""
+        src_rows = [{'id': i, 'name': None if i < 4 else f'n{i}', 'age': 1} for i in range(12)]
+        tgt_rows = [dict(r) for r in src_rows]
+        tgt_rows[9]['name'] = 'changed'
+
+        engine = duckdb_engine(src_rows, tgt_rows)
+        engine.load_data()
+        engine.compare()
+
+        mismatch_full = engine.compare_result['diff_records']['mismatch_full']
+        assert [r['pk'] for r in mismatch_full] == [{'id': 9}]
+        assert mismatch_full[0]['src_record']['name'] == 'n9'
+
+    def test_empty_target(self, duckdb_engine):
+        """测试目标端无数据"""
+        engine = duckdb_engine([{'id': i, 'name': 'x', 'age': i} for i in range(6)], [])
+        engine.load_data()
+        engine.compare()
+
+        assert engine.compare_result['tgt_cnt'] == 0
+        assert engine.compare_result['diff_cnt'] == 6
+        assert len(engine.compare_result['diff_records']['src_only']) == 6
+
+    def test_close_removes_temp_database(self, duckdb_engine, tmp_path):
+        """测试关闭后删除临时数据库目录"""
+        engine = duckdb_engine([{'id': 1, 'name': 'a', 'age': 1}], [{'id': 1, 'name': 'a', 'age': 1}])
+        engine.load_data()
+        engine.compare()
+        engine.close_duckdb()
+
+        assert engine.compare_result['diff_cnt'] == 0
+        assert list(tmp_path.iterdir()) == []
+
+    def test_auto_select_duckdb_for_medium_data(self, select_engine, sample_config, mock_db_adapter):
+        """测试中等数据量自动选择DuckDB引擎"""
+        mock_db_adapter.get_table_count.return_value = 800000
+
+        assert isinstance(select_engine(sample_config, mock_db_adapter), DuckDBCompareEngine)
+
+    def test_force_duckdb_engine(self, sample_config):
+        """测试强制使用DuckDB引擎，不查询数据量"""
+        with patch('config.settings.ENGINE_STRATEGY', 'duckdb'), \
+                patch('utils.db_connection_pool.get_pooled_connection') as get_conn:
+            engine = get_compare_engine(sample_config)
+
+        assert type(engine) is DuckDBCompareEngine
+        get_conn.assert_not_called()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比对引擎选择测试用例
+"""
+from core.compare_engine.pandas_engine import PandasCompareEngine
+
+
+class TestEngineSelectionStats:
+    """基于统计信息的引擎选择测试"""
+
+    def test_stats_used_without_count(self, select_engine, sample_config, mock_db_adapter):
+        """测试有统计信息时不执行COUNT"""
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 1000, 'avg_row_bytes': 100.0}
+
+        engine = select_engine(sample_config, mock_db_adapter)
+
+        assert isinstance(engine, PandasCompareEngine)
+        mock_db_adapter.get_table_count.assert_not_called()
+        # 估算值只用于选择引擎，不传给引擎
+        assert 'src_record_count' not in engine.config
+
+    def test_fallback_to_count_without_stats(self, select_engine, sample_config, mock_db_adapter):
+        """测试无统计信息时使用COUNT"""
+        from core.compare_engine.duckdb_engine import DuckDBCompareEngine
+
+        mock_db_adapter.get_table_stats.return_value = None
+        mock_db_adapter.get_table_count.return_value = 800000
+
+        engine = select_engine(sample_config, mock_db_adapter)
+
+        assert isinstance(engine, DuckDBCompareEngine)
+        mock_db_adapter.get_table_count.assert_called_once()
+        assert 'src_record_count' not in engine.config
+
+    def test_wide_rows_exceed_byte_budget(self, select_engine, sample_config, mock_db_adapter):
+        """测试记录数不多但估算数据量超过预算时不使用Pandas"""
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 200000, 'avg_row_bytes': 20000.0}
+
+        engine = select_engine(sample_config, mock_db_adapter)
+
+        assert not isinstance(engine, PandasCompareEngine)
+
+    def test_stats_cached_within_ttl(self, select_engine, sample_config, mock_db_adapter):
+        """测试统计信息在TTL内复用"""
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 1000, 'avg_row_bytes': None}
+
+        select_engine(sample_config, mock_db_adapter)
+        select_engine(sample_config, mock_db_adapter)
+
+        mock_db_adapter.get_table_stats.assert_called_once()
+
+    def test_incremental_large_table_uses_exact_count(self, select_engine, sample_incremental_config,
+                                                       mock_db_adapter):
+        """测试增量比对且全表超过阈值时对增量窗口精确计数"""
+        sample_incremental_config['update_time_str'] = 'update_time'
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 50000000, 'avg_row_bytes': 100.0}
+        mock_db_adapter.get_table_count.return_value = 2000
+
+        engine = select_engine(sample_incremental_config, mock_db_adapter)
+
+        assert isinstance(engine, PandasCompareEngine)
+        assert mock_db_adapter.get_table_count.call_args[0][2] != ""
+
+
+class TestMemoryAwareSelection:
+    """按内存预算选择引擎测试"""
+
+    NARROW_METADATA = [{'name': 'id', 'type': 'bigint'}, {'name': 'update_time', 'type': 'datetime'}]
+
+    def test_narrow_table_above_threshold_uses_pandas(self, select_engine, sample_config, mock_db_adapter):
+        """测试记录数超过阈值但字段很窄、内存预算足够时使用Pandas"""
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 800000, 'avg_row_bytes': 16.0}
+        mock_db_adapter.get_table_metadata.return_value = self.NARROW_METADATA
+
+        assert isinstance(select_engine(sample_config, mock_db_adapter), PandasCompareEngine)
+
+    def test_concurrent_tasks_share_budget(self, select_engine, sample_config, mock_db_adapter):
+        """测试并发任务平分内存预算后不再使用Pandas"""
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 100000, 'avg_row_bytes': 16.0}
+        mock_db_adapter.get_table_metadata.return_value = self.NARROW_METADATA
+        # 单任务约需 100000 × 16 × 2 × 3 ≈ 9.6MB
+        config = {**sample_config, 'process_memory_budget_bytes': 20 * 1024 ** 2}
+
+        assert isinstance(select_engine(config, mock_db_adapter), PandasCompareEngine)
+        assert not isinstance(select_engine({**config, 'concurrent_tasks': 4}, mock_db_adapter),
+                              PandasCompareEngine)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行哈希比对引擎测试用例
+"""
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from core.compare_engine.base_engine import get_compare_engine
+from core.compare_engine.hash_engine import HashCompareEngine
+
+
+@pytest.fixture
+def hash_engine(build_engine):
+    """以已加载的两端数据构造行哈希引擎"""
+    def factory(src_rows, tgt_rows, key_columns=('id',)):
+        engine = build_engine(HashCompareEngine, pk_columns=key_columns)
+        engine.src_df = pd.DataFrame(src_rows)
+        engine.tgt_df = pd.DataFrame(tgt_rows)
+        engine.compare_result['src_cnt'] = len(src_rows)
+        engine.compare_result['tgt_cnt'] = len(tgt_rows)
+        return engine
+
+    return factory
+
+
+class TestHashCompareEngine:
+    """行哈希比对引擎测试"""
+
+    def test_classify_and_column_counts(self, hash_engine):
+        """测试差异归类和逐列不一致计数"""
+        engine = hash_engine(
+            [{'id': 1, 'name': 'a', 'age': 1}, {'id': 2, 'name': 'b', 'age': None}, {'id': 3, 'name': 'c', 'age': 3}],
+            [{'id': 1, 'name': 'a', 'age': 1}, {'id': 2, 'name': 'B', 'age': 5}, {'id': 4, 'name': 'd', 'age': 4}]
+        )
+
+        engine.compare()
+
+        result = engine.compare_result
+        assert result['diff_cnt'] == 3
+        assert result['diff_records']['mismatch'] == [{'id': 2}]
+        assert pd.isna(result['diff_records']['mismatch_full'][0]['src_record']['age'])
+        assert result['diff_records']['mismatch_full'][0]['tgt_record']['name'] == 'B'
+        assert result['diff_records']['src_only'][0]['id'] == 3
+        assert result['diff_records']['tgt_only'] == [{'id': 4}]
+        assert result['column_mismatch_cnt'] == {'name': 1, 'age': 1}
+        assert result['matching_rate'] == pytest.approx(1 / 3)
+
+    def test_nulls_and_numeric_types_match(self, hash_engine):
+        """测试NULL与数值类型差异（int/float）不视为差异"""
+        engine = hash_engine(
+            [{'id': 1, 'a': 'x', 'b': 1, 'c': None}, {'id': 2, 'a': None, 'b': 2, 'c': None}],
+            [{'id': 1, 'a': 'x', 'b': 1.0, 'c': None}, {'id': 2, 'a': None, 'b': 2.0, 'c': None}]
+        )
+
+        engine.compare()
+
+        assert engine.compare_result['diff_cnt'] == 0
+        assert engine.compare_result['matching_rate'] == 1.0
+
+    def test_composite_key(self, hash_engine):
+        """测试联合主键"""
+        engine = hash_engine(
+            [{'a': 1, 'b': 'x', 'v': 1}, {'a': 1, 'b': 'y', 'v': 2}],
+            [{'a': 1, 'b': 'x', 'v': 1}, {'a': 1, 'b': 'y', 'v': 3}],
+            key_columns=['a', 'b']
+        )
+
+        engine.compare()
+
+        assert engine.compare_result['diff_records']['mismatch'] == [{'a': 1, 'b': 'y'}]
+        assert engine.compare_result['diff_records']['mismatch_full'][0]['tgt_record'] == {'a': 1, 'b': 'y', 'v': 3}
+
+    def test_force_pandas_hash_engine(self, sample_config):
+        """测试强制使用行哈希引擎，不查询数据量"""
+        with patch('config.settings.ENGINE_STRATEGY', 'pandas_hash'), \
+                patch('utils.db_connection_pool.get_pooled_connection') as get_conn:
+            engine = get_compare_engine(sample_config)
+
+        assert type(engine) is HashCompareEngine
+        get_conn.assert_not_called()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存预算估算测试用例
+"""
+import pytest
+
+
+class TestMemoryPlanner:
+    """内存预算估算测试"""
+
+    def test_estimate_row_bytes_by_type(self):
+        """测试按字段类型估算每行内存"""
+        from utils.memory_planner import estimate_row_bytes
+
+        assert estimate_row_bytes(['bigint', 'datetime']) == 16
+        # 字符串长度按平均行长/字段数估算
+        assert estimate_row_bytes(['varchar(100)'], avg_row_bytes=400, total_columns=4) == 57 + 100
+
+    def test_estimate_row_bytes_without_metadata(self):
+        """测试无字段信息时使用平均行长，均无时返回None"""
+        from utils.memory_planner import estimate_row_bytes
+
+        assert estimate_row_bytes([], avg_row_bytes=200) == 200
+        assert estimate_row_bytes([]) is None
+
+    def test_task_budget_split_by_concurrency(self):
+        """测试内存预算按同时运行的任务数平分"""
+        from utils.memory_planner import get_task_memory_budget
+
+        config = {'process_memory_budget_bytes': 1000, 'concurrent_tasks': 4}
+        assert get_task_memory_budget(config) == 250
+        assert get_task_memory_budget({'process_memory_budget_bytes': 1000}) == 1000
+
+    def test_guard_raises_after_limit(self):
+        """测试超出预算后抛出异常，且后续登记同样抛出"""
+        from utils.memory_planner import LoadMemoryGuard, MemoryBudgetExceeded
+
+        guard = LoadMemoryGuard(100)
+        guard.add(60)
+        with pytest.raises(MemoryBudgetExceeded):
+            guard.add(60)
+        with pytest.raises(MemoryBudgetExceeded):
+            guard.add(1)
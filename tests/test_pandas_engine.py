@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pandas比对引擎加载与差异输出测试用例
+"""
+import threading
+import pytest
+import pandas as pd
+from unittest.mock import Mock
+from core.compare_engine.pandas_engine import PandasCompareEngine
+
+METADATA = [{'name': 'id', 'type': 'bigint'}, {'name': 'update_time', 'type': 'varchar'}]
+
+
+def _recording_stream(adapter):
+    """记录适配器每次流式读取返回的批大小"""
+    batches = []
+    stream = adapter.stream_data.side_effect
+
+    def fake_stream(*args):
+        for batch in stream(*args):
+            batches.append(len(batch))
+            yield batch
+
+    adapter.stream_data.side_effect = fake_stream
+    return batches
+
+
+class TestPandasChunkedLoading:
+    """Pandas引擎分块加载测试"""
+
+    def test_chunked_load_uses_stream(self, build_engine, table_adapter):
+        """测试大表通过一次流式查询分批加载，每批不超过分块大小"""
+        adapter = table_adapter([{'id': i, 'update_time': None} for i in range(1, 6)])
+        batches = _recording_stream(adapter)
+        engine = build_engine(PandasCompareEngine, src_adapter=adapter, chunk_size_for_data_sync=2)
+
+        engine.load_data()
+
+        assert engine.src_df['id'].tolist() == [1, 2, 3, 4, 5]
+        assert engine.compare_result['src_cnt'] == engine.compare_result['tgt_cnt'] == 5
+        # 每端只执行一次查询
+        assert adapter.stream_data.call_count == 2
+        assert max(batches) == 2
+        adapter.query_data.assert_not_called()
+        adapter.query_data_keyset.assert_not_called()
+
+    def test_postgresql_large_load_uses_copy(self, build_engine, mock_db_adapter):
+        """测试PostgreSQL大表分块加载使用COPY导出，列类型按元数据传给COPY"""
+        frames = [pd.DataFrame({'id': [1, 2], 'update_time': [None, None]}),
+                  pd.DataFrame({'id': [3], 'update_time': [None]})]
+        mock_db_adapter.get_table_count.return_value = 3
+        mock_db_adapter.copy_data = Mock(side_effect=lambda *args: iter(frames))
+        engine = build_engine(PandasCompareEngine, metadata=[{'name': 'id', 'type': 'bigint'}],
+                              src_adapter=mock_db_adapter, src_db_type='postgresql', tgt_db_type='postgresql',
+                              chunk_size_for_data_sync=2)
+
+        engine.load_data()
+
+        assert engine.src_df['id'].tolist() == [1, 2, 3]
+        assert mock_db_adapter.copy_data.call_args_list[0].args[5] == {'id': 'bigint'}
+        mock_db_adapter.stream_data.assert_not_called()
+
+    def test_sides_loaded_concurrently(self, build_engine, table_adapter):
+        """测试源端和目标端并发加载（两端读取需同时到达屏障）"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def make_adapter(rows):
+            adapter = table_adapter(rows)
+            stream = adapter.stream_data.side_effect
+            adapter.stream_data.side_effect = lambda *args: (barrier.wait(), stream(*args))[1]
+            return adapter
+
+        engine = build_engine(PandasCompareEngine,
+                              src_adapter=make_adapter([{'id': 1, 'update_time': None}, {'id': 2, 'update_time': None}]),
+                              tgt_adapter=make_adapter([{'id': 1, 'update_time': None}]))
+
+        engine.load_data()
+        engine.compare()
+
+        assert engine.compare_result['src_cnt'] == 2
+        assert engine.compare_result['tgt_cnt'] == 1
+        assert [r['id'] for r in engine.compare_result['diff_records']['src_only']] == [2]
+
+
+class TestPandasLoadOverBudget:
+    """Pandas加载超出内存预算切换引擎测试"""
+
+    def test_load_over_budget_switches_engine(self, build_engine, table_adapter, tmp_path):
+        """测试Pandas加载超出内存预算时切换为落盘引擎，由其重新加载并得到正确结果"""
+        from core.compare_engine.duckdb_engine import DuckDBCompareEngine
+
+        src_rows = [{'id': i, 'update_time': 'x' * 100} for i in range(100)]
+        tgt_rows = [dict(r) for r in src_rows if r['id'] not in (3, 50)]
+        tgt_rows[0]['update_time'] = 'changed'
+        engine = build_engine(PandasCompareEngine, metadata=METADATA, src_adapter=table_adapter(src_rows),
+                              tgt_adapter=table_adapter(tgt_rows), process_memory_budget_bytes=1000,
+                              duckdb_temp_dir=str(tmp_path))
+
+        engine.load_data()
+        engine.compare()
+
+        result = engine.compare_result
+        assert isinstance(engine._fallback_engine, DuckDBCompareEngine)
+        assert engine.src_df.empty
+        assert result['src_cnt'] == 100 and result['tgt_cnt'] == 98
+        assert result['diff_records']['mismatch'] == [{'id': 0}]
+        assert sorted(r['id'] for r in result['diff_records']['src_only']) == [3, 50]
+        assert result['diff_cnt'] == 3
+        assert 'DuckDBCompareEngine' in result['compare_report']
+        # 切换后的临时数据库已删除
+        assert list(tmp_path.iterdir()) == []
+
+    def test_stale_estimate_does_not_load_in_one_fetch(self, select_engine, table_adapter, sample_config, tmp_path):
+        """测试统计信息过期（估算10条、实际50条）时Pandas仍分块读取，超出预算时切换引擎且结果正确"""
+        from core.compare_engine.duckdb_engine import DuckDBCompareEngine
+
+        rows = [{'id': i, 'update_time': 'x' * 200} for i in range(50)]
+        adapter = table_adapter(rows)
+        adapter.get_table_stats.return_value = {'row_count': 10, 'avg_row_bytes': 10.0}
+        adapter.get_table_metadata.return_value = METADATA
+        engine = select_engine(sample_config, adapter)
+        assert isinstance(engine, PandasCompareEngine)
+
+        tgt_adapter = table_adapter(rows[:-1])
+        batches = _recording_stream(adapter)
+        engine.config.update({'chunk_size_for_data_sync': 10, 'process_memory_budget_bytes': 4000,
+                              'duckdb_temp_dir': str(tmp_path)})
+        engine.src_adapter = adapter
+        engine.tgt_adapter = tgt_adapter
+        engine._src_pk_cache = ['id']
+        engine._src_metadata_cache = METADATA
+
+        engine.load_data()
+        engine.compare()
+
+        adapter.query_data.assert_not_called()
+        # Pandas逐块读取，超出预算后不再读取剩余分块（切换后的引擎按键集分页重新读取）
+        assert max(batches) <= 10
+        assert sum(batches) < len(rows)
+        assert isinstance(engine._fallback_engine, DuckDBCompareEngine)
+        assert engine.compare_result['src_cnt'] == 50 and engine.compare_result['tgt_cnt'] == 49
+        assert [r['id'] for r in engine.compare_result['diff_records']['src_only']] == [49]
+
+
+class TestOracleRowidLoading:
+    """Oracle按ROWID区间并行读取测试"""
+
+    @pytest.fixture
+    def oracle_engine(self, build_engine, mock_db_adapter):
+        def factory(**config):
+            return build_engine(PandasCompareEngine, src_adapter=mock_db_adapter,
+                                **{'src_db_type': 'oracle', 'tgt_db_type': 'oracle', **config})
+
+        return factory
+
+    def test_oracle_large_load_reads_rowid_ranges_in_parallel(self, oracle_engine, mock_db_adapter, pooled_sessions):
+        """测试Oracle大表按ROWID区间由多个会话并行读取，每个会话用后归还"""
+        from core.db_adapter.base_adapter import TupleRows
+
+        rows_by_range = {('A', 'B'): [(1, None), (2, None)], ('C', 'D'): [], ('E', 'F'): [(3, None)]}
+        session = Mock()
+        session.stream_rowid_range = Mock(side_effect=lambda db, table, columns, rowid_range, where, size: iter(
+            [TupleRows(['id', 'update_time'], rows_by_range[rowid_range])]))
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 5000000, 'avg_row_bytes': 100}
+        mock_db_adapter.get_rowid_ranges = Mock(return_value=list(rows_by_range))
+        get_conn, return_conn = pooled_sessions
+        get_conn.return_value = session
+
+        engine = oracle_engine(oracle_rowid_parallel=2, chunk_size_for_data_sync=2)
+        engine.load_data()
+
+        assert sorted(engine.src_df['id'].tolist()) == [1, 2, 3]
+        assert engine.compare_result['src_cnt'] == 3
+        # 每端3个区间各使用一个会话
+        assert get_conn.call_count == 6 and return_conn.call_count == 6
+        assert mock_db_adapter.get_rowid_ranges.call_args.args[2] == 8
+        mock_db_adapter.stream_data.assert_not_called()
+
+    def test_oracle_rowid_off_by_default_and_for_small_tables(self, oracle_engine, mock_db_adapter):
+        """测试默认不启用ROWID并行读取，启用后统计信息记录数低于阈值或无统计信息时也不启用"""
+        mock_db_adapter.get_rowid_ranges = Mock()
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 50000000, 'avg_row_bytes': 100}
+        assert not oracle_engine()._use_oracle_rowid('src')
+
+        engine = oracle_engine(oracle_rowid_parallel=4)
+        assert engine._use_oracle_rowid('src')
+        mock_db_adapter.get_table_stats.return_value = {'row_count': 20000, 'avg_row_bytes': 100}
+        assert not engine._use_oracle_rowid('src')
+        mock_db_adapter.get_table_stats.return_value = None
+        assert not engine._use_oracle_rowid('src')
+        mock_db_adapter.get_rowid_ranges.assert_not_called()
+
+    def test_oracle_rowid_failure_raised(self, oracle_engine, mock_db_adapter, pooled_sessions):
+        """测试并行读取的会话失败时抛出异常"""
+        session = Mock()
+        session.stream_rowid_range = Mock(side_effect=RuntimeError("ORA-03113"))
+        mock_db_adapter.get_rowid_ranges = Mock(return_value=[('A', 'B'), ('C', 'D')])
+        pooled_sessions[0].return_value = session
+
+        with pytest.raises(RuntimeError, match="ORA-03113"):
+            list(oracle_engine()._iter_rowid_frames('src', ['id'], '', 100))
+
+
+class TestPandasMismatchFull:
+    """Pandas引擎mismatch_full输出测试"""
+
+    def test_mismatch_full_pairs(self, build_engine):
+        """测试不一致记录包含两端完整数据"""
+        engine = build_engine(PandasCompareEngine)
+        engine.src_df = pd.DataFrame([{'id': 1, 'age': 30}, {'id': 2, 'age': 25}, {'id': 3, 'age': 35}])
+        engine.tgt_df = pd.DataFrame([{'id': 1, 'age': 30}, {'id': 2, 'age': 26}])
+        engine.compare_result['src_cnt'] = 3
+        engine.compare_result['tgt_cnt'] = 2
+
+        engine.compare()
+
+        diff_records = engine.compare_result['diff_records']
+        assert engine.compare_result['diff_cnt'] == 2
+        assert diff_records['mismatch'] == [{'id': 2}]
+        assert diff_records['mismatch_full'] == [{
+            'pk': {'id': 2},
+            'src_record': {'id': 2, 'age': 25},
+            'tgt_record': {'id': 2, 'age': 26},
+            'update_column': ['update_time']
+        }]
+
+    def test_compare_null_in_arrow_string_column(self, build_engine):
+        """测试Arrow字符串列一端为NULL时判为不一致（datacompy对NA的比较结果不能当作一致）"""
+        from utils.data_type_utils import STRING_DTYPE
+
+        engine = build_engine(PandasCompareEngine)
+        engine.src_df = pd.DataFrame({'id': [1, 2], 'name': pd.Series(['Alice', None], dtype=STRING_DTYPE)})
+        engine.tgt_df = pd.DataFrame({'id': [1, 2], 'name': pd.Series(['Alice', 'Bob'], dtype=STRING_DTYPE)})
+
+        engine.compare()
+        result = engine.compare_result
+
+        assert result['diff_cnt'] == 1
+        assert result['diff_records']['mismatch_full'][0]['src_record'] == {'id': 2, 'name': None}
+
+    def test_compare_bigint_beyond_float_precision(self, build_engine):
+        """测试超过2**53的BIGINT非主键列相差1时判为不一致（datacompy按浮点数比较会判为一致）"""
+        big = 2 ** 60
+        engine = build_engine(PandasCompareEngine)
+        engine.src_df = pd.DataFrame({'id': [1, 2, 3], 'amount': pd.array([big, big, None], dtype='Int64')})
+        engine.tgt_df = pd.DataFrame({'id': [1, 2, 3], 'amount': pd.array([big, big + 1, None], dtype='Int64')})
+
+        engine.compare()
+        result = engine.compare_result
+
+        assert result['diff_cnt'] == 1
+        assert result['diff_records']['mismatch'] == [{'id': 2}]
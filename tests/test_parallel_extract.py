@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按主键区间多会话并行读取测试用例
+"""
+import re
+import threading
+import time
+import pytest
+import pandas as pd
+from unittest.mock import Mock, patch
+from core.compare_engine.pandas_engine import PandasCompareEngine
+from core.compare_engine.streaming_engine import StreamingCompareEngine
+from utils.db_connection_pool import PooledAdapter, get_pooled_connection, get_pool_manager
+
+
+def _read_ordered(engine, slots, *readers):
+    """在限定服务器读取名额下逐个消费有序读取结果（连接池返回模拟会话）"""
+    with patch('utils.db_connection_pool.get_pooled_connection', return_value=Mock()), \
+            patch('utils.db_connection_pool.return_pooled_connection'), \
+            patch('utils.db_connection_pool.get_host_extract_slots', return_value=threading.BoundedSemaphore(slots)):
+        return [list(reader()) for reader in readers]
+
+
+class _BlockingPooledDB:
+    """模拟DBUtils连接池（blocking=True）：连接全部借出时connection()一直等待，连接close后放回"""
+
+    def __init__(self, creator, maxconnections, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconnections)
+
+    def connection(self):
+        self._slots.acquire()
+        return Mock(close=Mock(side_effect=self._slots.release))
+
+
+@pytest.fixture
+def blocking_pool():
+    """真实连接池（底层为_BlockingPooledDB，每个连接池5个连接），用后清空连接池"""
+    with patch('utils.db_connection_pool.PooledDB', _BlockingPooledDB):
+        yield
+    get_pool_manager().close_all()
+
+
+class TestPkRangeSplit:
+    """主键区间切分测试"""
+
+    def test_split_ranges_by_exact_count(self, build_engine, table_adapter):
+        """测试按过滤后的精确记录数切分主键区间，联合主键不切分"""
+        engine = build_engine(PandasCompareEngine, src_adapter=table_adapter([{'id': i} for i in range(1, 101)]),
+                              records_per_thread=25)
+
+        assert engine._pk_split_ranges('src', '') == [(1, 26), (26, 51), (51, 76), (76, 101)]
+        # 过滤后只剩20条，不超过records_per_thread时不切分
+        assert engine._pk_split_ranges('src', 'id > 80') is None
+
+        engine._src_pk_cache = ['id', 'seq']
+        assert engine._pk_split_ranges('src', '') is None
+
+
+class TestParallelPkRangeExtraction:
+    """按主键区间并行读取测试"""
+
+    def test_pandas_reassembles_ranges_in_pk_order(self, build_engine, table_adapter, pooled_sessions):
+        """测试Pandas按主键区间并行读取，先完成的后续区间不打乱主键顺序，每个会话用后归还"""
+        rows = [{'id': i, 'update_time': None} for i in range(1, 41)]
+        adapter = table_adapter(rows)
+        get_conn, return_conn = pooled_sessions
+        get_conn.return_value = table_adapter(rows, delays={1: 0.2})
+
+        engine = build_engine(PandasCompareEngine, src_adapter=adapter, records_per_thread=10,
+                              parallel_extract_sessions=3, chunk_size_for_data_sync=4)
+        engine.load_data()
+
+        assert engine.src_df['id'].tolist() == list(range(1, 41))
+        # 每端4个区间各使用一个会话
+        assert get_conn.call_count == 8 and return_conn.call_count == 8
+        adapter.stream_data.assert_not_called()
+
+    def test_streaming_merges_parallel_ranges(self, build_engine, table_adapter, pooled_sessions):
+        """测试流式引擎按主键区间并行读取后归并比对结果不变"""
+        src_rows = [{'id': i, 'age': i} for i in range(0, 30)]
+        tgt_rows = [{'id': i, 'age': i + (1 if i == 17 else 0)} for i in range(0, 30) if i != 4]
+        sessions = {1: table_adapter(src_rows, delays={0: 0.1}), 3306: table_adapter(tgt_rows)}
+        # 以端口区分两端的会话
+        pooled_sessions[0].side_effect = lambda config, **kwargs: sessions[config['port']]
+
+        engine = build_engine(StreamingCompareEngine, metadata=[{'name': 'id', 'type': 'int'},
+                                                                {'name': 'age', 'type': 'int'}],
+                              src_adapter=table_adapter(src_rows), tgt_adapter=table_adapter(tgt_rows),
+                              records_per_thread=8, update_time_str='', chunk_size_for_data_sync=3, src_port=1)
+        engine.load_data()
+        engine.compare()
+
+        result = engine.compare_result
+        assert result['src_cnt'] == 30 and result['tgt_cnt'] == 29
+        assert [r['id'] for r in result['diff_records']['src_only']] == [4]
+        assert [r['id'] for r in result['diff_records']['mismatch']] == [17]
+        engine.src_adapter.query_data_keyset.assert_not_called()
+
+    def test_ordered_buffering_bounded_while_head_is_slow(self, build_engine):
+        """测试有序读取时前面的任务较慢，后面的任务最多预读有界的块数"""
+        engine = build_engine(PandasCompareEngine)
+        produced = [0] * 4
+        produced_when_first_read = []
+
+        def fetch(session, task):
+            for seq in range(20):
+                if task == 0 and seq == 0:
+                    time.sleep(0.3)
+                produced[task] += 1
+                yield pd.DataFrame({'task': [task], 'seq': [seq]})
+
+        def read():
+            for frame in engine._iter_parallel_frames('src', [0, 1, 2, 3], fetch, 4, ordered=True):
+                if not produced_when_first_read:
+                    produced_when_first_read.extend(produced)
+                yield frame
+
+        frames, = _read_ordered(engine, 8, read)
+
+        assert [(f['task'][0], f['seq'][0]) for f in frames] == [(t, q) for t in range(4) for q in range(20)]
+        # 任务0较慢时其余任务只预读队列容量 + 1（阻塞在入队的一块），而不是读完整个区间
+        limit = engine._ORDERED_QUEUE_CHUNKS + 1
+        assert all(count <= limit for count in produced_when_first_read[1:])
+
+    def test_ordered_blocked_tasks_yield_host_slots(self, build_engine):
+        """测试两端交替读取且服务器读取名额不足时，队列已满的会话让出名额，不会互相等待"""
+        engine = build_engine(PandasCompareEngine)
+
+        def fetch(session, task):
+            for seq in range(10):
+                yield pd.DataFrame({'task': [task], 'seq': [seq]})
+
+        pairs = []
+
+        def merge():
+            # 与流式归并一样交替读取两端，两端共享同一服务器的1个读取名额
+            src = engine._iter_parallel_frames('src', [0, 1, 2], fetch, 3, ordered=True)
+            tgt = engine._iter_parallel_frames('tgt', [0, 1, 2], fetch, 3, ordered=True)
+            pairs.extend(zip(src, tgt))
+            return pairs
+
+        reader = threading.Thread(target=_read_ordered, args=(engine, 1, merge), daemon=True)
+        reader.start()
+        reader.join(timeout=10)
+
+        assert not reader.is_alive(), "两端交替读取时互相等待读取名额"
+        assert len(pairs) == 30
+        assert [(f['task'][0], f['seq'][0]) for f, _ in pairs] == [(t, q) for t in range(3) for q in range(10)]
+
+    def test_shared_pool_merge_does_not_wait_for_connections(self, build_engine, table_adapter, blocking_pool):
+        """测试两端共用一个5连接的连接池（同一数据库的表与备份表）时流式归并不会因会话占满连接池而卡住"""
+        src_rows = [{'id': i, 'age': i} for i in range(0, 80)]
+        tgt_rows = [{'id': i, 'age': i + (1 if i == 17 else 0)} for i in range(0, 80) if i != 4]
+        tables = {'t': table_adapter(src_rows), 't_bak': table_adapter(tgt_rows)}
+
+        def dispatch(method):
+            return lambda session, db_name, table_name, *args: getattr(tables[table_name], method)(
+                db_name, table_name, *args)
+
+        engine = build_engine(StreamingCompareEngine, metadata=[{'name': 'id', 'type': 'int'},
+                                                                {'name': 'age', 'type': 'int'}],
+                              records_per_thread=20, update_time_str='', chunk_size_for_data_sync=3,
+                              src_table_name='t', tgt_table_name='t_bak', parallel_extract_sessions=4)
+        engine.src_adapter = get_pooled_connection(engine._side_db_config('src'))
+        engine.tgt_adapter = get_pooled_connection(engine._side_db_config('tgt'))
+        pool = get_pool_manager().find_pool(engine._side_db_config('src'))
+        assert engine._sides_share_pool() and pool.free_connections() == 3
+        # 空闲3个连接由两端平分
+        assert engine._parallel_extract_sessions('src') == 1
+
+        def query(session, sql, params=None):
+            return tables[re.search(r"FROM \w+\.(\w+)", sql).group(1)].query(sql, params)
+
+        def compare():
+            with patch.object(PooledAdapter, 'query_data_keyset', autospec=True,
+                              side_effect=dispatch('query_data_keyset')), \
+                    patch.object(PooledAdapter, 'query', autospec=True, side_effect=query):
+                engine.load_data()
+                engine.compare()
+
+        worker = threading.Thread(target=compare, daemon=True)
+        worker.start()
+        worker.join(timeout=10)
+
+        assert not worker.is_alive(), "两端共用连接池时归并卡住"
+        result = engine.compare_result
+        assert [r['id'] for r in result['diff_records']['src_only']] == [4]
+        assert [r['id'] for r in result['diff_records']['mismatch']] == [17]
+        assert pool.free_connections() == 3
+
+    def test_early_stop_while_pool_exhausted(self, build_engine, blocking_pool):
+        """测试连接池已满、会话在等待连接时调用方提前结束，等待的会话及时退出并不再占用连接"""
+        engine = build_engine(PandasCompareEngine)
+        side_config = engine._side_db_config('src')
+        held = [get_pooled_connection(side_config) for _ in range(4)]
+        pool = get_pool_manager().find_pool(side_config)
+
+        def fetch(session, task):
+            yield pd.DataFrame({'task': [task]})
+
+        def read_first_then_stop():
+            frames = engine._iter_parallel_frames('src', [0, 1], fetch, 2, ordered=True)
+            first = next(frames)
+            # 任务1等待连接池中的连接时结束读取
+            frames.close()
+            return first
+
+        reader = threading.Thread(target=read_first_then_stop, daemon=True)
+        with patch('utils.db_connection_pool.get_host_extract_slots', return_value=threading.BoundedSemaphore(8)):
+            reader.start()
+            reader.join(timeout=10)
+
+        assert not reader.is_alive(), "提前结束时等待连接的会话未退出"
+        assert pool.free_connections() == 1
+        for adapter in held:
+            adapter.close()
+        assert pool.free_connections() == 5
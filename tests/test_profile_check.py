@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+聚合概要预检查测试用例
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import Mock, patch
+from core.compare_engine.pandas_engine import PandasCompareEngine
+
+METADATA = [{'name': 'id', 'type': 'bigint'}, {'name': 'update_time', 'type': 'datetime'},
+            {'name': 'name', 'type': 'varchar'}]
+
+
+@pytest.fixture
+def profile_engine(build_engine):
+    """两端概要查询分别返回src_rows、tgt_rows的Pandas引擎"""
+    def factory(src_rows, tgt_rows, metadata=METADATA, **config):
+        return build_engine(PandasCompareEngine, metadata=metadata, tgt_metadata=metadata,
+                            src_adapter=Mock(query=Mock(return_value=src_rows)),
+                            tgt_adapter=Mock(query=Mock(return_value=tgt_rows)), profile_precheck=True, **config)
+
+    return factory
+
+
+class TestProfilePrecheck:
+    """聚合概要预检查测试"""
+
+    def test_profile_query_aggregates(self):
+        """测试数值字段计算合计和极值、时间字段计算极值，同类型数据库附加行哈希"""
+        from core.compare_engine.profile_check import build_profile_query
+
+        sql = build_profile_query('mysql', 'db.t', {'id': 'numeric', 'update_time': 'datetime', 'name': 'other'},
+                                  "id > 0", with_row_hash=True)
+
+        assert 'SUM(id)' in sql and 'MAX(id)' in sql
+        assert 'MIN(update_time)' in sql and 'SUM(update_time)' not in sql
+        assert 'COUNT(name)' in sql and 'CRC32' in sql
+        assert sql.endswith('WHERE id > 0')
+
+    def test_oracle_profile_row_hash_keeps_time_of_day(self, profile_engine):
+        """测试Oracle同库概要的行哈希按元数据类型格式化DATE字段，只改时间部分的记录不会被判为一致"""
+        metadata = [{'name': 'id', 'type': 'NUMBER'}, {'name': 'update_time', 'type': 'DATE'}]
+        engine = profile_engine([], [], metadata=metadata, src_db_type='oracle', tgt_db_type='oracle')
+        engine._compare_columns_cache = {'key_columns': ['id'], 'update_column': ['update_time'], 'extra_columns': []}
+
+        engine.profile_precheck()
+
+        sql = engine.src_adapter.query.call_args[0][0]
+        assert "TO_CHAR(update_time, 'YYYY-MM-DD HH24:MI:SS')" in sql
+
+    def test_matching_profile_skips_load(self, profile_engine):
+        """测试两端概要一致（驱动返回类型不同）时直接记录比对成功"""
+        from decimal import Decimal
+
+        engine = profile_engine(
+            [(100, 100, Decimal('5050'), 1, 100, datetime(2026, 1, 1), datetime(2026, 1, 2), 90, Decimal('123'))],
+            [(100, 100, 5050, 1, 100, datetime(2026, 1, 1), datetime(2026, 1, 2), 90, 123)],
+        )
+        engine.config['update_time_str'] = 'update_time'
+
+        with patch('config.settings.EXTRA_COLUMN_FLAG', True), \
+                patch('config.settings.SUPPORT_COLUMN_TYPE', {'mysql': {'varchar'}}), \
+                patch.object(engine, 'init_adapters'), patch.object(engine, 'load_data') as mock_load, \
+                patch.object(engine, 'generate_report'):
+            result = engine.run()
+
+        mock_load.assert_not_called()
+        assert result['profile_precheck'] == 'match'
+        assert result['src_cnt'] == 100 and result['diff_cnt'] == 0
+
+    def test_different_profile_falls_through(self, profile_engine):
+        """测试概要不一致时继续完整比对"""
+        engine = profile_engine([(100, 100, 5050, 1, 100, None, None, 7)],
+                                [(100, 100, 5051, 1, 100, None, None, 7)])
+
+        assert engine.profile_precheck() is False
+        assert engine.compare_result['profile_precheck'] == 'differ'
+
+    def test_cross_database_text_columns_skip(self, profile_engine):
+        """测试不同类型数据库且存在文本字段时不做预检查"""
+        engine = profile_engine([], [], tgt_db_type='postgresql')
+
+        with patch('config.settings.EXTRA_COLUMN_FLAG', True), \
+                patch('config.settings.SUPPORT_COLUMN_TYPE', {'mysql': {'varchar'}}):
+            assert engine.profile_precheck() is False
+
+        engine.src_adapter.query.assert_not_called()
+        assert engine.compare_result['profile_precheck'] == 'skip'
+
+    def test_cross_database_profile_off_by_default(self, profile_engine):
+        """测试不同类型数据库（概要不含行哈希）默认不做预检查，即使只有数值和时间字段"""
+        engine = profile_engine([], [], metadata=METADATA[:2], tgt_db_type='oracle')
+
+        assert engine.profile_precheck() is False
+        engine.src_adapter.query.assert_not_called()
+        assert engine.compare_result['profile_precheck'] == 'skip'
+
+    def test_cross_database_profile_match_reported_separately(self, profile_engine):
+        """测试开启profile_precheck_cross_db后概要一致记为profile_match，不记为逐行校验一致"""
+        row = [(100, 100, 5050, 1, 100, 90, datetime(2026, 1, 1), datetime(2026, 1, 2))]
+        engine = profile_engine(row, row, metadata=METADATA[:2], tgt_db_type='oracle', profile_precheck_cross_db=True)
+
+        assert engine.profile_precheck() is True
+        assert engine.compare_result['profile_precheck'] == 'profile_match'
+        assert '未逐行校验' in engine.compare_result['compare_msg']
+        assert '不含行哈希' in engine.compare_result['compare_report']
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+主键哈希抽样比对测试用例
+"""
+import pytest
+
+class TestSamplingCompare:
+    """主键哈希抽样比对测试"""
+
+    def test_bucket_rotates_by_day(self):
+        """测试未指定桶号时按日期轮转，桶数不大于1时不抽样"""
+        from datetime import date
+        from core.compare_engine.sampling import get_sample_settings
+
+        assert get_sample_settings({'sample_buckets': 7}) == (7, date.today().toordinal() % 7)
+        assert get_sample_settings({'sample_buckets': 7, 'sample_bucket': 9}) == (7, 2)
+        assert get_sample_settings({'sample_buckets': 1}) is None
+
+    def test_where_clause_per_side_dialect(self, sample_incremental_config):
+        """测试抽样条件与增量条件组合，并按各端数据库语法生成"""
+        from core.compare_engine.pandas_engine import PandasCompareEngine
+
+        engine = PandasCompareEngine({**sample_incremental_config, 'tgt_db_type': 'sqlserver',
+                                      'sample_buckets': 10, 'sample_bucket': 3})
+        engine._src_pk_cache = ['id']
+        engine._src_metadata_cache = [{'name': 'id', 'type': 'bigint'}]
+        engine._tgt_metadata_cache = [{'name': 'id', 'type': 'bigint'}]
+
+        src_where = engine.get_where_clause('src')
+        tgt_where = engine.get_where_clause('tgt')
+
+        assert src_where.startswith('(update_time >=')
+        assert src_where.endswith('AND MOD(ABS(id), 10) = 3')
+        assert tgt_where.endswith('AND ABS(id) % 10 = 3')
+        assert engine.compare_result['sample_bucket'] == 3
+
+    def test_non_integer_key_uses_hash(self, sample_config):
+        """测试非整数主键按主键文本哈希分桶"""
+        from core.compare_engine.pandas_engine import PandasCompareEngine
+
+        engine = PandasCompareEngine({**sample_config, 'sample_buckets': 4, 'sample_bucket': 0})
+        engine._src_pk_cache = ['order_no', 'line_no']
+        engine._src_metadata_cache = [{'name': 'order_no', 'type': 'varchar'}]
+
+        where_clause = engine.get_where_clause()
+
+        assert "MD5(CONCAT_WS('|', CAST(order_no AS CHAR), CAST(line_no AS CHAR)))" in where_clause
+        assert where_clause.endswith(', 4) = 0')
+
+    def test_mismatch_rate_estimate(self, sample_config):
+        """测试按样本结果估算不一致率和置信区间"""
+        from core.compare_engine.pandas_engine import PandasCompareEngine
+
+        engine = PandasCompareEngine({**sample_config, 'sample_buckets': 30, 'sample_bucket': 1})
+        engine.compare_result.update({'src_cnt': 1000, 'tgt_cnt': 1000, 'diff_cnt': 10, 'compare_report': 'ok'})
+
+        engine._record_sample_estimate()
+
+        estimate = engine.compare_result['sample_estimate']
+        assert estimate['mismatch_rate'] == pytest.approx(0.01)
+        assert estimate['ci_low'] < 0.01 < estimate['ci_high']
+        assert estimate['estimated_table_diff_cnt'] == 300
+        assert '抽样比对' in engine.compare_result['compare_report']
+
+    def test_zero_diff_interval(self):
+        """测试无差异时置信区间下限为0、上限大于0"""
+        from core.compare_engine.sampling import estimate_mismatch_rate
+
+        estimate = estimate_mismatch_rate(0, 5000, 10)
+
+        assert estimate['ci_low'] == 0.0
+        assert 0 < estimate['ci_high'] < 0.001
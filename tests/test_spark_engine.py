@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spark比对引擎测试用例（pyspark由conftest模拟，只验证引擎自身的逻辑）
+"""
+import os
+import pytest
+import pandas as pd
+from datetime import datetime
+from unittest.mock import Mock, patch, MagicMock
+from core.compare_engine.spark_engine import SparkCompareEngine
+
+
+@pytest.fixture
+def spark_engine(build_engine):
+    """Spark引擎工厂，两端共用一个模拟适配器"""
+    def factory(spark_mode='spark_local', metadata=None, **config):
+        return build_engine(SparkCompareEngine, spark_mode, metadata=metadata, src_adapter=Mock(), **config)
+
+    return factory
+
+
+def _compare_frames(engine, columns, stats):
+    """设置两端模拟的Spark DataFrame，单次聚合返回stats，返回连接后的DataFrame"""
+    engine.src_spark_df = MagicMock()
+    engine.tgt_spark_df = MagicMock()
+    engine.src_spark_df.columns = list(columns)
+    engine.tgt_spark_df.columns = list(columns)
+    joined_df = engine.src_spark_df.withColumn.return_value.alias.return_value.join.return_value
+    joined_df.agg.return_value.collect.return_value = [stats]
+    return joined_df
+
+
+class TestSparkPartitionedRead:
+    """Spark JDBC分区并行读取测试"""
+
+    @pytest.fixture
+    def partition_engine(self, spark_engine):
+        def factory(spark_mode='spark_cluster', pk_type='bigint', stats=None, bounds=None):
+            engine = spark_engine(spark_mode, metadata=[{'name': 'id', 'type': pk_type}, {'name': 'age', 'type': 'int'}])
+            engine.src_adapter.get_table_stats.return_value = stats
+            engine.src_adapter.query.return_value = [bounds] if bounds is not None else []
+            return engine
+
+        return factory
+
+    def test_partition_options_from_stats_and_bounds(self, partition_engine):
+        """测试按统计信息估算记录数和主键MIN/MAX生成分区参数，不执行COUNT(*)"""
+        engine = partition_engine(stats={'row_count': 2000000, 'avg_row_bytes': 100},
+                                  bounds={'min_value': 1, 'max_value': 2000000})
+
+        options = engine._get_partition_options('src', "age > 1")
+
+        assert options == {'partitionColumn': 'id', 'lowerBound': '1', 'upperBound': '2000000',
+                           'numPartitions': '4', 'fetchsize': '10000'}
+        assert 'WHERE age > 1' in engine.src_adapter.query.call_args[0][0]
+        assert engine.src_adapter.query.call_count == 1
+        engine.src_adapter.get_table_count.assert_not_called()
+
+    def test_partition_count_capped_by_mode(self, partition_engine):
+        """测试分区数不超过模式配置的上限"""
+        engine = partition_engine('spark_local', stats={'row_count': 100000000, 'avg_row_bytes': 100},
+                                  bounds=(0, 100000000))
+
+        assert engine._get_partition_options('src', "")['numPartitions'] == '8'
+
+    def test_small_table_single_partition(self, partition_engine):
+        """测试小表不分区"""
+        engine = partition_engine(stats={'row_count': 1000, 'avg_row_bytes': 100}, bounds=(1, 5000000))
+
+        options = engine._get_partition_options('src', "")
+
+        assert 'partitionColumn' not in options
+        engine.src_adapter.get_table_count.assert_not_called()
+
+    def test_partition_count_without_stats_uses_key_span(self, partition_engine):
+        """测试无统计信息时按主键取值跨度估算记录数（跨度是记录数上限）"""
+        engine = partition_engine(bounds=(1, 1000000))
+
+        assert engine._get_partition_options('src', "")['numPartitions'] == '2'
+        engine.src_adapter.get_table_count.assert_not_called()
+
+    def test_stale_stats_capped_by_key_span(self, partition_engine):
+        """测试统计信息偏大（过期）时分区数不超过主键跨度对应的分区数"""
+        engine = partition_engine(stats={'row_count': 50000000, 'avg_row_bytes': 100}, bounds=(1, 400000))
+
+        assert 'partitionColumn' not in engine._get_partition_options('src', "")
+
+    def test_date_split_column_uses_iso_bounds(self, partition_engine):
+        """测试配置的拆分字段为日期时间类型时边界按ISO文本传入，不按数值取整"""
+        engine = partition_engine(stats={'row_count': 2000000, 'avg_row_bytes': 100},
+                                  bounds=(datetime(2026, 1, 1), datetime(2026, 6, 30, 12, 30)))
+        engine.config['split_column'] = 'created_at'
+        engine._src_metadata_cache.append({'name': 'created_at', 'type': 'datetime'})
+
+        options = engine._get_partition_options('src', "")
+
+        assert options['partitionColumn'] == 'created_at'
+        assert options['lowerBound'] == '2026-01-01 00:00:00'
+        assert options['upperBound'] == '2026-06-30 12:30:00'
+        assert options['numPartitions'] == '4'
+
+    def test_string_split_column_single_partition(self, partition_engine):
+        """测试配置的拆分字段为字符串类型时不分区，也不查询取值范围"""
+        engine = partition_engine(stats={'row_count': 2000000, 'avg_row_bytes': 100})
+        engine.config['split_column'] = 'name'
+        engine._src_metadata_cache.append({'name': 'name', 'type': 'varchar(64)'})
+
+        assert engine._get_partition_options('src', "") == {'fetchsize': '10000'}
+        engine.src_adapter.query.assert_not_called()
+
+    def test_non_numeric_pk_without_split_column(self, partition_engine):
+        """测试非数值主键且未配置拆分字段时不分区"""
+        engine = partition_engine(pk_type='varchar(64)')
+
+        assert engine._get_partition_options('src', "") == {'fetchsize': '10000'}
+
+    def test_configured_split_column(self, partition_engine):
+        """测试使用任务配置的拆分字段（非主键列的取值跨度不限制记录数估算）"""
+        engine = partition_engine(pk_type='varchar(64)', stats={'row_count': 1000000, 'avg_row_bytes': 100},
+                                  bounds={'min_value': 0, 'max_value': 99.5})
+        engine.config['split_column'] = 'age'
+
+        options = engine._get_partition_options('src', "")
+
+        assert options['partitionColumn'] == 'age'
+        assert options['upperBound'] == '100'
+        assert options['numPartitions'] == '2'
+
+
+class TestSparkPushdownQuery:
+    """Spark JDBC子查询下推测试"""
+
+    @pytest.fixture
+    def engine(self, spark_engine):
+        engine = spark_engine(metadata=[{'name': 'id', 'type': 'varchar(32)'}])
+        engine.spark = MagicMock()
+        return engine
+
+    def test_build_pushdown_query(self, engine):
+        """测试子查询包含比对字段和WHERE条件"""
+        query = engine._build_pushdown_query('tgt', ['id', 'age'], "update_time >= '2026-01-01'")
+
+        assert query == ("(SELECT id, age FROM test_db.target_table "
+                         "WHERE update_time >= '2026-01-01') tgt_pushdown")
+
+    def test_load_uses_pushdown_query(self, engine):
+        """测试加载时dbtable使用子查询且不再在Spark端过滤"""
+        reader = engine.spark.read.format.return_value
+        loaded_df = reader.options.return_value.load.return_value
+
+        df = engine._load_spark_data('src', ['id', 'age'], "age > 1")
+
+        options = reader.options.call_args.kwargs
+        assert options['dbtable'] == "(SELECT id, age FROM test_db.source_table WHERE age > 1) src_pushdown"
+        assert df is loaded_df
+        loaded_df.filter.assert_not_called()
+
+    def test_split_column_added_to_projection(self, engine):
+        """测试分区字段不在比对字段中时加入子查询并在加载后删除"""
+        reader = engine.spark.read.format.return_value
+
+        with patch.object(engine, '_get_partition_options', return_value={'partitionColumn': 'seq_no'}):
+            engine._load_spark_data('src', ['id', 'age'], "")
+
+        options = reader.options.call_args.kwargs
+        assert options['dbtable'] == "(SELECT id, age, seq_no FROM test_db.source_table) src_pushdown"
+        reader.options.return_value.load.return_value.select.assert_called_once()
+
+
+class TestSparkSinglePassCompare:
+    """Spark单次聚合比对测试"""
+
+    def test_counts_from_single_aggregation(self, spark_engine):
+        """测试记录数和差异数由一次聚合得到，不对输入单独count"""
+        engine = spark_engine(metadata=[{'name': 'id', 'type': 'int'}, {'name': 'age', 'type': 'int'}])
+        joined_df = _compare_frames(engine, ['id', 'age'], {'src_cnt': 100, 'tgt_cnt': 98, 'mismatch_cnt': 3,
+                                                            'src_only_cnt': 2, 'tgt_only_cnt': 0})
+
+        with patch.object(engine, '_write_diff_records', return_value=None):
+            engine.compare()
+
+        assert engine.compare_result['src_cnt'] == 100
+        assert engine.compare_result['tgt_cnt'] == 98
+        assert engine.compare_result['diff_cnt'] == 5
+        assert engine.compare_result['matching_rate'] == pytest.approx(0.95)
+        joined_df.agg.assert_called_once()
+        engine.src_spark_df.count.assert_not_called()
+        engine.tgt_spark_df.count.assert_not_called()
+
+    def test_both_sides_empty(self, spark_engine):
+        """测试两端均无数据"""
+        engine = spark_engine()
+        _compare_frames(engine, ['id', 'age'], {'src_cnt': 0, 'tgt_cnt': 0, 'mismatch_cnt': 0,
+                                                'src_only_cnt': 0, 'tgt_only_cnt': 0})
+
+        engine.compare()
+
+        assert engine.compare_result['diff_cnt'] == 0
+        assert engine.compare_result['matching_rate'] == 1.0
+
+    def test_load_data_persists_inputs(self, spark_engine):
+        """测试加载后输入数据被持久化且不触发计数"""
+        engine = spark_engine(spark_diff_records_dir='/tmp')
+        loaded_df = MagicMock()
+
+        with patch.object(engine, 'init_spark'), \
+                patch.object(engine, '_load_spark_data', return_value=loaded_df) as mock_load:
+            engine.load_data()
+
+        assert mock_load.call_count == 2
+        assert loaded_df.persist.call_count == 2
+        assert engine.src_spark_df is loaded_df.persist.return_value
+        loaded_df.count.assert_not_called()
+
+
+class TestSparkDiffRecords:
+    """Spark差异数据Parquet输出测试"""
+
+    @staticmethod
+    def _write_partition(output_dir, diff_type, rows):
+        partition_dir = os.path.join(output_dir, f'diff_type={diff_type}')
+        os.makedirs(partition_dir)
+        pd.DataFrame(rows).to_parquet(os.path.join(partition_dir, 'part-00000.parquet'), index=False)
+
+    def test_load_diff_records_structure(self, tmp_path):
+        """测试Parquet差异数据按diff_records约定结构读取"""
+        t1, t2 = datetime(2026, 1, 2), datetime(2026, 1, 1)
+        self._write_partition(tmp_path, 'mismatch', [{'id': 1, 'update_time__src': t1, 'update_time__tgt': t2}])
+        self._write_partition(tmp_path, 'src_only', [{'id': 2, 'update_time__src': t1, 'update_time__tgt': None},
+                                                     {'id': 3, 'update_time__src': t2, 'update_time__tgt': None}])
+
+        diff_records = SparkCompareEngine._load_diff_records(str(tmp_path), ['id'], ['update_time'])
+
+        assert list(diff_records['mismatch']) == [{'id': 1}]
+        assert diff_records['mismatch_full'][0] == {
+            'pk': {'id': 1},
+            'src_record': {'id': 1, 'update_time': t1},
+            'tgt_record': {'id': 1, 'update_time': t2},
+            'update_column': ['update_time']
+        }
+        assert [r['id'] for r in diff_records['src_only']] == [2, 3]
+        assert diff_records['src_only'][1]['update_time'] == t2
+        # 没有目标端独有记录时对应分区目录不存在
+        assert len(diff_records['tgt_only']) == 0
+        assert list(diff_records['tgt_only']) == []
+
+    def test_compare_writes_diff_records(self, spark_engine, tmp_path):
+        """测试存在差异时按运行日期写出Parquet、读取为diff_records，修复后删除"""
+        from urllib.parse import urlparse
+        from utils.diff_utils import ParquetRecords, remove_diff_records
+
+        engine = spark_engine(spark_diff_records_dir=str(tmp_path))
+        joined_df = _compare_frames(engine, ['id', 'update_time'], {'src_cnt': 10, 'tgt_cnt': 10, 'mismatch_cnt': 1,
+                                                                    'src_only_cnt': 0, 'tgt_only_cnt': 0})
+        writer = joined_df.select.return_value.filter.return_value.write.mode.return_value
+
+        def write_parquet(uri):
+            # 模拟executor写出按diff_type分区的Parquet
+            assert uri.startswith('file://')
+            self._write_partition(urlparse(uri).path, 'mismatch',
+                                  [{'id': 7, 'update_time__src': None, 'update_time__tgt': None}])
+        writer.partitionBy.return_value.parquet.side_effect = write_parquet
+
+        engine.compare()
+
+        writer.partitionBy.assert_called_once_with('diff_type')
+        output_dir = engine.compare_result['diff_records_dir']
+        assert os.path.dirname(output_dir) == str(tmp_path / datetime.now().strftime('%Y%m%d'))
+        diff_records = engine.compare_result['diff_records']
+        assert isinstance(diff_records['mismatch_full'], ParquetRecords)
+        assert list(diff_records['mismatch']) == [{'id': 7}]
+
+        remove_diff_records(engine.compare_result)
+        assert not os.path.exists(output_dir)
+        assert list(diff_records['mismatch']) == []
+
+    def test_cluster_mode_requires_shared_diff_dir(self, spark_engine):
+        """测试集群模式未配置共享差异数据目录时在抽取前拒绝运行"""
+        engine = spark_engine('spark_cluster')
+        engine.init_spark = Mock()
+
+        with patch('config.settings.SPARK_CLUSTER_DIFF_RECORDS_DIR', ''):
+            with pytest.raises(ValueError, match='共享'):
+                engine.load_data()
+        engine.init_spark.assert_not_called()
+
+    def test_cluster_mode_writes_shared_uri(self, spark_engine):
+        """测试集群模式差异数据原样写到共享文件系统URI"""
+        engine = spark_engine('spark_cluster')
+        diff_df = MagicMock()
+
+        with patch('config.settings.SPARK_CLUSTER_DIFF_RECORDS_DIR', 'hdfs://ns/tmp/dcp-diff/'):
+            engine._write_diff_records(diff_df, ['id'], [])
+
+        output_uri = diff_df.write.mode.return_value.partitionBy.return_value.parquet.call_args[0][0]
+        assert output_uri.startswith(f"hdfs://ns/tmp/dcp-diff/{datetime.now().strftime('%Y%m%d')}/")
+        assert engine.compare_result['diff_records_dir'] == output_uri
+
+
+class TestSparkRowHashCompare:
+    """Spark行哈希比对测试"""
+
+    @pytest.fixture
+    def engine(self, spark_engine):
+        engine = spark_engine(spark_row_hash_compare=True)
+        engine.src_spark_df = MagicMock()
+        engine.tgt_spark_df = MagicMock()
+        engine.src_spark_df.columns = ['id', 'update_time', 'amount']
+        engine.tgt_spark_df.columns = ['id', 'update_time', 'amount']
+        engine.src_spark_df.dtypes = [('id', 'bigint'), ('update_time', 'timestamp'), ('amount', 'decimal(10,2)')]
+        engine.tgt_spark_df.dtypes = [('id', 'bigint'), ('update_time', 'timestamp'), ('amount', 'double')]
+        return engine
+
+    @staticmethod
+    def _set_stats(engine, stats):
+        src_narrow = engine.src_spark_df.select.return_value
+        joined_df = src_narrow.withColumn.return_value.alias.return_value.join.return_value
+        joined_df.agg.return_value.collect.return_value = [stats]
+
+    def test_join_narrow_hash_frames(self, engine):
+        """测试两端先投影为主键和行哈希再连接，主键不参与哈希"""
+        self._set_stats(engine, {'src_cnt': 10, 'tgt_cnt': 10, 'mismatch_cnt': 0, 'src_only_cnt': 0,
+                                 'tgt_only_cnt': 0})
+
+        with patch('core.compare_engine.spark_engine.xxhash64') as mock_hash:
+            engine.compare()
+
+        assert mock_hash.call_count == 2
+        assert len(mock_hash.call_args_list[0][0]) == 2
+        engine.src_spark_df.withColumn.assert_not_called()
+        assert engine.compare_result['diff_cnt'] == 0
+
+    def test_numeric_columns_cast_to_double(self, engine):
+        """测试两端数值类型不同的列统一为double后计算哈希"""
+        with patch('core.compare_engine.spark_engine.col') as mock_col:
+            engine._row_hash_frames(['id'], ['update_time', 'amount'])
+
+        cast_types = [c[0][0] for c in mock_col.return_value.cast.call_args_list]
+        assert cast_types.count('double') == 2
+
+    def test_diff_rows_fetched_by_key(self, engine, tmp_path):
+        """测试存在差异时按差异主键半连接取回更新时间字段"""
+        self._set_stats(engine, {'src_cnt': 10, 'tgt_cnt': 9, 'mismatch_cnt': 1, 'src_only_cnt': 1,
+                                 'tgt_only_cnt': 0})
+        engine.config['spark_diff_records_dir'] = str(tmp_path)
+
+        engine.compare()
+
+        semi_join = engine.src_spark_df.select.return_value.join.call_args
+        assert semi_join.kwargs['how'] == 'left_semi'
+        assert engine.compare_result['diff_cnt'] == 2
+        assert 'diff_records' in engine.compare_result
+
+
+class TestSparkSessionManager:
+    """Spark会话管理器测试"""
+
+    @pytest.fixture
+    def manager(self):
+        from utils.spark_session_manager import get_spark_session_manager
+
+        manager = get_spark_session_manager()
+        manager.stop()
+        with patch('pyspark.sql.SparkSession') as mock_spark_session, \
+                patch('utils.spark_session_manager.atexit.register') as mock_register:
+            yield manager, mock_spark_session, mock_register
+        manager.stop()
+
+    def test_session_created_once(self, manager):
+        """测试多次获取只创建一次会话并注册退出时关闭"""
+        manager, mock_spark_session, mock_register = manager
+        builder = mock_spark_session.builder.appName.return_value
+
+        first = manager.get_session('spark_local')
+        second = manager.get_session('spark_local')
+
+        assert first is second
+        builder.config.assert_called_once_with("spark.scheduler.mode", "FAIR")
+        mock_register.assert_called_once_with(manager.stop)
+
+    def test_mode_mismatch_raises(self, manager):
+        """测试已有本地会话时集群任务报错，不静默改在本地会话上运行"""
+        manager, _, _ = manager
+        session = manager.get_session('spark_local')
+
+        with pytest.raises(RuntimeError, match='spark_cluster'):
+            manager.get_session('spark_cluster')
+
+        assert manager.get_session('spark_local') is session
+
+    def test_scheduler_pool_and_stop(self, manager):
+        """测试设置调度池和关闭会话"""
+        manager, _, _ = manager
+        session = manager.get_session('spark_cluster')
+
+        manager.set_scheduler_pool('test_db.orders')
+        session.sparkContext.setLocalProperty.assert_called_with("spark.scheduler.pool", 'test_db.orders')
+
+        manager.stop()
+        session.stop.assert_called_once()
+        assert manager._session is None
+
+    def test_engine_run_keeps_shared_session(self, manager, sample_config):
+        """测试比对引擎结束后不关闭共享会话，仅恢复默认调度池"""
+        from core.compare_engine.base_engine import BaseCompareEngine
+
+        manager, _, _ = manager
+        engine = SparkCompareEngine(sample_config, 'spark_local')
+        engine.init_spark()
+        session = engine.spark
+
+        with patch.object(BaseCompareEngine, 'run', return_value={}):
+            engine.run()
+
+        session.stop.assert_not_called()
+        session.sparkContext.setLocalProperty.assert_called_with("spark.scheduler.pool", None)
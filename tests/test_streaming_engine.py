@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式归并比对引擎测试用例
+"""
+import pytest
+from unittest.mock import patch
+from core.compare_engine.base_engine import get_compare_engine
+from core.compare_engine.streaming_engine import StreamingCompareEngine
+
+METADATA = [{'name': 'id', 'type': 'int'}, {'name': 'age', 'type': 'int'}]
+
+
+@pytest.fixture
+def streaming_engine(build_engine, table_adapter):
+    """按内存数据构造两端的流式引擎（分块大小3，不比对更新时间字段）"""
+    def factory(src_rows, tgt_rows, **config):
+        return build_engine(StreamingCompareEngine, metadata=METADATA, src_adapter=table_adapter(src_rows),
+                            tgt_adapter=table_adapter(tgt_rows),
+                            **{'chunk_size_for_data_sync': 3, 'update_time_str': '', **config})
+
+    return factory
+
+
+class TestStreamingCompareEngine:
+    """流式归并比对引擎测试"""
+
+    def test_merge_classifies_differences(self, streaming_engine):
+        """测试分块归并正确识别三类差异"""
+        src_rows = [{'id': i, 'age': i} for i in range(0, 20)]
+        tgt_rows = [{'id': i, 'age': i} for i in range(5, 25) if i != 12]
+        tgt_rows[0]['age'] = -1  # id=5 值不一致
+
+        engine = streaming_engine(src_rows, tgt_rows)
+        engine.load_data()
+        engine.compare()
+
+        diff_records = engine.compare_result['diff_records']
+        assert engine.compare_result['src_cnt'] == 20
+        assert engine.compare_result['tgt_cnt'] == 19
+        assert diff_records['mismatch'] == [{'id': 5}]
+        assert diff_records['mismatch_full'][0]['tgt_record']['age'] == -1
+        assert sorted(r['id'] for r in diff_records['src_only']) == [0, 1, 2, 3, 4, 12]
+        assert sorted(r['id'] for r in diff_records['tgt_only']) == [20, 21, 22, 23, 24]
+        assert engine.compare_result['diff_cnt'] == 12
+
+    def test_identical_tables(self, streaming_engine):
+        """测试两端一致"""
+        rows = [{'id': i, 'age': i % 3} for i in range(10)]
+        engine = streaming_engine(rows, rows)
+        engine.load_data()
+        engine.compare()
+
+        assert engine.compare_result['diff_cnt'] == 0
+        assert engine.compare_result['matching_rate'] == 1.0
+
+    def test_resume_from_settled_key(self, streaming_engine, tmp_path):
+        """测试中断后从断点主键之后继续读取并合并部分结果"""
+        from utils.checkpoint_store import open_checkpoint
+
+        src_rows = [{'id': i, 'age': i} for i in range(0, 30)]
+        tgt_rows = [{'id': i, 'age': i} for i in range(0, 30) if i not in (4, 25)]
+        checkpoint_config = {'checkpoint_dir': str(tmp_path), 'checkpoint_interval_seconds': 0}
+
+        engine = streaming_engine(src_rows, tgt_rows, **checkpoint_config)
+        engine._checkpoint = open_checkpoint(engine.config, {'engine': 'StreamingCompareEngine'})
+        original = engine.tgt_adapter.query_data_keyset.side_effect
+
+        def flaky_keyset(*args):
+            if args[4] is not None and args[4][0] >= 15:
+                raise ConnectionError("网络中断")
+            return original(*args)
+
+        engine.tgt_adapter.query_data_keyset.side_effect = flaky_keyset
+        engine.load_data()
+        with pytest.raises(ConnectionError):
+            engine.compare()
+
+        resumed = streaming_engine(src_rows, tgt_rows, resume=True, **checkpoint_config)
+        resumed._checkpoint = open_checkpoint(resumed.config, {'engine': 'StreamingCompareEngine'})
+        resumed.load_data()
+        resumed.compare()
+
+        result = resumed.compare_result
+        start_key = result['resumed_from_key']
+        assert start_key is not None
+        # 断点之前的记录不再读取
+        assert resumed.src_adapter.query_data_keyset.call_args_list[0].args[4] == start_key
+        assert result['src_cnt'] == 30 and result['tgt_cnt'] == 28
+        assert sorted(r['id'] for r in result['diff_records']['src_only']) == [4, 25]
+
+    def test_force_streaming_engine(self, sample_config):
+        """测试强制使用流式归并引擎，不查询数据量"""
+        with patch('config.settings.ENGINE_STRATEGY', 'streaming'), \
+                patch('utils.db_connection_pool.get_pooled_connection') as get_conn:
+            engine = get_compare_engine(sample_config)
+
+        assert type(engine) is StreamingCompareEngine
+        get_conn.assert_not_called()
@@ -4,6 +4,7 @@
 工具类测试用例
 """
 import pytest
+import pandas as pd
 from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 from utils.db_utils import write_task_log, get_table_exists, get_table_writable
@@ -206,7 +207,7 @@ class TestDataTypeUtils:
         df1_unified, df2_unified = unify_data_types(df1, df2)
 
         # 应该保持字符串类型
-        assert df1_unified['name'].dtype == object
+        assert pd.api.types.is_string_dtype(df1_unified['name'])
 
 
 class TestRetryUtils:
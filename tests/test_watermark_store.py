@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量水位线测试用例
+"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+class TestIncrementalWatermark:
+    """增量水位线测试"""
+
+    @pytest.fixture
+    def watermark_config(self, sample_incremental_config, tmp_path):
+        return {**sample_incremental_config,
+                'watermark_state_file': str(tmp_path / 'watermarks.json'),
+                'incremental_safety_lag_seconds': 300}
+
+    def test_first_run_uses_incremental_days(self, watermark_config):
+        """测试无水位线时按incremental_days确定窗口，结束时间减去安全延迟"""
+        from core.compare_engine.pandas_engine import PandasCompareEngine
+
+        engine = PandasCompareEngine(watermark_config)
+        engine.get_where_clause('src')
+        start_time, end_time = engine._incremental_window()
+
+        assert end_time - start_time == timedelta(days=3)
+        assert timedelta(seconds=299) < datetime.now() - end_time < timedelta(seconds=310)
+        assert engine.compare_result['check_range'].startswith(f"[{start_time.strftime('%Y-%m-%d %H:%M:%S')},")
+
+    def test_window_starts_at_watermark(self, watermark_config):
+        """测试有水位线时窗口从水位线开始，两端使用同一窗口"""
+        from core.compare_engine.pandas_engine import PandasCompareEngine
+        from utils.watermark_store import save_watermark
+
+        save_watermark(watermark_config, datetime(2026, 10, 16, 8, 0, 0))
+        engine = PandasCompareEngine({**watermark_config, 'tgt_db_type': 'oracle'})
+
+        src_where = engine.get_where_clause('src')
+        tgt_where = engine.get_where_clause('tgt')
+
+        assert "update_time >= '2026-10-16 08:00:00'" in src_where
+        assert "TO_DATE('2026-10-16 08:00:00', 'YYYY-MM-DD HH24:MI:SS')" in tgt_where
+        assert src_where.split("< '")[1].rstrip("'") in tgt_where
+
+    def test_watermark_advances_only_on_success(self, watermark_config):
+        """测试比对成功才推进水位线，下次窗口与本次首尾相接"""
+        from core.compare_engine.pandas_engine import PandasCompareEngine
+        from utils.watermark_store import load_watermark
+
+        failed = PandasCompareEngine(watermark_config)
+        with patch.object(failed, 'init_adapters'), patch.object(failed, 'generate_report'), \
+                patch.object(failed, 'profile_precheck', side_effect=lambda: not failed.get_where_clause()), \
+                patch.object(failed, 'load_data', side_effect=Exception("数据加载失败")):
+            with pytest.raises(Exception, match="数据加载失败"):
+                failed.run()
+        assert load_watermark(watermark_config) is None
+
+        engine = PandasCompareEngine(watermark_config)
+        with patch.object(engine, 'init_adapters'), patch.object(engine, 'generate_report'), \
+                patch.object(engine, 'profile_precheck', side_effect=lambda: bool(engine.get_where_clause())):
+            engine.run()
+
+        _, end_time = engine._incremental_window()
+        assert load_watermark(watermark_config) == end_time
+
+        next_engine = PandasCompareEngine(watermark_config)
+        next_engine.get_where_clause()
+        assert next_engine._incremental_window()[0] == end_time
+
+    def test_watermark_disabled_for_sampling(self, watermark_config):
+        """测试抽样比对不使用水位线"""
+        from core.compare_engine.pandas_engine import PandasCompareEngine
+        from utils.watermark_store import save_watermark
+
+        save_watermark(watermark_config, datetime(2026, 10, 16, 8, 0, 0))
+        engine = PandasCompareEngine({**watermark_config, 'sample_buckets': 10})
+
+        start_time, end_time = engine._incremental_window()
+
+        assert end_time - start_time == timedelta(days=3)
+        assert engine._pending_watermark is None
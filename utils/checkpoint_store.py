@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+比对断点存储
+
+长时间运行的比对按主键区间记录进度（区间边界、两端记录数、部分差异记录），
+每张表一个本地断点文件，比对成功后删除。比对中断后以--resume重新执行时，
+跳过已完成的区间并合并已保存的部分结果。
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+class CompareCheckpoint:
+    """一次比对的断点状态
+
+    state由比对引擎自行维护（已完成区间、计数器、部分差异记录等），
+    save()将其与运行标识一起写入断点文件。
+    """
+
+    def __init__(self, path: str, run_id: str, signature: Dict[str, Any],
+                 state: Optional[Dict[str, Any]] = None, resumed: bool = False):
+        self.path = path
+        self.run_id = run_id
+        self.signature = signature
+        self.state: Dict[str, Any] = state if state is not None else {}
+        self.resumed = resumed
+        self._last_save: Optional[float] = None
+
+    def save(self, min_interval: float = 0):
+        """写入断点文件（先写临时文件再替换），距上次保存不足min_interval秒时跳过"""
+        now = time.monotonic()
+        if min_interval and self._last_save is not None and now - self._last_save < min_interval:
+            return
+        data = {'run_id': self.run_id, 'signature': self.signature, 'state': self.state}
+        with _lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        self._last_save = now
+
+    def remove(self):
+        """比对完成后删除断点文件"""
+        with _lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def get_checkpoint_path(config: Dict[str, Any]) -> str:
+    """断点文件路径（按源端库表和目标端库表区分）"""
+    from config.settings import CHECKPOINT_DIR
+    from utils.watermark_store import get_watermark_key
+
+    checkpoint_dir = config.get('checkpoint_dir') or CHECKPOINT_DIR
+    digest = hashlib.md5(get_watermark_key(config).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(checkpoint_dir, f"{config['src_table_name']}_{digest}.ckpt")
+
+
+def open_checkpoint(config: Dict[str, Any], signature: Dict[str, Any]) -> CompareCheckpoint:
+    """打开本次比对的断点
+
+    resume模式下存在比对内容一致（signature相同）的断点时从断点继续，否则开始新的运行。
+    """
+    path = get_checkpoint_path(config)
+    if config.get('resume') and os.path.exists(path):
+        try:
+            with _lock, open(path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('signature') == signature:
+                logger.info(f"从断点继续比对：运行{data['run_id']}，断点文件{path}")
+                return CompareCheckpoint(path, data['run_id'], signature, data.get('state'), resumed=True)
+            logger.warning(f"断点的比对内容与本次不一致，重新开始比对：{path}")
+        except Exception as e:
+            logger.warning(f"读取断点失败，重新开始比对：{str(e)}")
+
+    return CompareCheckpoint(path, datetime.now().strftime('%Y%m%d%H%M%S'), signature)
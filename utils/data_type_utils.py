@@ -3,36 +3,336 @@
 # @Time    : 2026/1/9 16:14
 # @Author  : hejun
 
+import importlib.util
+from datetime import date, datetime
+from decimal import Decimal
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import Dict, List, Any, Optional, Tuple
 
+# 数据库字段类型到DataFrame列类型的映射（未列出的类型按值推断）
+_INT_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'year',
+              'serial', 'smallserial', 'bigserial', 'int2', 'int4', 'int8'}
+_FLOAT_TYPES = {'float', 'double', 'real', 'double precision', 'float4', 'float8', 'binary_float', 'binary_double'}
+_DATETIME_TYPES = {'date', 'datetime', 'datetime2', 'smalldatetime'}
+_STRING_TYPES = {'char', 'varchar', 'nchar', 'nvarchar', 'varchar2', 'nvarchar2', 'character',
+                 'character varying', 'text', 'tinytext', 'mediumtext', 'longtext', 'ntext', 'uuid',
+                 'uniqueidentifier'}
+_CATEGORY_TYPES = {'enum', 'set'}
 
-def unify_data_types(df1: pd.DataFrame, df2: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """统一两个DataFrame的数据类型"""
-    # 确保列名一致
-    common_cols = set(df1.columns) & set(df2.columns)
-    df1 = df1[list(common_cols)]
-    df2 = df2[list(common_cols)]
+# 安装了pyarrow时字符串列使用Arrow存储，避免每个值一个Python对象
+STRING_DTYPE = pd.StringDtype('pyarrow') if importlib.util.find_spec('pyarrow') is not None else pd.StringDtype()
 
-    # 逐列统一类型
+
+def column_kind(col_type: str) -> Optional[str]:
+    """根据数据库字段类型判断DataFrame列类型：int/float/datetime/string/category，无法确定时返回None"""
+    col_type = col_type.lower().split('(')[0].strip()
+    if col_type in _INT_TYPES:
+        return 'int'
+    if col_type in _FLOAT_TYPES:
+        return 'float'
+    if col_type in _DATETIME_TYPES or col_type.startswith('timestamp'):
+        return 'datetime'
+    if col_type in _STRING_TYPES:
+        return 'string'
+    if col_type in _CATEGORY_TYPES:
+        return 'category'
+    return None
+
+
+def build_dtype_map(metadata: Optional[List[Dict]]) -> Dict[str, str]:
+    """根据表元数据生成{字段名: 列类型}"""
+    dtypes = {}
+    for col_info in metadata or []:
+        kind = column_kind(col_info['type'])
+        if kind:
+            dtypes[col_info['name']] = kind
+    return dtypes
+
+
+def _to_column(values, kind: Optional[str]):
+    """将一列值转换为指定类型的数组，值与类型不符时（如整数列含NULL）按值推断"""
+    try:
+        if kind == 'int':
+            if any(v is None for v in values):
+                # 含NULL时使用可空Int64（默认推断为float64，超过2**53的BIGINT会丢失精度）
+                return pd.array(values, dtype='Int64')
+            return np.array(values, dtype=np.int64)
+        if kind == 'float':
+            return np.array(values, dtype=np.float64)
+        if kind == 'datetime':
+            return pd.to_datetime(pd.Series(values, dtype=object))
+        if kind == 'string':
+            return pd.array(values, dtype=STRING_DTYPE)
+        if kind == 'category':
+            return pd.Categorical(values)
+    except (TypeError, ValueError, OverflowError, pd.errors.OutOfBoundsDatetime):
+        pass
+    return pd.Series(values)
+
+
+def rows_to_frame(rows, columns: List[str] = None, dtypes: Dict[str, str] = None) -> pd.DataFrame:
+    """将查询结果构造为DataFrame
+
+    TupleRows按列一次性转换为numpy/pandas数组（按元数据确定类型），不经过逐行dict；
+    其他结果（dict列表）使用pandas默认构造。
+
+    Args:
+        rows: 查询结果（TupleRows或dict列表）
+        columns: 输出列（默认为查询结果的全部列）
+        dtypes: {字段名: 列类型}，见build_dtype_map
+    """
+    from core.db_adapter.base_adapter import TupleRows
+
+    dtypes = dtypes or {}
+    if not isinstance(rows, TupleRows):
+        if not dtypes or not rows:
+            return pd.DataFrame(rows, columns=columns) if columns else pd.DataFrame(rows)
+        # dict列表按列转换，与元组结果使用相同的列类型
+        names = columns or list(rows[0].keys())
+        rows = TupleRows(names, [tuple(row.get(c) for c in names) for row in rows])
+
+    values_by_column = list(zip(*rows.rows)) if rows.rows else [()] * len(rows.columns)
+    data = {col: _to_column(list(values), dtypes.get(col))
+            for col, values in zip(rows.columns, values_by_column)}
+    df = pd.DataFrame(data, columns=rows.columns)
+    if columns:
+        df = df.reindex(columns=columns)
+    return df
+
+
+_DECIMAL_TYPES = {'decimal', 'numeric', 'number', 'money', 'smallmoney'}
+_NUMERIC_KINDS = ('int', 'float', 'decimal')
+
+
+def metadata_kind(col_info: Dict[str, Any]) -> Optional[str]:
+    """根据元数据确定字段的比对类型，无法确定时返回None（按值推断）
+
+    decimal/NUMBER按精度和小数位决定：小数位为0转为整数，精度不超过15位转为浮点数（可精确表示），
+    其余保留为规范化的十进制文本，避免精度损失。
+    """
+    kind = column_kind(col_info['type'])
+    if kind:
+        return 'string' if kind == 'category' else kind
+    if col_info['type'].lower().split('(')[0].strip() not in _DECIMAL_TYPES:
+        return None
+    scale, precision = col_info.get('num_scale'), col_info.get('num_precision')
+    if scale is None:
+        # Oracle未指定精度的NUMBER
+        return None
+    if int(scale) == 0:
+        # 超出int64范围时转换失败，统一为字符串
+        return 'int'
+    return 'float' if precision is not None and int(precision) <= 15 else 'decimal'
+
+
+def _value_kind(series: pd.Series) -> Optional[str]:
+    """按列类型（object列按首个非空值）推断比对类型，全为空时返回None"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'int'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'float'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if dtype != object:
+        return 'string'
+
+    first_valid = series.first_valid_index()
+    if first_valid is None:
+        return None
+    value = series.at[first_valid]
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, np.integer)):
+        return 'int'
+    if isinstance(value, (float, np.floating)):
+        return 'float'
+    if isinstance(value, Decimal):
+        return 'decimal'
+    if isinstance(value, (datetime, date)):
+        return 'datetime'
+    return 'string'
+
+
+def _target_kind(kind1: Optional[str], kind2: Optional[str]) -> str:
+    """合并两端的比对类型"""
+    if kind1 is None or kind2 is None:
+        return kind1 or kind2 or 'string'
+    if kind1 == kind2:
+        return kind1
+    if 'datetime' in (kind1, kind2):
+        return 'datetime'
+    if kind1 in _NUMERIC_KINDS and kind2 in _NUMERIC_KINDS:
+        # 浮点数无法精确表示十进制，有一端为浮点时统一为浮点
+        return 'float' if 'float' in (kind1, kind2) else 'decimal'
+    return 'string'
+
+
+def _decimal_text(value) -> str:
+    """十进制数的规范文本（1.10与1.1相同）"""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return format(value.normalize(), 'f')
+
+
+def _decimal_column(series: pd.Series) -> pd.Series:
+    """十进制列向量化转换为规范文本：整数列直接转文本，Decimal列由Arrow按列定标转换后去掉小数末尾的0"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return series.astype(STRING_DTYPE)
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return series.map(_decimal_text, na_action='ignore').astype(STRING_DTYPE)
+    try:
+        array = pa.array(series, from_pandas=True)
+    except (TypeError, ValueError, ArithmeticError, pa.ArrowException):
+        array = None
+    if array is None or not pa.types.is_decimal(array.type):
+        # 浮点、混合类型或超出decimal128精度时逐值转换
+        return series.map(_decimal_text, na_action='ignore').astype(STRING_DTYPE)
+    text = pc.cast(array, pa.string())
+    if array.type.scale > 0:
+        # Arrow按列定标输出固定位数小数（1.10），去掉末尾的0和小数点得到规范文本
+        text = pc.replace_substring_regex(text, pattern='0+$', replacement='')
+        text = pc.replace_substring_regex(text, pattern='\\.$', replacement='')
+    return pd.Series(text.to_pandas(types_mapper={pa.string(): STRING_DTYPE}.get),
+                     index=series.index, name=series.name)
+
+
+def _convert_column(series: pd.Series, kind: str) -> pd.Series:
+    """将一列转换为目标比对类型（向量化转换，类型已符合时原样返回）"""
+    dtype = series.dtype
+    if kind == 'int':
+        if pd.api.types.is_integer_dtype(dtype):
+            return series
+        if series.isna().any():
+            # 含NULL的整数列使用可空Int64（float64只能精确表示2**53以内的整数）
+            return series.astype('Int64')
+        return series.astype(np.int64)
+    if kind == 'float':
+        return series if dtype == np.float64 else series.astype(np.float64)
+    if kind == 'decimal':
+        return _decimal_column(series)
+    if kind == 'datetime':
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            return series.dt.tz_convert('UTC').dt.tz_localize(None)
+        if dtype.kind == 'M':
+            return series
+        try:
+            converted = pd.to_datetime(series)
+        except ValueError:
+            # 带不同时区的值统一换算为UTC
+            converted = pd.to_datetime(series, utc=True)
+        if isinstance(converted.dtype, pd.DatetimeTZDtype):
+            converted = converted.dt.tz_convert('UTC').dt.tz_localize(None)
+        return converted
+    if kind == 'bool':
+        return series
+    # 字符串：统一为Arrow字符串列（与rows_to_frame一致），NULL保持为NULL（不转换为'nan'/'None'）
+    if dtype == STRING_DTYPE:
+        return series
+    if dtype == object or isinstance(dtype, pd.StringDtype):
+        return series.astype(STRING_DTYPE)
+    return series.astype(str).astype(STRING_DTYPE).where(series.notna(), pd.NA)
+
+
+def normalise_data_types(df1: pd.DataFrame, df2: pd.DataFrame, metadata1: List[Dict] = None,
+                         metadata2: List[Dict] = None) -> Dict[str, str]:
+    """按两端元数据为共有列确定一次目标类型，并原地转换两个DataFrame
+
+    只保留两端共有列（原地删除其余列，不复制整个DataFrame）。无元数据的列按值推断类型，
+    转换失败（如超出datetime64范围）的列两端统一为字符串。
+
+    Args:
+        df1: 源端数据
+        df2: 目标端数据
+        metadata1: 源端元数据（含type，decimal类型可含num_precision/num_scale）
+        metadata2: 目标端元数据
+
+    Returns:
+        {列名: 目标类型}，类型为int/float/decimal/datetime/bool/string
+    """
+    meta1 = {c['name']: c for c in metadata1 or []}
+    meta2 = {c['name']: c for c in metadata2 or []}
+
+    common_cols = [col for col in df1.columns if col in df2.columns]
+    df1.drop(columns=[col for col in df1.columns if col not in common_cols], inplace=True)
+    df2.drop(columns=[col for col in df2.columns if col not in common_cols], inplace=True)
+
+    mapping = {}
     for col in common_cols:
-        # 获取两端的非空值类型
-        dtype1 = df1[col].dropna().dtype
-        dtype2 = df2[col].dropna().dtype
-
-        # 优先转换为更通用的类型
-        if np.issubdtype(dtype1, np.number) and np.issubdtype(dtype2, np.number):
-            target_type = np.float64 if np.issubdtype(dtype1, np.float64) or np.issubdtype(dtype2,
-                                                                                           np.float64) else np.int64
-            df1[col] = df1[col].astype(target_type)
-            df2[col] = df2[col].astype(target_type)
-        elif np.issubdtype(dtype1, np.datetime64) or np.issubdtype(dtype2, np.datetime64):
-            df1[col] = pd.to_datetime(df1[col])
-            df2[col] = pd.to_datetime(df2[col])
-        else:
-            # 统一为字符串类型
-            df1[col] = df1[col].astype(str)
-            df2[col] = df2[col].astype(str)
-
-    return df1, df2
\ No newline at end of file
+        kind1 = metadata_kind(meta1[col]) if col in meta1 else None
+        kind2 = metadata_kind(meta2[col]) if col in meta2 else None
+        kind = _target_kind(kind1 or _value_kind(df1[col]), kind2 or _value_kind(df2[col]))
+        try:
+            converted1, converted2 = _convert_column(df1[col], kind), _convert_column(df2[col], kind)
+        except (TypeError, ValueError, OverflowError, ArithmeticError, pd.errors.OutOfBoundsDatetime):
+            kind = 'string'
+            converted1, converted2 = _convert_column(df1[col], kind), _convert_column(df2[col], kind)
+        if kind == 'int' and converted1.dtype != converted2.dtype:
+            # 一端含NULL（可空Int64）时两端统一为Int64，保证相同取值哈希相同
+            converted1, converted2 = converted1.astype('Int64'), converted2.astype('Int64')
+        if converted1 is not df1[col]:
+            df1[col] = converted1
+        if converted2 is not df2[col]:
+            df2[col] = converted2
+        mapping[col] = kind
+    return mapping
+
+
+def _fixed_metadata_kind(col_info: Optional[Dict[str, Any]]) -> Optional[str]:
+    """只按元数据确定比对类型：未指定精度或超出int64范围的十进制类型为decimal，无元数据时返回None"""
+    if col_info is None:
+        return None
+    kind = metadata_kind(col_info)
+    if col_info['type'].lower().split('(')[0].strip() in _DECIMAL_TYPES:
+        precision = col_info.get('num_precision')
+        if kind is None or (kind == 'int' and precision is not None and int(precision) > 18):
+            return 'decimal'
+    return kind
+
+
+def resolve_column_kinds(columns: List[str], metadata1: List[Dict] = None,
+                         metadata2: List[Dict] = None) -> Dict[str, str]:
+    """只按两端元数据为各列确定目标比对类型（不查看数据）
+
+    分块加载时每块的取值不同（如首块全为NULL），按值推断会使各块类型不一致，
+    因此类型只由元数据决定，两端均无元数据的列统一为字符串。
+    """
+    meta1 = {c['name']: c for c in metadata1 or []}
+    meta2 = {c['name']: c for c in metadata2 or []}
+    return {col: _target_kind(_fixed_metadata_kind(meta1.get(col)), _fixed_metadata_kind(meta2.get(col)))
+            for col in columns}
+
+
+def convert_frame_types(df: pd.DataFrame, kinds: Dict[str, str]) -> pd.DataFrame:
+    """按resolve_column_kinds确定的类型原地转换一个数据块
+
+    与normalise_data_types使用相同的列转换，但含NULL的整数列使用可空Int64（不转为float64丢失精度）；
+    无法转换的列保持原值（由写入端按目标类型转换）。
+    """
+    for col, kind in kinds.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        try:
+            if kind == 'int' and series.isna().any():
+                converted = series.astype('Int64')
+            else:
+                converted = _convert_column(series, kind)
+        except (TypeError, ValueError, OverflowError, ArithmeticError, pd.errors.OutOfBoundsDatetime):
+            continue
+        if converted is not series:
+            df[col] = converted
+    return df
+
+
+def unify_data_types(df1: pd.DataFrame, df2: pd.DataFrame, metadata1: List[Dict] = None,
+                     metadata2: List[Dict] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """统一两个DataFrame的数据类型（见normalise_data_types），返回转换后的两端数据"""
+    normalise_data_types(df1, df2, metadata1, metadata2)
+    return df1, df2
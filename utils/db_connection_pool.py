@@ -9,7 +9,7 @@
 """
 import logging
 import threading
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 from dbutils.pooled_db import PooledDB
 
 logger = logging.getLogger(__name__)
@@ -32,6 +32,9 @@ class SimpleConnectionPool:
         self.max_connections = max_connections
         self._pool: Optional[PooledDB] = None
         self._lock = threading.Lock()
+        # 已借出的连接数（DBUtils阻塞等待连接时不支持超时，借出前在这里按超时等待）
+        self._in_use = 0
+        self._released = threading.Condition(self._lock)
 
         # 生成连接池标识
         self.pool_id = f"{db_type}://{config.get('host')}:{config.get('port')}/{config.get('database')}"
@@ -140,19 +143,44 @@ class SimpleConnectionPool:
             logger.error(f"[{self.pool_id}] 创建连接池失败: {str(e)}")
             raise
 
-    def get_raw_connection(self):
-        """获取底层连接"""
+    def get_raw_connection(self, timeout: Optional[float] = None):
+        """
+        获取底层连接
+
+        Args:
+            timeout: 连接全部借出时最多等待的秒数，None为一直等待，超时抛出TimeoutError
+        """
         if self._pool is None:
             raise RuntimeError(f"[{self.pool_id}] 连接池未初始化")
 
+        with self._released:
+            if not self._released.wait_for(lambda: self._in_use < self.max_connections, timeout):
+                raise TimeoutError(f"[{self.pool_id}] 等待{timeout}秒仍无空闲连接")
+            self._in_use += 1
         try:
             conn = self._pool.connection()
             logger.debug(f"[{self.pool_id}] 获取连接成功")
             return conn
         except Exception as e:
+            self.release_raw_connection(None)
             logger.error(f"[{self.pool_id}] 获取连接失败: {str(e)}")
             raise
 
+    def release_raw_connection(self, conn):
+        """归还底层连接（DBUtils连接关闭即放回连接池）"""
+        try:
+            if conn is not None:
+                conn.close()
+        finally:
+            with self._released:
+                self._in_use -= 1
+                self._released.notify()
+
+    def free_connections(self) -> int:
+        """未借出的连接数"""
+        with self._released:
+            return self.max_connections - self._in_use
+
     def close_all(self):
         """关闭连接池"""
         if self._pool:
@@ -161,29 +189,43 @@ class SimpleConnectionPool:
 
 
 class PooledAdapter:
-    """连接池适配器包装器"""
+    """连接池适配器包装器
+
+    流式读取、键集分页、COPY导出、ROWID区间和统计信息等方法委托给对应数据库的适配器
+    （core.db_adapter，包装本连接池借出的连接），两处不再各自实现。
+    """
 
-    def __init__(self, pool: SimpleConnectionPool, config: Dict[str, Any]):
+    def __init__(self, pool: SimpleConnectionPool, config: Dict[str, Any], timeout: Optional[float] = None):
         """
         初始化包装器
 
         Args:
             pool: 连接池实例
             config: 数据库配置
+            timeout: 连接全部借出时最多等待的秒数，None为一直等待
         """
         self.pool = pool
         self.config = config
         self.connection = None
         self.cursor = None
+        self._dialect = None
 
         # 从连接池获取连接
-        self._acquire_connection()
+        self._acquire_connection(timeout)
 
-    def _acquire_connection(self):
-        """从连接池获取连接"""
-        self.connection = self.pool.get_raw_connection()
+    def _acquire_connection(self, timeout: Optional[float] = None):
+        """从连接池获取连接，并用对应数据库的适配器包装该连接"""
+        from core.db_adapter.base_adapter import get_adapter_class
+
+        self.connection = self.pool.get_raw_connection(timeout)
         if self.connection:
             self.cursor = self.connection.cursor()
+            # pymysql/psycopg2/pymssql使用%s占位符，cx_Oracle使用:1
+            param_style = 'numeric' if self.pool.db_type == 'oracle' else 'format'
+            self._dialect = get_adapter_class(self.pool.db_type).wrap_connection(
+                {**self.config, 'db_type': self.pool.db_type}, self.connection, self.cursor, param_style)
+            # 普通查询仍由本包装器执行（不套用直连适配器的失败重试，连接失效由DBUtils重连）
+            self._dialect.query = lambda sql, params=None: self.query(sql, params)
 
     def query(self, sql: str, params: Tuple = None) -> List[Dict]:
         """执行查询"""
@@ -194,6 +236,42 @@ class PooledAdapter:
             logger.error(f"查询失败: SQL={sql}, 错误={str(e)}")
             raise
 
+    def query_tuples(self, sql: str, params: Tuple = None, batch_size: int = None):
+        """执行查询，按fetchmany分批读取元组行（不构造逐行dict），返回TupleRows"""
+        return self._dialect.query_tuples(sql, params, batch_size)
+
+    def stream_query(self, sql: str, params: Tuple = None, batch_size: int = None) -> Iterator:
+        """执行查询，通过非缓冲/服务端游标分批返回元组行（每批为TupleRows）
+
+        读取结束（或迭代器关闭）前连接不能执行其他查询。
+        """
+        return self._dialect.stream_query(sql, params, batch_size)
+
+    def stream_data(self, db_name: str, table_name: str, columns: List[str], where_clause: str = "",
+                    batch_size: int = None) -> Iterator:
+        """流式查询数据（一次查询分批读取，不排序不分页）"""
+        return self._dialect.stream_data(db_name, table_name, columns, where_clause, batch_size)
+
+    def copy_data(self, db_name: str, table_name: str, columns: List[str], where_clause: str = "",
+                  batch_size: int = None, column_types: Dict[str, str] = None) -> Iterator:
+        """PostgreSQL通过COPY (SELECT ...) TO STDOUT批量导出数据，逐块返回DataFrame"""
+        if self.pool.db_type != 'postgresql':
+            raise ValueError(f"COPY导出仅支持PostgreSQL: {self.pool.db_type}")
+        return self._dialect.copy_data(db_name, table_name, columns, where_clause, batch_size, column_types)
+
+    def get_rowid_ranges(self, db_name: str, table_name: str, chunk_count: int) -> List[Tuple[str, str]]:
+        """Oracle按区（extent）信息把表切分为约chunk_count个ROWID区间，无法获取区信息时返回空列表"""
+        if self.pool.db_type != 'oracle':
+            raise ValueError(f"ROWID区间切分仅支持Oracle: {self.pool.db_type}")
+        return self._dialect.get_rowid_ranges(db_name, table_name, chunk_count)
+
+    def stream_rowid_range(self, db_name: str, table_name: str, columns: List[str], rowid_range: Tuple[str, str],
+                           where_clause: str = "", batch_size: int = None) -> Iterator:
+        """Oracle读取一个ROWID区间的数据，NUMBER字段按精度取为原生类型，逐批返回TupleRows"""
+        if self.pool.db_type != 'oracle':
+            raise ValueError(f"ROWID区间读取仅支持Oracle: {self.pool.db_type}")
+        return self._dialect.stream_rowid_range(db_name, table_name, columns, rowid_range, where_clause, batch_size)
+
     def execute(self, sql: str, params: Tuple = None) -> int:
         """执行增删改"""
         try:
@@ -209,28 +287,32 @@ class PooledAdapter:
         """获取表元数据"""
         if self.pool.db_type == 'mysql':
             sql = """
-                SELECT COLUMN_NAME as name, DATA_TYPE as type
+                SELECT COLUMN_NAME as name, DATA_TYPE as type,
+                       NUMERIC_PRECISION as num_precision, NUMERIC_SCALE as num_scale
                 FROM INFORMATION_SCHEMA.COLUMNS
                 WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
             """
             return self.query(sql, (db_name, table_name))
         elif self.pool.db_type == 'oracle':
             sql = """
-                SELECT COLUMN_NAME as name, DATA_TYPE as type
+                SELECT COLUMN_NAME as name, DATA_TYPE as type,
+                       DATA_PRECISION as num_precision, DATA_SCALE as num_scale
                 FROM ALL_TAB_COLUMNS
                 WHERE OWNER = UPPER(:1) AND TABLE_NAME = UPPER(:2)
             """
             return self.query(sql, (db_name.upper(), table_name.upper()))
         elif self.pool.db_type == 'postgresql':
             sql = """
-                SELECT column_name as name, data_type as type
+                SELECT column_name as name, data_type as type,
+                       numeric_precision as num_precision, numeric_scale as num_scale
                 FROM information_schema.columns
                 WHERE table_schema = %s AND table_name = %s
             """
             return self.query(sql, (db_name, table_name))
         elif self.pool.db_type == 'sqlserver':
             sql = """
-                SELECT COLUMN_NAME as name, DATA_TYPE as type
+                SELECT COLUMN_NAME as name, DATA_TYPE as type,
+                       NUMERIC_PRECISION as num_precision, NUMERIC_SCALE as num_scale
                 FROM INFORMATION_SCHEMA.COLUMNS
                 WHERE TABLE_CATALOG = %s AND TABLE_NAME = %s
             """
@@ -307,7 +389,17 @@ class PooledAdapter:
             elif self.pool.db_type == 'sqlserver':
                 sql = f"SELECT TOP {limit} * FROM ({sql}) t"
 
-        return self.query(sql)
+        return self.query_tuples(sql)
+
+    def query_data_keyset(self, db_name: str, table_name: str, columns: List[str], key_columns: List[str],
+                          last_key: Tuple = None, where_clause: str = "", limit: int = 10000):
+        """键集分页查询数据（WHERE pk > last_pk ORDER BY pk），返回TupleRows"""
+        return self._dialect.query_data_keyset(db_name, table_name, columns, key_columns, last_key, where_clause,
+                                               limit)
+
+    def get_table_stats(self, db_name: str, table_name: str) -> Optional[Dict[str, Any]]:
+        """从数据字典获取表的估算记录数和平均行长，无统计信息时返回None"""
+        return self._dialect.get_table_stats(db_name, table_name)
 
     def close(self):
         """关闭连接（归还到连接池）"""
@@ -315,8 +407,10 @@ class PooledAdapter:
             if self.cursor:
                 self.cursor.close()
                 self.cursor = None
-            # DBUtils会自动管理连接，不需要手动关闭
-            self.connection = None
+            self._dialect = None
+            if self.connection is not None:
+                connection, self.connection = self.connection, None
+                self.pool.release_raw_connection(connection)
             logger.debug(f"[{self.pool.pool_id}] 连接已归还到连接池")
         except Exception as e:
             logger.warning(f"关闭连接时出错: {str(e)}")
@@ -339,9 +433,7 @@ class ConnectionPoolManager:
     def get_pool(self, config: Dict[str, Any], max_connections: int = 5) -> SimpleConnectionPool:
         """获取或创建连接池"""
         db_type = config.get('db_type', 'mysql')
-
-        # 生成连接池唯一键
-        pool_key = f"{db_type}:{config.get('host')}:{config.get('port')}:{config.get('database')}"
+        pool_key = get_pool_key(config)
 
         if pool_key not in self._pools:
             with threading.Lock():  # 使用临时锁确保线程安全
@@ -351,6 +443,10 @@ class ConnectionPoolManager:
 
         return self._pools[pool_key]
 
+    def find_pool(self, config: Dict[str, Any]) -> Optional[SimpleConnectionPool]:
+        """获取已创建的连接池，不存在时返回None（不创建）"""
+        return self._pools.get(get_pool_key(config))
+
     def close_all(self):
         """关闭所有连接池"""
         logger.info("关闭所有连接池")
@@ -359,14 +455,20 @@ class ConnectionPoolManager:
         self._pools.clear()
 
 
+def get_pool_key(config: Dict[str, Any]) -> str:
+    """连接池唯一键（同一数据库的配置共用一个连接池）"""
+    return f"{config.get('db_type', 'mysql')}:{config.get('host')}:{config.get('port')}:{config.get('database')}"
+
+
 # 全局连接池管理器
 _pool_manager = ConnectionPoolManager()
 
 
-def get_pooled_connection(config: Dict[str, Any], max_connections: int = 5) -> PooledAdapter:
-    """获取连接池中的连接"""
+def get_pooled_connection(config: Dict[str, Any], max_connections: int = 5,
+                          timeout: Optional[float] = None) -> PooledAdapter:
+    """获取连接池中的连接，timeout为连接全部借出时最多等待的秒数（None为一直等待，超时抛出TimeoutError）"""
     pool = _pool_manager.get_pool(config, max_connections)
-    return PooledAdapter(pool, config)
+    return PooledAdapter(pool, config, timeout)
 
 
 def return_pooled_connection(config: Dict[str, Any], connection: PooledAdapter):
@@ -375,6 +477,27 @@ def return_pooled_connection(config: Dict[str, Any], connection: PooledAdapter):
         connection.close()
 
 
+_host_extract_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_extract_lock = threading.Lock()
+
+
+def get_host_extract_slots(config: Dict[str, Any]) -> threading.BoundedSemaphore:
+    """同一数据库服务器上并行读取会话的名额（所有比对任务共享，上限为PARALLEL_EXTRACT_PER_HOST）"""
+    from config.settings import PARALLEL_EXTRACT_PER_HOST
+
+    host_key = f"{config.get('host')}:{config.get('port')}"
+    with _host_extract_lock:
+        if host_key not in _host_extract_slots:
+            _host_extract_slots[host_key] = threading.BoundedSemaphore(max(1, PARALLEL_EXTRACT_PER_HOST))
+        return _host_extract_slots[host_key]
+
+
+def get_free_connections(config: Dict[str, Any]) -> Optional[int]:
+    """连接池当前未借出的连接数，连接池尚未创建时返回None"""
+    pool = _pool_manager.find_pool(config)
+    return None if pool is None else pool.free_connections()
+
+
 def get_pool_manager() -> ConnectionPoolManager:
     """获取全局连接池管理器"""
     return _pool_manager
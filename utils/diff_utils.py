@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""差异数据工具类（按主键比较DataFrame，输出修复引擎使用的diff_records结构）"""
+import itertools
+import logging
+import os
+from collections.abc import Sequence
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SRC_SUFFIX = '__src'
+TGT_SUFFIX = '__tgt'
+
+# 行哈希内核使用的内部列名和常量
+_HASH_COL = '__row_hash'
+_POS_COL = '__row_pos'
+_HASH_PRIME = np.uint64(1099511628211)
+_NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+def empty_diff_records() -> Dict[str, List]:
+    """返回空的差异数据结构（与DataXRepairEngine约定一致）"""
+    return {
+        'mismatch': [],       # 值不匹配的记录（仅主键）
+        'mismatch_full': [],  # 值不匹配的完整记录（包含源端和目标端所有字段）
+        'src_only': [],       # 仅源端存在的记录（所有字段）
+        'tgt_only': []        # 仅目标端存在的记录（仅主键）
+    }
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame转换为字典列表，可空扩展类型列（如Arrow字符串）中的NULL输出为None而不是pd.NA"""
+    na_columns = [col for col in df.columns
+                  if isinstance(df[col].dtype, pd.api.extensions.ExtensionDtype) and df[col].hasnans]
+    if na_columns:
+        df = df.astype({col: object for col in na_columns})
+        df[na_columns] = df[na_columns].where(df[na_columns].notna(), None)
+    return df.to_dict('records')
+
+
+class ColumnarMismatchFull(Sequence):
+    """列式存储的mismatch_full
+
+    对外表现为 [{'pk', 'src_record', 'tgt_record', 'update_column'}, ...] 序列，
+    内部只保存三个DataFrame，遍历时按需生成单条字典，避免差异量大时常驻大量小字典。
+    """
+
+    def __init__(self, pk_df: pd.DataFrame, src_df: pd.DataFrame, tgt_df: pd.DataFrame,
+                 update_column: List[str], src_missing: np.ndarray = None, tgt_missing: np.ndarray = None):
+        self.pk_df = pk_df.reset_index(drop=True)
+        self.src_df = src_df.reset_index(drop=True)
+        self.tgt_df = tgt_df.reset_index(drop=True)
+        self.update_column = update_column
+        self._src_missing = src_missing if src_missing is not None else np.zeros(len(pk_df), dtype=bool)
+        self._tgt_missing = tgt_missing if tgt_missing is not None else np.zeros(len(pk_df), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.pk_df)
+
+    def _record(self, pk: dict, src_record: dict, tgt_record: dict, idx: int) -> dict:
+        return {
+            'pk': pk,
+            'src_record': {} if self._src_missing[idx] else src_record,
+            'tgt_record': {} if self._tgt_missing[idx] else tgt_record,
+            'update_column': self.update_column
+        }
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        return self._record(frame_records(self.pk_df.iloc[idx:idx + 1])[0],
+                            frame_records(self.src_df.iloc[idx:idx + 1])[0],
+                            frame_records(self.tgt_df.iloc[idx:idx + 1])[0], idx)
+
+    def __iter__(self):
+        # 分批转换为字典，兼顾速度和内存
+        batch_size = 10000
+        for start in range(0, len(self), batch_size):
+            end = start + batch_size
+            pk_records = frame_records(self.pk_df.iloc[start:end])
+            src_records = frame_records(self.src_df.iloc[start:end])
+            tgt_records = frame_records(self.tgt_df.iloc[start:end])
+            for offset, (pk, src_record, tgt_record) in enumerate(zip(pk_records, src_records, tgt_records)):
+                yield self._record(pk, src_record, tgt_record, start + offset)
+
+
+def _parquet_filesystem(path: str):
+    """返回 (pyarrow文件系统, 文件系统内路径)，支持本地路径和hdfs://等URI"""
+    from pyarrow import fs
+    if '://' in path:
+        return fs.FileSystem.from_uri(path)
+    return fs.LocalFileSystem(), os.path.abspath(path)
+
+
+def remove_diff_records(compare_result: Dict[str, Any]):
+    """删除比对落盘的差异数据目录（修复完成或无需修复后调用，未落盘时不做任何事）"""
+    path = compare_result.get('diff_records_dir')
+    if not path:
+        return
+    filesystem, fs_path = _parquet_filesystem(path)
+    try:
+        filesystem.delete_dir(fs_path)
+        logger.info(f"差异数据目录已删除：{path}")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"删除差异数据目录失败：{path}，{str(e)}")
+
+
+class ParquetRecords(Sequence):
+    """按需读取Parquet目录的差异记录序列
+
+    对外表现为字典列表，遍历时用pyarrow按批读取，记录不会一次性加载到内存（用于Spark引擎落盘的差异数据）。
+    transform用于把每行转换为修复引擎需要的结构。
+    """
+
+    def __init__(self, path: str, columns: List[str] = None, transform=None, batch_size: int = 10000):
+        self.path = path
+        self.columns = columns
+        self.transform = transform
+        self.batch_size = batch_size
+        self._len = None
+
+    def _dataset(self):
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+        filesystem, path = _parquet_filesystem(self.path)
+        # 没有该类差异时Spark不会生成对应分区目录
+        if filesystem.get_file_info(path).type != fs.FileType.Directory:
+            return None
+        return ds.dataset(path, filesystem=filesystem, format='parquet')
+
+    def __len__(self) -> int:
+        if self._len is None:
+            dataset = self._dataset()
+            self._len = dataset.count_rows() if dataset is not None else 0
+        return self._len
+
+    def __iter__(self):
+        dataset = self._dataset()
+        if dataset is None:
+            return
+        for batch in dataset.to_batches(columns=self.columns, batch_size=self.batch_size):
+            for row in batch.to_pylist():
+                yield self.transform(row) if self.transform else row
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return list(itertools.islice(self, *idx.indices(len(self))))
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return next(itertools.islice(self, idx, None))
+
+
+def build_mismatch_full(mismatch_keys: pd.DataFrame, src_df: pd.DataFrame, tgt_df: pd.DataFrame,
+                        key_columns: List[str], update_column: List[str] = None,
+                        columnar: bool = False) -> Union[List[Dict], ColumnarMismatchFull]:
+    """按主键从两端批量取回不一致记录的完整数据（一次merge代替逐行loc查找）
+
+    主键重复时取每端第一条；某端缺失时对应记录为空字典。
+    """
+    update_column = update_column or []
+    keys = mismatch_keys[key_columns].drop_duplicates().reset_index(drop=True)
+
+    def lookup(side_df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+        side_unique = side_df.drop_duplicates(subset=key_columns, keep='first')
+        matched = keys.merge(side_unique, on=key_columns, how='left', indicator=True)
+        missing = (matched['_merge'] == 'left_only').to_numpy()
+        return matched[list(side_df.columns)], missing
+
+    src_view, src_missing = lookup(src_df)
+    tgt_view, tgt_missing = lookup(tgt_df)
+    return pack_mismatch_full(keys, src_view, tgt_view, update_column, columnar, src_missing, tgt_missing)
+
+
+def pack_mismatch_full(pk_df: pd.DataFrame, src_view: pd.DataFrame, tgt_view: pd.DataFrame,
+                        update_column: List[str], columnar: bool,
+                        src_missing: np.ndarray = None, tgt_missing: np.ndarray = None):
+    """按需输出字典列表或列式结构"""
+    if columnar:
+        return ColumnarMismatchFull(pk_df, src_view, tgt_view, update_column, src_missing, tgt_missing)
+    return list(ColumnarMismatchFull(pk_df, src_view, tgt_view, update_column, src_missing, tgt_missing))
+
+
+def merge_diff_records(target: Dict[str, List], source: Dict[str, List]):
+    """将source中的差异数据追加到target"""
+    for key, records in source.items():
+        target.setdefault(key, []).extend(records)
+
+
+def _normalise_pair(src_values: pd.Series, tgt_values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """统一一对列的类型，保证相同取值得到相同哈希"""
+    if src_values.dtype == tgt_values.dtype:
+        return src_values, tgt_values
+    numeric = pd.api.types.is_numeric_dtype
+    if numeric(src_values) and numeric(tgt_values) \
+            and not pd.api.types.is_bool_dtype(src_values) and not pd.api.types.is_bool_dtype(tgt_values):
+        integer = pd.api.types.is_integer_dtype
+        if integer(src_values) and integer(tgt_values):
+            # 两端均为整数（如int64与可空Int64）时不转浮点：超过2**53的BIGINT转为float64后不同的值会相等
+            return src_values.astype('Int64'), tgt_values.astype('Int64')
+        return src_values.astype('float64'), tgt_values.astype('float64')
+    return src_values.astype(str).where(src_values.notna(), None), \
+        tgt_values.astype(str).where(tgt_values.notna(), None)
+
+
+def _column_hash(values: pd.Series) -> np.ndarray:
+    """计算单列64位哈希（NULL统一为固定哈希值）"""
+    hashed = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+    return np.where(values.isna().to_numpy(), _NULL_HASH, hashed)
+
+
+def _values_differ(src_values: pd.Series, tgt_values: pd.Series) -> np.ndarray:
+    """null安全的逐行取值比较"""
+    src_values = src_values.reset_index(drop=True)
+    tgt_values = tgt_values.reset_index(drop=True)
+    # 可空类型（如Arrow字符串）与NULL比较结果为NA，按不相等处理
+    equal = (src_values == tgt_values).fillna(False) | (src_values.isna() & tgt_values.isna())
+    return ~equal.to_numpy(dtype=bool)
+
+
+def hash_compare(src_df: pd.DataFrame, tgt_df: pd.DataFrame, key_columns: List[str],
+                 update_column: List[str] = None, columnar: bool = False) -> Dict[str, Any]:
+    """基于行哈希的比对内核
+
+    每端对比对字段计算64位行哈希，只用 (主键, 行哈希, 行号) 组成的窄表按主键关联，
+    再用NumPy向量运算归类为一致/不一致/源端独有/目标端独有，最后按行号取回差异行。
+    逐列不一致计数只在哈希不一致的行上计算。
+
+    Returns:
+        {'diff_records', 'matched_cnt', 'mismatch_cnt', 'src_only_cnt', 'tgt_only_cnt', 'column_mismatch_cnt'}
+    """
+    update_column = update_column or []
+    diff_records = empty_diff_records()
+    result = {'diff_records': diff_records, 'matched_cnt': 0, 'mismatch_cnt': 0,
+              'src_only_cnt': 0, 'tgt_only_cnt': 0, 'column_mismatch_cnt': {}}
+
+    # 一端为空：无需关联，直接归类
+    if src_df.empty or tgt_df.empty:
+        if not src_df.empty:
+            diff_records['src_only'] = frame_records(src_df)
+        if not tgt_df.empty:
+            diff_records['tgt_only'] = frame_records(tgt_df[key_columns])
+        result['src_only_cnt'] = len(src_df)
+        result['tgt_only_cnt'] = len(tgt_df)
+        return result
+
+    value_columns = [c for c in src_df.columns if c not in key_columns and c in tgt_df.columns]
+
+    src_hash = np.zeros(len(src_df), dtype=np.uint64)
+    tgt_hash = np.zeros(len(tgt_df), dtype=np.uint64)
+    for col in value_columns:
+        src_values, tgt_values = _normalise_pair(src_df[col], tgt_df[col])
+        src_hash = src_hash * _HASH_PRIME ^ _column_hash(src_values)
+        tgt_hash = tgt_hash * _HASH_PRIME ^ _column_hash(tgt_values)
+
+    src_keys = src_df[key_columns].reset_index(drop=True)
+    src_keys[_HASH_COL] = src_hash
+    src_keys[_POS_COL] = np.arange(len(src_df))
+    tgt_keys = tgt_df[key_columns].reset_index(drop=True)
+    tgt_keys[_HASH_COL] = tgt_hash
+    tgt_keys[_POS_COL] = np.arange(len(tgt_df))
+    joined = src_keys.merge(tgt_keys, on=key_columns, how='outer', suffixes=(SRC_SUFFIX, TGT_SUFFIX), indicator=True)
+
+    side = joined['_merge'].to_numpy()
+    both_mask = side == 'both'
+    hash_differ = joined[_HASH_COL + SRC_SUFFIX].to_numpy() != joined[_HASH_COL + TGT_SUFFIX].to_numpy()
+    mismatch_mask = both_mask & hash_differ
+
+    result['matched_cnt'] = int((both_mask & ~hash_differ).sum())
+    result['mismatch_cnt'] = int(mismatch_mask.sum())
+
+    if result['mismatch_cnt'] > 0:
+        mismatch_rows = joined[mismatch_mask]
+        src_view = src_df.iloc[mismatch_rows[_POS_COL + SRC_SUFFIX].to_numpy(dtype=np.int64)]
+        tgt_view = tgt_df.iloc[mismatch_rows[_POS_COL + TGT_SUFFIX].to_numpy(dtype=np.int64)]
+        pk_df = mismatch_rows[key_columns]
+        diff_records['mismatch'] = frame_records(pk_df)
+        diff_records['mismatch_full'] = pack_mismatch_full(pk_df, src_view, tgt_view, update_column, columnar)
+        result['column_mismatch_cnt'] = {
+            col: int(_values_differ(src_view[col], tgt_view[col]).sum()) for col in value_columns
+        }
+
+    src_only_pos = joined.loc[side == 'left_only', _POS_COL + SRC_SUFFIX].to_numpy(dtype=np.int64)
+    if len(src_only_pos) > 0:
+        diff_records['src_only'] = frame_records(src_df.iloc[src_only_pos])
+    tgt_only_pos = joined.loc[side == 'right_only', _POS_COL + TGT_SUFFIX].to_numpy(dtype=np.int64)
+    if len(tgt_only_pos) > 0:
+        diff_records['tgt_only'] = frame_records(tgt_df.iloc[tgt_only_pos][key_columns])
+    result['src_only_cnt'] = len(src_only_pos)
+    result['tgt_only_cnt'] = len(tgt_only_pos)
+    return result
+
+
+def diff_dataframes(src_df: pd.DataFrame, tgt_df: pd.DataFrame, key_columns: List[str],
+                    update_column: List[str] = None, columnar: bool = False) -> Tuple[Dict[str, List], int]:
+    """按主键比较两个DataFrame（null安全），返回差异数据和匹配行数
+
+    调用方需保证两端主键列类型一致（例如先调用unify_data_types）。
+
+    Returns:
+        (diff_records, matched_cnt)
+    """
+    result = hash_compare(src_df, tgt_df, key_columns, update_column, columnar)
+    return result['diff_records'], result['matched_cnt']
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+内存预算估算（自动选择引擎、Pandas加载过程中的内存保护）
+
+进程内存预算按同时运行的任务数平分，按字段类型估算Pandas每行内存占用。
+"""
+import threading
+from typing import Dict, List, Any, Optional
+
+# 字段类型对应的Pandas每行内存（字节）
+_DECIMAL_BYTES = 104  # Decimal对象（object列）
+_FIXED_BYTES = 8  # 数值、时间等定长列
+_STR_OVERHEAD_BYTES = 57  # Python字符串对象头 + object列指针
+_DEFAULT_TEXT_BYTES = 32  # 无统计信息时字符串平均长度
+
+_DECIMAL_TYPES = ('decimal', 'numeric')
+_FIXED_TYPES = ('int', 'float', 'double', 'real', 'number', 'bit', 'bool', 'date', 'time', 'serial')
+
+
+class MemoryBudgetExceeded(Exception):
+    """加载的数据超过内存预算"""
+    pass
+
+
+def estimate_row_bytes(column_types: List[str], avg_row_bytes: Optional[float] = None,
+                       total_columns: int = 0) -> Optional[float]:
+    """估算加载到Pandas后每行的内存占用
+
+    Args:
+        column_types: 将要加载的字段类型
+        avg_row_bytes: 数据字典中的平均行长（用于估算字符串字段长度）
+        total_columns: 表的总字段数
+
+    Returns:
+        每行字节数，无字段信息且无统计信息时返回None
+    """
+    if not column_types:
+        return float(avg_row_bytes) if avg_row_bytes else None
+
+    text_bytes = avg_row_bytes / total_columns if avg_row_bytes and total_columns else _DEFAULT_TEXT_BYTES
+    row_bytes = 0.0
+    for col_type in column_types:
+        col_type = col_type.lower()
+        if any(t in col_type for t in _DECIMAL_TYPES):
+            row_bytes += _DECIMAL_BYTES
+        elif any(t in col_type for t in _FIXED_TYPES):
+            row_bytes += _FIXED_BYTES
+        else:
+            row_bytes += _STR_OVERHEAD_BYTES + text_bytes
+    return row_bytes
+
+
+def estimate_pandas_peak_bytes(row_count: int, row_bytes: float) -> float:
+    """估算Pandas比对的峰值内存（两端数据 × 比对过程中的副本倍数）"""
+    from config.settings import PANDAS_MEMORY_FACTOR
+    return row_count * row_bytes * 2 * PANDAS_MEMORY_FACTOR
+
+
+def get_task_memory_budget(config: Dict[str, Any]) -> float:
+    """单个任务可用的内存预算（进程预算按同时运行的任务数平分）"""
+    from config.settings import PROCESS_MEMORY_BUDGET_BYTES
+    budget = config.get('process_memory_budget_bytes', PROCESS_MEMORY_BUDGET_BYTES)
+    return budget / max(1, int(config.get('concurrent_tasks', 1)))
+
+
+class LoadMemoryGuard:
+    """累计已加载数据的内存占用，超过上限时抛出MemoryBudgetExceeded（线程安全）"""
+
+    def __init__(self, limit_bytes: float):
+        self.limit_bytes = limit_bytes
+        self.loaded_bytes = 0
+        self.exceeded = False
+        self._lock = threading.Lock()
+
+    def add(self, nbytes: int):
+        """登记新加载的数据量（其他线程已超出预算时同样抛出异常，使其尽快停止加载）"""
+        with self._lock:
+            self.loaded_bytes += nbytes
+            if self.loaded_bytes > self.limit_bytes:
+                self.exceeded = True
+            if self.exceeded:
+                raise MemoryBudgetExceeded(
+                    f"已加载{self.loaded_bytes}字节，超过内存预算{int(self.limit_bytes)}字节")
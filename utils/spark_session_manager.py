@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+进程级共享的Spark会话管理
+
+多表任务共用一个SparkSession（只启动一次JVM），使用FAIR调度，
+各任务线程把作业提交到各自的调度池中并发执行，进程退出时统一关闭会话。
+一个进程只能有一个SparkContext，会话创建后不同模式（spark_local/spark_cluster）的任务不能在同一进程中运行。
+"""
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SparkSessionManager:
+    """Spark会话管理器（单例模式）"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._session = None
+                    cls._instance._spark_mode = None
+        return cls._instance
+
+    def get_session(self, spark_mode: str = 'spark_local'):
+        """获取共享的SparkSession（首次调用时创建）
+
+        Raises:
+            RuntimeError: 已存在其他模式的会话（如本地会话已创建时的集群任务）
+        """
+        with self._lock:
+            if self._session is None:
+                self._session = self._build_session(spark_mode)
+                self._spark_mode = spark_mode
+                atexit.register(self.stop)
+                logger.info(f"Spark会话初始化完成（模式：{spark_mode}）")
+            elif spark_mode != self._spark_mode:
+                # 一个进程只能有一个SparkContext，沿用已创建的会话会把集群规模的任务放到本机运行（或反之）
+                raise RuntimeError(f"已存在{self._spark_mode}模式的Spark会话，无法在同一进程中运行{spark_mode}任务，"
+                                   f"请将{spark_mode}任务放到单独的进程中执行")
+            return self._session
+
+    @staticmethod
+    def _build_session(spark_mode: str):
+        """按SPARK_CONFIG创建SparkSession"""
+        from pyspark.sql import SparkSession
+        from config.settings import SPARK_CONFIG
+
+        mode_config = SPARK_CONFIG.get(spark_mode, {})
+        builder = SparkSession.builder.appName("DataConsistencyPlatform") \
+            .config("spark.scheduler.mode", "FAIR")
+
+        if spark_mode == 'spark_local':
+            builder = builder.master(f"local[{mode_config.get('cores', '*')}]") \
+                .config("spark.driver.memory", mode_config.get('driver_memory', '8g')) \
+                .config("spark.executor.memory", mode_config.get('executor_memory', '4g'))
+        # Spark集群模式使用集群配置，无需指定master
+
+        return builder.getOrCreate()
+
+    def set_scheduler_pool(self, pool_name: str = None):
+        """设置当前线程后续提交作业使用的FAIR调度池（None表示恢复默认调度池）"""
+        if self._session is not None:
+            self._session.sparkContext.setLocalProperty("spark.scheduler.pool", pool_name)
+
+    def stop(self):
+        """关闭共享的SparkSession"""
+        with self._lock:
+            if self._session is not None:
+                try:
+                    self._session.stop()
+                    logger.info("Spark会话已关闭")
+                except Exception as e:
+                    logger.warning(f"关闭Spark会话时出错: {str(e)}")
+                self._session = None
+                self._spark_mode = None
+
+
+# 全局Spark会话管理器
+_session_manager = SparkSessionManager()
+
+
+def get_spark_session(spark_mode: str = 'spark_local'):
+    """获取进程级共享的SparkSession"""
+    return _session_manager.get_session(spark_mode)
+
+
+def get_spark_session_manager() -> SparkSessionManager:
+    """获取全局Spark会话管理器"""
+    return _session_manager
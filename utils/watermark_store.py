@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/17
+# @Author  : hejun
+"""
+增量比对水位线存储
+
+每张表记录上次成功比对的增量窗口结束时间（水位线），保存在本地JSON状态文件中。
+下次增量比对从水位线开始，比对窗口首尾相接，不会因调度延迟遗漏或重复比对数据。
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+_lock = threading.Lock()
+
+
+def get_watermark_key(config: Dict[str, Any]) -> str:
+    """水位线键：源端库表 -> 目标端库表"""
+    return (f"{config.get('src_host', '')}:{config.get('src_port', '')}/{config['src_db_name']}.{config['src_table_name']}"
+            f" -> {config.get('tgt_host', '')}:{config.get('tgt_port', '')}/{config['tgt_db_name']}.{config['tgt_table_name']}")
+
+
+def _state_file(config: Dict[str, Any]) -> str:
+    from config.settings import WATERMARK_STATE_FILE
+    return config.get('watermark_state_file') or WATERMARK_STATE_FILE
+
+
+def _read_state(path: str) -> Dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_watermark(config: Dict[str, Any]) -> Optional[datetime]:
+    """读取表的水位线，未记录时返回None"""
+    path = _state_file(config)
+    with _lock:
+        value = _read_state(path).get(get_watermark_key(config))
+    return datetime.strptime(value, _TIME_FORMAT) if value else None
+
+
+def save_watermark(config: Dict[str, Any], watermark: datetime):
+    """保存表的水位线（先写临时文件再替换，避免并发任务或中断写坏状态文件）"""
+    path = _state_file(config)
+    with _lock:
+        state = _read_state(path)
+        state[get_watermark_key(config)] = watermark.strftime(_TIME_FORMAT)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)